@@ -0,0 +1,199 @@
+"""
+Admission control for routes that wait on upstream APIs.
+
+Each route class has a concurrency limit and a short, bounded wait queue.
+Requests that cannot get a slot in time are shed with 503 and ``Retry-After``
+instead of piling up behind slow upstream calls, so routes outside the
+limited classes (auth, favorites, suggestions) keep their latency under load.
+Signed-in users are admitted from the queue ahead of anonymous requests.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_UPSTREAM_CONCURRENCY = int(os.getenv("ADMISSION_UPSTREAM_CONCURRENCY", "32"))
+ADMISSION_UPSTREAM_QUEUE_SIZE = int(os.getenv("ADMISSION_UPSTREAM_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+# Route class -> paths it covers. The live feed stream is long-lived and has its own sharing.
+ROUTE_CLASSES: Dict[str, Tuple[str, ...]] = {
+    "upstream": ("/birds/rare", "/birds/dashboard", "/species/observations", "/species/images"),
+}
+
+PRIORITY_AUTHENTICATED = 0
+PRIORITY_ANONYMOUS = 1
+
+
+class RouteClassLimiter:
+    """Concurrency slots for one route class with a priority wait queue."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout_seconds = timeout_seconds
+        self.active = 0
+        # (priority, arrival, future) of requests still waiting; futures resolve True when
+        # handed a slot, False when evicted. Entries leave the heap as soon as they are
+        # settled, so it never holds more than ``queue_size`` waiters.
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.evicted = 0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _remove(self, waiter: Tuple[int, int, asyncio.Future]) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:  # Already handed a slot
+            return
+        heapq.heapify(self._waiters)
+
+    def _evict_lowest(self, priority: int) -> bool:
+        """Make room for a ``priority`` arrival by shedding the newest waiter of a lower priority."""
+        candidates = [w for w in self._waiters if w[0] > priority]
+        if not candidates:
+            return False
+        victim = max(candidates, key=lambda w: (w[0], w[1]))
+        self._remove(victim)
+        victim[2].set_result(False)
+        self.evicted += 1
+        return True
+
+    async def acquire(self, priority: int) -> bool:
+        """Wait for a slot; False means the request should be shed."""
+        if self.active < self.limit and not self.queue_depth:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if self.queue_depth >= self.queue_size and not self._evict_lowest(priority):
+            self.shed_queue_full += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._arrivals), future)
+        heapq.heappush(self._waiters, waiter)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            granted = await asyncio.wait_for(future, self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            self.shed_timeout += 1
+            return False
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            # Client went away; give back a slot that was handed over meanwhile
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            raise
+        if granted:
+            self.admitted += 1
+        return granted
+
+    def release(self) -> None:
+        self.active -= 1
+        if self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "evicted": self.evicted,
+        }
+
+
+def _request_priority(headers: Dict[bytes, bytes]) -> int:
+    """Signed-in requests (a valid access token) go first; the token is fully checked later."""
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return PRIORITY_ANONYMOUS
+    from .auth import verify_token
+    try:
+        verify_token(token)
+    except HTTPException:
+        return PRIORITY_ANONYMOUS
+    return PRIORITY_AUTHENTICATED
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware applying ``RouteClassLimiter`` limits by request path."""
+
+    def __init__(self, app, limiters: Optional[Dict[str, RouteClassLimiter]] = None):
+        self.app = app
+        self.limiters = limiters if limiters is not None else admission_limiters
+        self._class_by_path = {
+            path: name for name, paths in ROUTE_CLASSES.items() for path in paths if name in self.limiters
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        route_class = self._class_by_path.get(scope["path"].rstrip("/") or "/")
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class]
+        if not await limiter.acquire(_request_priority(dict(scope["headers"]))):
+            await _send_busy(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+async def _send_busy(send) -> None:
+    body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(ADMISSION_RETRY_AFTER_SECONDS).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {name: limiter.stats() for name, limiter in admission_limiters.items()}
+
+
+admission_limiters: Dict[str, RouteClassLimiter] = {
+    "upstream": RouteClassLimiter(
+        "upstream",
+        ADMISSION_UPSTREAM_CONCURRENCY,
+        ADMISSION_UPSTREAM_QUEUE_SIZE,
+        ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    ),
+}
@@ -1,11 +1,12 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
+import time
+import uuid
 import warnings
 
 # Suppress bcrypt version warning from passlib
@@ -13,15 +14,24 @@ warnings.filterwarnings("ignore", message=".*bcrypt version.*")
 
 from . import models, schemas
 from .database import get_db
+from .revocation import revocation_store
+from .tracing import span
 
 # Configuration
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production")
+DEFAULT_SECRET_KEY = "your-secret-key-change-this-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def get_secret_key() -> str:
+    """Read the signing key at use time so values from .env loaded at startup apply."""
+    return os.getenv("JWT_SECRET_KEY", DEFAULT_SECRET_KEY)
+
+# Password hashing (passlib and the bcrypt backend load on first use)
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -30,51 +40,105 @@ oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
+    encoded_jwt = jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict) -> str:
     """Create a JWT refresh token."""
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
+    encoded_jwt = jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
     return encoded_jwt
 
+def issue_tokens(email: str, family_id: Optional[str] = None) -> dict:
+    """Create an access/refresh pair. A login starts a new family; refreshes keep it."""
+    data = {"sub": email, "fam": family_id or uuid.uuid4().hex}
+    return {
+        "access_token": create_access_token(data=data),
+        "refresh_token": create_refresh_token(data=data),
+        "token_type": "bearer"
+    }
+
 def verify_token(token: str, token_type: str = "access") -> schemas.TokenData:
     """Verify and decode a JWT token."""
+    from jose import JWTError, jwt
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         token_type_check: str = payload.get("type")
         
         if email is None or token_type_check != token_type:
             raise credentials_exception
         
-        token_data = schemas.TokenData(email=email)
+        token_data = schemas.TokenData(
+            email=email,
+            jti=payload.get("jti"),
+            family_id=payload.get("fam"),
+            expires_at=payload.get("exp"),
+        )
     except JWTError:
         raise credentials_exception
     return token_data
 
+def _family_expiry() -> int:
+    """No token in a family issued up to now outlives a fresh refresh token."""
+    return int(time.time()) + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
+
+def rotate_refresh_token(db: Session, token_data: schemas.TokenData) -> None:
+    """
+    Mark a refresh token as used so it cannot be presented again.
+
+    A second use of the same refresh token means it was copied: the whole
+    family (every token descended from that login) is revoked.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if not token_data.jti:
+        # Issued before token ids existed; it simply expires
+        return
+    # Refreshing already writes, so skip the filter and read the table: a logout
+    # on another worker must not wait for this worker's next sync.
+    if revocation_store.is_revoked(db, None, token_data.family_id, exact=True):
+        raise invalid
+    # The unique key makes this the reuse check too, even across workers
+    # whose filters have not synced yet.
+    if not revocation_store.revoke(db, token_data.jti, token_data.expires_at, "rotated"):
+        if token_data.family_id:
+            revocation_store.revoke_family(db, token_data.family_id, _family_expiry(), "reused")
+        raise invalid
+
+def revoke_token_family(db: Session, token_data: schemas.TokenData, reason: str) -> None:
+    """Revoke every token from the same login (used by logout)."""
+    if token_data.family_id:
+        revocation_store.revoke_family(db, token_data.family_id, _family_expiry(), reason)
+    elif token_data.jti:
+        revocation_store.revoke(db, token_data.jti, token_data.expires_at, reason)
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[models.User]:
     """Authenticate a user by email and password."""
     user = db.query(models.User).filter(models.User.email == email).first()
@@ -125,8 +189,12 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token_data = verify_token(token, token_type="access")
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    with span("auth"):
+        token_data = verify_token(token, token_type="access")
+        # In-memory filter check; the database is only read on a possible match
+        if revocation_store.is_revoked(db, token_data.jti, token_data.family_id):
+            raise credentials_exception
+        user = db.query(models.User).filter(models.User.email == token_data.email).first()
     
     if user is None:
         raise credentials_exception
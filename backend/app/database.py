@@ -1,27 +1,101 @@
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, Optional
 import os
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Engine is created on first use so importing the app does no database work
+# and picks up DATABASE_URL after the .env file has been loaded.
+_engine: Optional[Engine] = None
 
-# Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
-)
-
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create SessionLocal class (bound to the engine in get_engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 # Create Base class for models
 Base = declarative_base()
 
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _sqlite_pragmas() -> Dict[str, Any]:
+    """Per-connection SQLite settings. WAL lets readers proceed while a write is in progress."""
+    return {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # Negative values are KiB rather than pages
+        "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    }
+
+
+def build_engine(database_url: str) -> Engine:
+    """Create an engine with pool and SQLite settings taken from the environment."""
+    is_sqlite = database_url.startswith("sqlite")
+    in_memory = is_sqlite and (":memory:" in database_url or database_url.rstrip("/") == "sqlite:")
+
+    kwargs: Dict[str, Any] = {
+        "connect_args": {"check_same_thread": False} if is_sqlite else {},
+        # A dropped connection costs a failed request; a ping costs a round trip
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", not is_sqlite),
+    }
+    if not in_memory:
+        kwargs.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+
+    engine = create_engine(database_url, **kwargs)
+
+    if is_sqlite and not in_memory:
+        pragmas = _sqlite_pragmas()
+
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    return engine
+
+
+def get_engine() -> Engine:
+    """Return the process-wide engine, creating it on first call."""
+    global _engine
+    if _engine is None:
+        # SQLite database URL
+        _engine = build_engine(os.getenv("DATABASE_URL", "sqlite:///./app.db"))
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+def create_missing_indexes(engine: Engine, metadata: MetaData) -> None:
+    """Create indexes declared on the models that the database does not have yet.
+
+    ``create_all`` skips tables that already exist, so an index added to a model
+    later (such as the keyset pagination indexes) never reaches an existing
+    database on its own. Each index is checked first and created only if missing.
+    """
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
 # Dependency to get DB session
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,107 @@
+"""
+HTTP caching policy and conditional GET for read endpoints.
+
+Each route picks a ``Cache-Control`` policy; responses carry an ``ETag``
+derived from a hash of either the payload or the data versions it was built
+from, and a matching ``If-None-Match`` gets an empty 304.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .tracing import span
+
+# Suggestions only change with the taxonomy (and regional lists), which the ETag tracks
+SUGGEST_MAX_AGE_SECONDS = int(os.getenv("SUGGEST_MAX_AGE_SECONDS", str(60 * 60 * 24)))
+# Observations are cached upstream-side for OBSERVATION_CACHE_TTL_SECONDS (300)
+OBSERVATIONS_MAX_AGE_SECONDS = int(os.getenv("OBSERVATIONS_MAX_AGE_SECONDS", "60"))
+OBSERVATIONS_STALE_SECONDS = int(os.getenv("OBSERVATIONS_STALE_SECONDS", "300"))
+# Date ranges made only of settled days never change
+HISTORIC_MAX_AGE_SECONDS = int(os.getenv("HISTORIC_MAX_AGE_SECONDS", str(60 * 60 * 24)))
+
+# Species photos are cached server-side for weeks
+SPECIES_IMAGES_MAX_AGE_SECONDS = int(os.getenv("SPECIES_IMAGES_MAX_AGE_SECONDS", str(60 * 60 * 24)))
+
+SUGGEST_CACHE_CONTROL = (
+    f"public, max-age={SUGGEST_MAX_AGE_SECONDS}, stale-while-revalidate={SUGGEST_MAX_AGE_SECONDS * 7}"
+)
+OBSERVATIONS_CACHE_CONTROL = (
+    f"public, max-age={OBSERVATIONS_MAX_AGE_SECONDS}, stale-while-revalidate={OBSERVATIONS_STALE_SECONDS}"
+)
+HISTORIC_CACHE_CONTROL = f"public, max-age={HISTORIC_MAX_AGE_SECONDS}"
+SPECIES_IMAGES_CACHE_CONTROL = (
+    f"public, max-age={SPECIES_IMAGES_MAX_AGE_SECONDS}, stale-while-revalidate={SPECIES_IMAGES_MAX_AGE_SECONDS * 7}"
+)
+# Signed-in requests have side effects (search history), so shared caches must not answer them
+PRIVATE_OBSERVATIONS_CACHE_CONTROL = OBSERVATIONS_CACHE_CONTROL.replace("public", "private", 1)
+PRIVATE_HISTORIC_CACHE_CONTROL = HISTORIC_CACHE_CONTROL.replace("public", "private", 1)
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from a hash of ``parts`` (bytes are hashed as-is, anything else as JSON)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, separators=(",", ":"), default=str).encode()
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return f'"{digest.hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def cache_headers(etag: str, cache_control: str, vary: Iterable[str] = (), extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = ", ".join(vary)
+    if extra:
+        headers.update(extra)
+    return headers
+
+
+def not_modified(etag: str, cache_control: str, vary: Iterable[str] = (), extra: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control, vary, extra))
+
+
+def conditional_json(
+    request: Request,
+    content: Any,
+    cache_control: str,
+    vary: Iterable[str] = (),
+    extra_headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """Serialize ``content`` and answer 304 if the client already has it.
+
+    Without an explicit ``etag`` the tag is a hash of the body and the extra
+    headers (paging headers are part of the representation).
+    """
+    with span("serialize"):
+        body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if etag is None:
+            etag = make_etag(body, sorted((extra_headers or {}).items()))
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control, vary, extra_headers)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=cache_headers(etag, cache_control, vary, extra_headers),
+    )
@@ -0,0 +1,60 @@
+import logging
+from contextvars import ContextVar
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# One pooled client per process; created on startup (or lazily on first use
+# outside the app, e.g. from scripts) and closed on shutdown.
+_client: Optional[httpx.AsyncClient] = None
+
+DEFAULT_TIMEOUT = 15
+
+# Upstream requests made on behalf of the current inbound request, when tracked.
+# Background fetches started from a request inherit its tally.
+_upstream_tally: ContextVar[Optional[List[int]]] = ContextVar("upstream_tally", default=None)
+
+
+def track_upstream_calls() -> List[int]:
+    """Start counting upstream requests in this context; the count is ``tally[0]``."""
+    tally = [0]
+    _upstream_tally.set(tally)
+    return tally
+
+
+async def _count_upstream_call(request: httpx.Request) -> None:
+    tally = _upstream_tally.get()
+    if tally is not None:
+        tally[0] += 1
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared upstream HTTP client, creating it if needed."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            event_hooks={"request": [_count_upstream_call]},
+        )
+    return _client
+
+
+# Upstream error pages can be large HTML documents; log only the start
+ERROR_BODY_LOG_CHARS = 200
+
+
+def error_excerpt(response: httpx.Response) -> str:
+    """The first ``ERROR_BODY_LOG_CHARS`` characters of an error response body, for logs."""
+    text = response.text
+    return text if len(text) <= ERROR_BODY_LOG_CHARS else text[:ERROR_BODY_LOG_CHARS] + "..."
+
+
+async def close_client() -> None:
+    """Close the shared client; safe to call when it was never created."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
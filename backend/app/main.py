@@ -1,75 +1,166 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+import asyncio
 import os
-from dotenv import load_dotenv
 import logging
-from typing import Optional
 
-from .database import engine, get_db
-from . import models, schemas, auth
+from dotenv import load_dotenv
+
+# Before the package imports below: their settings are read from the environment at import time
+load_dotenv()
+
+from .database import create_missing_indexes, get_engine
+from . import models
+from .admission import ADMISSION_ENABLED, AdmissionControlMiddleware
+from .http_client import close_client
+from .logging_config import RequestIdMiddleware, configure_logging, stop_logging
+from .tracing import TracingMiddleware, start_export, stop_export
 from .routers import auth as auth_router
+from .routers import birds as birds_router
+from .routers import metrics as metrics_router
 from .routers import species as species_router
-from .services import BirdService
 
+logger = logging.getLogger(__name__)
 
-#TODO: Configure logging to console
-logging.basicConfig(level=logging.INFO)
-logging.getLogger().addHandler(logging.StreamHandler())
 
-load_dotenv()
+async def _warm_caches() -> None:
+    """Pre-load the species taxonomy so the first autocomplete request is fast.
+
+    Run again periodically, so the version check happens here and not on a request.
+    """
+    if not os.getenv("EBIRD_API_KEY"):
+        return
+    from .services import species as species_service
+    try:
+        await species_service.load_taxonomy()
+    except Exception:
+        logger.warning("Taxonomy warm-up failed; it will be loaded on first use", exc_info=True)
+
+
+async def _run_periodically(interval_seconds: float, job, name: str, immediately: bool = False) -> None:
+    """Run a job every ``interval_seconds``; blocking jobs run in a worker thread."""
+    if not immediately:
+        await asyncio.sleep(interval_seconds)
+    while True:
+        try:
+            if asyncio.iscoroutinefunction(job):
+                await job()
+            else:
+                await asyncio.to_thread(job)
+        except Exception:
+            logger.exception("Periodic job %s failed", name)
+        await asyncio.sleep(interval_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks: everything with I/O happens here, not at import."""
+    configure_logging()
+    start_export()
+
+    # Create database tables, and indexes added to tables that already existed
+    models.Base.metadata.create_all(bind=get_engine())
+    create_missing_indexes(get_engine(), models.Base.metadata)
+
+    background_tasks = []
+    if os.getenv("WARM_CACHES_ON_STARTUP", "true").lower() in ("1", "true", "yes"):
+        from .services.species import TAXONOMY_TTL_SECONDS
+        # Warm up in the background so the worker starts accepting requests immediately
+        background_tasks.append(asyncio.create_task(
+            _run_periodically(TAXONOMY_TTL_SECONDS / 2, _warm_caches, "taxonomy refresh", immediately=True)
+        ))
+
+    compaction_interval = float(os.getenv("SEARCH_COMPACTION_INTERVAL_SECONDS", "86400"))
+    if compaction_interval > 0:
+        from .services.history import run_compaction
+        background_tasks.append(asyncio.create_task(
+            _run_periodically(compaction_interval, run_compaction, "search history compaction")
+        ))
+
+    from . import revocation
+    # Load the revocation filter before serving, then follow other workers' writes
+    await asyncio.to_thread(revocation.run_sync)
+    background_tasks.append(asyncio.create_task(
+        _run_periodically(revocation.REVOCATION_SYNC_SECONDS, revocation.run_sync, "revocation sync")
+    ))
+    if revocation.REVOCATION_PURGE_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            _run_periodically(revocation.REVOCATION_PURGE_SECONDS, revocation.run_purge, "revocation purge")
+        ))
+
+    from .services.hotspots import HOTSPOT_REFRESH_SECONDS, HotspotService
+    # Syncs configured hotspot regions and keeps this worker's index current
+    background_tasks.append(asyncio.create_task(
+        _run_periodically(HOTSPOT_REFRESH_SECONDS, HotspotService.refresh, "hotspot refresh", immediately=True)
+    ))
+
+    from .services.alerts import ALERTS_INTERVAL_SECONDS, run_alerts
+    if ALERTS_INTERVAL_SECONDS > 0:
+        # One fetch per (species, tile) pair watched by any user; pairs are claimed, so workers do not overlap
+        background_tasks.append(asyncio.create_task(
+            _run_periodically(ALERTS_INTERVAL_SECONDS, run_alerts, "favorite alerts")
+        ))
+
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        from .services.live_feed import live_feed
+        await live_feed.close()
+        await close_client()
+        from .services.response_cache import response_cache
+        response_cache.close()
+        from .rate_limit import close_backend
+        await close_backend()
+        stop_export()
+        stop_logging()
+
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application. Importing this module only reads ``.env``."""
+    app = FastAPI(title="Rare Bird Finder", lifespan=lifespan)
+
+    if ADMISSION_ENABLED:
+        # Added before CORS so shed responses still carry CORS headers
+        app.add_middleware(AdmissionControlMiddleware)
+
+    # CORS configuration: allow the frontend to call this API
+    frontend_origin = os.getenv("FRONTEND_ORIGIN")
+    allowed_origins = [
+        # Prefer explicit env var if provided
+        frontend_origin,
+        # Common local dev origins
+        "http://localhost:3000",
+        "http://127.0.0.1:3000",
+    ]
+    # Filter out any Nones and duplicates while preserving order
+    allowed_origins = [o for i, o in enumerate(allowed_origins) if o and o not in allowed_origins[:i]]
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allowed_origins or ["*"],  # fall back to * if nothing set
+        allow_credentials=True,  # Changed to True for auth cookies
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["*"],  # Allow frontend to read all headers
+    )
+
+    # Outside CORS so preflights and CORS handling are timed too
+    app.add_middleware(TracingMiddleware, timing_allow_origins=allowed_origins or ["*"])
+
+    # Outermost, so every line logged for a request (shed ones included) carries its id
+    app.add_middleware(RequestIdMiddleware)
+
+    # Include routers
+    app.include_router(auth_router.router)
+    app.include_router(birds_router.router)
+    app.include_router(species_router.router)
+    app.include_router(metrics_router.router)
+
+    return app
+
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Rare Bird Finder")
-
-# CORS configuration: allow the frontend to call this API
-FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN")
-allowed_origins = [
-    # Prefer explicit env var if provided
-    FRONTEND_ORIGIN,
-    # Common local dev origins
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-]
-# Filter out any Nones and duplicates while preserving order
-allowed_origins = [o for i, o in enumerate(allowed_origins) if o and o not in allowed_origins[:i]]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins or ["*"],  # fall back to * if nothing set
-    allow_credentials=True,  # Changed to True for auth cookies
-    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["*"],  # Allow frontend to read all headers
-)
-
-# Include routers
-app.include_router(auth_router.router)
-app.include_router(species_router.router)
-
-@app.get("/birds/rare", response_model=list[schemas.ObservedBird])
-async def rare_birds(
-    lat: float, 
-    lng: float, 
-    radius: int = 25,
-    current_user: Optional[models.User] = Depends(auth.get_optional_user),
-    db: Session = Depends(get_db)
-):
-    """Fetch notable sightings from the eBird API."""
-    # Fetch bird data using the service
-    birds = await BirdService.fetch_rare_birds(lat, lng, radius)
-    
-    # Save search to user's history if authenticated
-    if current_user:
-        BirdService.save_user_search(
-            db=db,
-            user=current_user,
-            lat=lat,
-            lng=lng,
-            radius=radius,
-            bird_count=len(birds)
-        )
-        
-    return birds
+app = create_app()
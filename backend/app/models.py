@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -18,6 +18,8 @@ class User(Base):
     searches = relationship("UserSearch", back_populates="user", cascade="all, delete-orphan")
     favorites = relationship("UserFavoriteBird", back_populates="user", cascade="all, delete-orphan")
     locations = relationship("UserLocation", back_populates="user", cascade="all, delete-orphan")
+    notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
+    search_rollups = relationship("UserSearchRollup", back_populates="user", cascade="all, delete-orphan")
 
 
 class UserSearch(Base):
@@ -34,6 +36,33 @@ class UserSearch(Base):
     # Relationships
     user = relationship("User", back_populates="searches")
 
+    # Serves newest-first keyset pagination per user
+    __table_args__ = (
+        Index("ix_user_searches_user_date_id", "user_id", "search_date", "id"),
+    )
+
+
+class UserSearchRollup(Base):
+    """Daily per-area aggregate of searches older than the raw retention window."""
+    __tablename__ = "user_search_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    # Grid cell (south-west corner) the searches fell into
+    lat_cell = Column(Float, nullable=False)
+    lng_cell = Column(Float, nullable=False)
+    search_count = Column(Integer, default=0, nullable=False)
+    bird_count_total = Column(Integer, default=0, nullable=False)
+    max_radius = Column(Integer, default=0, nullable=False)
+
+    # Relationships
+    user = relationship("User", back_populates="search_rollups")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "lat_cell", "lng_cell", name="uq_user_search_rollup_cell"),
+    )
+
 
 class UserFavoriteBird(Base):
     __tablename__ = "user_favorite_birds"
@@ -49,6 +78,11 @@ class UserFavoriteBird(Base):
     # Relationships
     user = relationship("User", back_populates="favorites")
 
+    # Serves newest-first keyset pagination per user
+    __table_args__ = (
+        Index("ix_user_favorite_birds_user_date_id", "user_id", "added_date", "id"),
+    )
+
 
 class UserLocation(Base):
     __tablename__ = "user_locations"
@@ -64,4 +98,96 @@ class UserLocation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
-    user = relationship("User", back_populates="locations")
\ No newline at end of file
+    user = relationship("User", back_populates="locations")
+
+class RevokedToken(Base):
+    """A revoked token id (jti) or token family ("fam:<id>")."""
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, nullable=False)
+    reason = Column(String, nullable=False)  # "rotated", "reused", "logout"
+    # Unix time after which the token would be rejected anyway and the row can go
+    expires_at = Column(Integer, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Hotspot(Base):
+    """An eBird hotspot, synced per region from /ref/hotspot."""
+    __tablename__ = "hotspots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    region_code = Column(String, nullable=False, index=True)  # Region it was synced from
+    loc_id = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    country_code = Column(String, nullable=True)
+    subnational1_code = Column(String, nullable=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    latest_obs_dt = Column(String, nullable=True)
+    num_species_all_time = Column(Integer, nullable=True)
+    synced_at = Column(Integer, nullable=False)  # Unix time of the region sync
+
+    __table_args__ = (
+        UniqueConstraint("region_code", "loc_id", name="uq_hotspot_region_loc"),
+    )
+
+
+class AlertPair(Base):
+    """A (species, location tile) watched by at least one user's favorite."""
+    __tablename__ = "alert_pairs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    species_code = Column(String, nullable=False)
+    # Tile indices (floor of coordinate / ALERT_TILE_DEGREES)
+    tile_lat = Column(Integer, nullable=False)
+    tile_lng = Column(Integer, nullable=False)
+    # Unix time of the last claim; also the lease that keeps workers from checking it twice
+    last_checked_at = Column(Integer, nullable=True)
+    # False until the first fetch recorded what was already there (which is not notified)
+    baselined = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("species_code", "tile_lat", "tile_lng", name="uq_alert_pair_species_tile"),
+    )
+
+
+class AlertSeenObservation(Base):
+    """An observation already handled for an alert pair."""
+    __tablename__ = "alert_seen_observations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pair_id = Column(Integer, ForeignKey("alert_pairs.id", ondelete="CASCADE"), nullable=False)
+    obs_key = Column(String, nullable=False)
+    obs_date = Column(String, nullable=False, index=True)  # "YYYY-MM-DD HH:MM" as reported
+
+    __table_args__ = (
+        UniqueConstraint("pair_id", "obs_key", name="uq_alert_seen_pair_obs"),
+    )
+
+
+class Notification(Base):
+    """A favorite species seen near a user's default location."""
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    species_code = Column(String, nullable=False)
+    species_name = Column(String, nullable=False)
+    loc_id = Column(String, nullable=True)
+    location_name = Column(String, nullable=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    distance_km = Column(Float, nullable=False)
+    obs_date = Column(String, nullable=False)
+    how_many = Column(Integer, nullable=True)
+    is_read = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    user = relationship("User", back_populates="notifications")
+
+    # Serves newest-first keyset pagination per user
+    __table_args__ = (
+        Index("ix_notifications_user_created_id", "user_id", "created_at", "id"),
+    )
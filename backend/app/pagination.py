@@ -0,0 +1,67 @@
+"""
+Keyset (cursor) pagination for per-user lists ordered newest first.
+
+Pages are ordered by ``(timestamp desc, id desc)`` and the cursor carries the
+last row's key, so each page is an index range scan instead of an OFFSET.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, literal, or_
+from sqlalchemy.orm import Query
+
+# Hard cap on page sizes regardless of what the client asks for
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+# Compatibility flag: restore unbounded list responses for old clients
+LEGACY_UNBOUNDED_LISTS = os.getenv("LEGACY_UNBOUNDED_LISTS", "false").lower() in ("1", "true", "yes")
+
+
+def encode_cursor(timestamp: Optional[datetime], row_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat() if timestamp else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_page(
+    query: Query,
+    sort_column: Any,
+    id_column: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Return one page of ``query`` newest first, plus the cursor for the next page."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor)
+        # Compare against the anchor row's stored value rather than a re-bound
+        # datetime: SQLite keeps timestamps as text and a Python datetime would not
+        # round-trip to the same string. Fall back to the cursor value if the row is gone.
+        # The anchor is looked up through ``query`` so its filters (the owner) apply:
+        # a crafted cursor must not read another user's row.
+        anchor = query.with_entities(sort_column).filter(id_column == last_id).scalar_subquery()
+        boundary = func.coalesce(anchor, literal(timestamp, type_=sort_column.type))
+        query = query.filter(
+            or_(sort_column < boundary, and_(sort_column == boundary, id_column < last_id))
+        )
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,224 @@
+"""
+Per-client rate limits for routes that spend the shared eBird API quota.
+
+Each client (the signed-in user, otherwise the client IP) has a token bucket
+per limited route. A request costs ``RATE_LIMIT_REQUEST_COST`` up front; every
+upstream call it ends up making costs ``RATE_LIMIT_UPSTREAM_CALL_COST`` more,
+charged once the request is done. Requests served from cache therefore use
+a fraction of the budget of requests that go to eBird. Clients without enough
+tokens get 429 with ``Retry-After``.
+
+Buckets live in process memory by default. With ``RATE_LIMIT_BACKEND=redis``
+they are shared by all workers through Redis (needs the ``redis`` package).
+"""
+
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from . import auth, models
+from .http_client import track_upstream_calls
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_REQUEST_COST = int(os.getenv("RATE_LIMIT_REQUEST_COST", "1"))
+RATE_LIMIT_UPSTREAM_CALL_COST = int(os.getenv("RATE_LIMIT_UPSTREAM_CALL_COST", "5"))
+# Memory backend: buckets kept before idle (refilled) ones are dropped
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+
+
+class RateLimit(NamedTuple):
+    """Token bucket refilling ``per_minute`` tokens a minute up to ``burst``."""
+
+    per_minute: float
+    burst: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+def _route_limit(route: str, per_minute: int, burst: int) -> RateLimit:
+    prefix = f"RATE_LIMIT_{route.upper()}"
+    return RateLimit(
+        float(os.getenv(f"{prefix}_PER_MINUTE", str(per_minute))),
+        float(os.getenv(f"{prefix}_BURST", str(burst))),
+    )
+
+
+# With the default costs, 60/min allows 60 cached or 10 uncached requests a minute
+ROUTE_LIMITS: Dict[str, RateLimit] = {
+    "rare": _route_limit("rare", 60, 120),
+    "observations": _route_limit("observations", 60, 120),
+    "dashboard": _route_limit("dashboard", 30, 60),
+}
+
+
+def refill(tokens: float, updated: float, now: float, limit: RateLimit) -> float:
+    return min(limit.burst, tokens + max(0.0, now - updated) * limit.per_second)
+
+
+class MemoryRateLimitBackend:
+    """Buckets in this process; the default, and the stand-in for Redis in tests."""
+
+    def __init__(self, max_clients: int = RATE_LIMIT_MAX_CLIENTS, clock=time.monotonic):
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, cost: float, limit: RateLimit, force: bool = False) -> float:
+        """Take ``cost`` tokens; returns 0 on success, else seconds until they are available.
+
+        ``force`` takes them regardless, down to ``-burst``, for costs known only
+        after the work is done.
+        """
+        now = self.clock()
+        state = self._buckets.pop(key, None)
+        tokens = limit.burst if state is None else refill(state[0], state[1], now, limit)
+        wait = 0.0
+        if force or tokens >= cost:
+            tokens = max(-limit.burst, tokens - cost)
+        else:
+            wait = (cost - tokens) / limit.per_second
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def close(self) -> None:
+        self._buckets.clear()
+
+
+# KEYS[1] bucket hash; ARGV: per_second, burst, cost, force. Returns the wait as a string
+# since Lua numbers come back from Redis truncated to integers.
+_REDIS_CONSUME = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local per_second, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local cost, force = tonumber(ARGV[3]), ARGV[4] == '1'
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * per_second)
+local wait = 0
+if force or tokens >= cost then
+  tokens = math.max(-burst, tokens - cost)
+else
+  wait = (cost - tokens) / per_second
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / per_second) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend:
+    """Buckets shared by every worker; updated atomically by a Lua script."""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:  # pragma: no cover - depends on the deployment
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package (pip install .[redis])") from e
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._consume = self._redis.register_script(_REDIS_CONSUME)
+
+    async def consume(self, key: str, cost: float, limit: RateLimit, force: bool = False) -> float:
+        try:
+            wait = await self._consume(
+                keys=[self.prefix + key],
+                args=[limit.per_second, limit.burst, cost, "1" if force else "0"],
+            )
+        except Exception as e:
+            # An unreachable Redis must not take the API down with it
+            logger.warning("Rate limit backend unavailable, allowing request: %s", e)
+            return 0.0
+        return float(wait)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def _create_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend()
+    if RATE_LIMIT_BACKEND != "memory":
+        logger.warning("Unknown RATE_LIMIT_BACKEND %r, using memory", RATE_LIMIT_BACKEND)
+    return MemoryRateLimitBackend()
+
+
+_backend = None
+_rejected: Dict[str, int] = {route: 0 for route in ROUTE_LIMITS}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = _create_backend()
+    return _backend
+
+
+def set_backend(backend) -> None:
+    """Swap the bucket store, e.g. for a ``MemoryRateLimitBackend`` with a fake clock."""
+    global _backend
+    _backend = backend
+
+
+async def close_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+    _backend = None
+
+
+def client_key(request: Request, user: Optional[models.User]) -> str:
+    if user is not None:
+        return f"user:{user.id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limited(route: str):
+    """Dependency enforcing ``ROUTE_LIMITS[route]`` for the calling client."""
+    limit = ROUTE_LIMITS[route]
+
+    async def dependency(
+        request: Request,
+        current_user: Optional[models.User] = Depends(auth.get_optional_user),
+    ):
+        if not RATE_LIMIT_ENABLED:
+            yield
+            return
+        backend = get_backend()
+        key = f"{route}:{client_key(request, current_user)}"
+        wait = await backend.consume(key, min(RATE_LIMIT_REQUEST_COST, limit.burst), limit)
+        if wait > 0:
+            _rejected[route] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        tally = track_upstream_calls()
+        try:
+            yield
+        finally:
+            if tally[0]:
+                await backend.consume(key, tally[0] * RATE_LIMIT_UPSTREAM_CALL_COST, limit, force=True)
+
+    return dependency
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    return {
+        route: {"per_minute": limit.per_minute, "burst": limit.burst, "rejected": _rejected[route]}
+        for route, limit in ROUTE_LIMITS.items()
+    }
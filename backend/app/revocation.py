@@ -0,0 +1,188 @@
+"""
+Token revocation with an in-memory Bloom filter in front of the database.
+
+Revoked keys (token ids and whole token families) are stored in the
+``revoked_tokens`` table. Every worker keeps a Bloom filter of those keys, so
+the common "not revoked" answer never touches the database; only a possible
+hit is confirmed with a query. Filters are kept in sync across workers by an
+incremental scan on the table's primary key. Ids are allocated at insert but
+become visible at commit, so a lower id can appear after a higher one; each
+scan therefore re-reads the last ``REVOCATION_SYNC_OVERLAP_ROWS`` ids below the
+high-water mark.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "1000000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+REVOCATION_PURGE_SECONDS = float(os.getenv("REVOCATION_PURGE_SECONDS", "3600"))
+# Ids below the high-water mark that are read again, for rows committed out of order
+REVOCATION_SYNC_OVERLAP_ROWS = int(os.getenv("REVOCATION_SYNC_OVERLAP_ROWS", "1000"))
+
+FAMILY_PREFIX = "fam:"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (no false negatives)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationStore:
+    """Process-local view of the revoked_tokens table."""
+
+    def __init__(
+        self,
+        capacity: int = REVOCATION_BLOOM_CAPACITY,
+        error_rate: float = REVOCATION_BLOOM_ERROR_RATE,
+        overlap_rows: int = REVOCATION_SYNC_OVERLAP_ROWS,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.overlap_rows = max(0, overlap_rows)
+        # Allocated on the first sync so importing the app stays cheap
+        self._filter: Optional[BloomFilter] = None
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self.db_checks = 0
+
+    def sync(self, db: Session) -> int:
+        """Pull revocations added since the last sync (by any worker); returns how many were new."""
+        with self._lock:
+            if self._filter is None:
+                self._filter = BloomFilter(self.capacity, self.error_rate)
+            rows = db.query(models.RevokedToken.id, models.RevokedToken.key).filter(
+                models.RevokedToken.id > self._last_id - self.overlap_rows,
+                models.RevokedToken.expires_at > int(time.time()),
+            ).order_by(models.RevokedToken.id).all()
+            # Rows in the overlap were usually added by an earlier scan
+            new = [key for _, key in rows if key not in self._filter]
+            if new and self._filter.count + len(new) > self._filter.capacity:
+                self._rebuild(db)
+                return len(new)
+            for key in new:
+                self._filter.add(key)
+            if rows:
+                self._last_id = max(self._last_id, rows[-1][0])
+            return len(new)
+
+    def _rebuild(self, db: Session) -> None:
+        """Start a fresh filter from unexpired rows, growing it if needed."""
+        live = db.query(models.RevokedToken.id, models.RevokedToken.key).filter(
+            models.RevokedToken.expires_at > int(time.time())
+        ).all()
+        self.capacity = max(self.capacity, len(live) * 2)
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = self._last_id
+        for row_id, key in live:
+            bloom.add(key)
+            last_id = max(last_id, row_id)
+        self._filter, self._last_id = bloom, last_id
+        logger.info("Rebuilt revocation filter with %d keys", len(live))
+
+    def _confirm(self, db: Session, key: str) -> Optional[str]:
+        """Return the revocation reason for ``key``, or None."""
+        self.db_checks += 1
+        row = db.query(models.RevokedToken.reason).filter(models.RevokedToken.key == key).first()
+        return row.reason if row else None
+
+    def reason(self, db: Session, key: str, exact: bool = False) -> Optional[str]:
+        """Revocation reason for a key; unless ``exact``, the database is only read on a filter hit."""
+        if exact:
+            return self._confirm(db, key)
+        if self._filter is None:
+            self.sync(db)
+        if key not in self._filter:
+            return None
+        return self._confirm(db, key)
+
+    def is_revoked(
+        self, db: Session, jti: Optional[str], family_id: Optional[str] = None, exact: bool = False
+    ) -> bool:
+        if jti and self.reason(db, jti, exact):
+            return True
+        return bool(family_id and self.reason(db, FAMILY_PREFIX + family_id, exact))
+
+    def revoke(self, db: Session, key: str, expires_at: int, reason: str) -> bool:
+        """Record a revocation; returns False if ``key`` was already revoked."""
+        db.add(models.RevokedToken(key=key, expires_at=expires_at, reason=reason))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        if self._filter is not None:
+            self._filter.add(key)
+        return True
+
+    def revoke_family(self, db: Session, family_id: str, expires_at: int, reason: str) -> None:
+        self.revoke(db, FAMILY_PREFIX + family_id, expires_at, reason)
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete rows whose tokens have expired anyway."""
+        deleted = db.query(models.RevokedToken).filter(
+            models.RevokedToken.expires_at <= int(time.time())
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+revocation_store = RevocationStore()
+
+
+def _with_session(job):
+    from .database import SessionLocal, get_engine
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        return job(db)
+    finally:
+        db.close()
+
+
+def run_sync() -> None:
+    """Sync this worker's filter with the database (for the periodic task)."""
+    _with_session(revocation_store.sync)
+
+
+def run_purge() -> None:
+    """Drop revocations for tokens that have expired (for the periodic task)."""
+    deleted = _with_session(revocation_store.purge_expired)
+    if deleted:
+        logger.info("Purged %d expired token revocations", deleted)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, Optional
 
 from .. import models, schemas, auth
 from ..database import get_db
+from ..pagination import LEGACY_UNBOUNDED_LISTS, MAX_PAGE_SIZE, keyset_page
 from ..services.locations import LocationService
 
 router = APIRouter(
@@ -35,23 +37,22 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = auth.create_access_token(data={"sub": user.email})
-    refresh_token = auth.create_refresh_token(data={"sub": user.email})
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return auth.issue_tokens(user.email)
 
 @router.post("/refresh", response_model=schemas.Token)
 async def refresh_token(
     refresh_token: str,
     db: Session = Depends(get_db)
 ):
-    """Refresh access token using refresh token."""
+    """
+    Exchange a refresh token for a new access/refresh pair.
+
+    Refresh tokens are single use: the presented one is revoked, and presenting
+    it again revokes every token from the same login. Deleted or deactivated
+    users cannot refresh.
+    """
     token_data = auth.verify_token(refresh_token, token_type="refresh")
-    
+
     # Get user to ensure they still exist and are active
     user = db.query(models.User).filter(models.User.email == token_data.email).first()
     if not user or not user.is_active:
@@ -59,15 +60,19 @@ async def refresh_token(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
-    
-    access_token = auth.create_access_token(data={"sub": user.email})
-    new_refresh_token = auth.create_refresh_token(data={"sub": user.email})
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": new_refresh_token,
-        "token_type": "bearer"
-    }
+
+    auth.rotate_refresh_token(db, token_data)
+    return auth.issue_tokens(token_data.email, token_data.family_id)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    refresh_token: str,
+    db: Session = Depends(get_db)
+):
+    """Revoke the refresh token and every token issued from the same login."""
+    token_data = auth.verify_token(refresh_token, token_type="refresh")
+    auth.revoke_token_family(db, token_data, "logout")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.get("/me", response_model=schemas.UserWithRelations)
 async def get_current_user(
@@ -82,11 +87,19 @@ async def get_current_user(
         .limit(10)\
         .all()
     
-    # Load favorites
-    favorites = db.query(models.UserFavoriteBird)\
-        .filter(models.UserFavoriteBird.user_id == current_user.id)\
-        .order_by(models.UserFavoriteBird.added_date.desc())\
-        .all()
+    # Load favorites (first page only, unless legacy unbounded lists are enabled)
+    favorites_query = db.query(models.UserFavoriteBird)\
+        .filter(models.UserFavoriteBird.user_id == current_user.id)
+    favorites_next_cursor = None
+    if LEGACY_UNBOUNDED_LISTS:
+        favorites = favorites_query.order_by(models.UserFavoriteBird.added_date.desc()).all()
+    else:
+        favorites, favorites_next_cursor = keyset_page(
+            favorites_query,
+            models.UserFavoriteBird.added_date,
+            models.UserFavoriteBird.id,
+            limit=MAX_PAGE_SIZE,
+        )
     
     # Create response with relations
     user_dict = {
@@ -96,7 +109,8 @@ async def get_current_user(
         "is_active": current_user.is_active,
         "created_at": current_user.created_at,
         "recent_searches": recent_searches,
-        "favorites": favorites
+        "favorites": favorites,
+        "favorites_next_cursor": favorites_next_cursor
     }
     
     return user_dict
@@ -133,14 +147,26 @@ async def add_favorite(
 
 @router.get("/favorites", response_model=List[schemas.FavoriteBirdResponse])
 async def get_favorites(
+    response: Response,
+    limit: int = Query(50, ge=1),
+    cursor: Optional[str] = None,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's favorite birds."""
-    favorites = db.query(models.UserFavoriteBird)\
-        .filter(models.UserFavoriteBird.user_id == current_user.id)\
-        .order_by(models.UserFavoriteBird.added_date.desc())\
-        .all()
+    """Get user's favorite birds, newest first.
+
+    Paged by keyset; the next page cursor is returned in ``X-Next-Cursor``.
+    """
+    query = db.query(models.UserFavoriteBird)\
+        .filter(models.UserFavoriteBird.user_id == current_user.id)
+    if LEGACY_UNBOUNDED_LISTS:
+        return query.order_by(models.UserFavoriteBird.added_date.desc()).all()
+
+    favorites, next_cursor = keyset_page(
+        query, models.UserFavoriteBird.added_date, models.UserFavoriteBird.id, limit, cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return favorites
 
 @router.get("/favorites/check/{species_code}")
@@ -181,18 +207,72 @@ async def remove_favorite(
 
 @router.get("/searches", response_model=List[schemas.SearchHistoryResponse])
 async def get_search_history(
-    limit: int = 20,
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: Optional[str] = None,
     current_user: models.User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's search history."""
-    searches = db.query(models.UserSearch)\
-        .filter(models.UserSearch.user_id == current_user.id)\
-        .order_by(models.UserSearch.search_date.desc())\
-        .limit(limit)\
-        .all()
+    """Get user's search history, newest first.
+
+    ``limit`` is capped server-side; the next page cursor is returned in ``X-Next-Cursor``.
+    """
+    query = db.query(models.UserSearch)\
+        .filter(models.UserSearch.user_id == current_user.id)
+    if LEGACY_UNBOUNDED_LISTS:
+        return query.order_by(models.UserSearch.search_date.desc()).limit(limit).all()
+
+    searches, next_cursor = keyset_page(
+        query, models.UserSearch.search_date, models.UserSearch.id, limit, cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return searches
 
+@router.get("/notifications", response_model=List[schemas.NotificationResponse])
+async def get_notifications(
+    response: Response,
+    limit: int = Query(50, ge=1),
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get sightings of favorite species near the user's default location, newest first.
+
+    Paged by keyset; the next page cursor is returned in ``X-Next-Cursor`` and
+    the number of unread notifications in ``X-Unread-Count``.
+    """
+    query = db.query(models.Notification)\
+        .filter(models.Notification.user_id == current_user.id)
+    response.headers["X-Unread-Count"] = str(query.filter(models.Notification.is_read.is_(False)).count())
+    if unread_only:
+        query = query.filter(models.Notification.is_read.is_(False))
+
+    notifications, next_cursor = keyset_page(
+        query, models.Notification.created_at, models.Notification.id, limit, cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return notifications
+
+@router.post("/notifications/read", status_code=status.HTTP_204_NO_CONTENT)
+async def mark_notifications_read(
+    body: schemas.NotificationsRead,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Mark the given notifications (or all of them) as read."""
+    query = db.query(models.Notification).filter(
+        models.Notification.user_id == current_user.id,
+        models.Notification.is_read.is_(False)
+    )
+    if body.ids is not None:
+        query = query.filter(models.Notification.id.in_(body.ids))
+    query.update({"is_read": True}, synchronize_session=False)
+    db.commit()
+    return None
+
 @router.get("/locations", response_model=List[schemas.LocationResponse])
 async def get_locations(
     current_user: models.User = Depends(auth.get_current_active_user),
@@ -362,4 +442,146 @@ async def set_default_location(
     db.commit()
     db.refresh(location)
     
-    return location
\ No newline at end of file
+    return location
+
+@router.post("/locations/bulk", response_model=List[schemas.BulkItemResult])
+async def bulk_add_locations(
+    import_data: schemas.BulkLocationImport,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Add many saved locations at once; returns one result per input item."""
+    items = import_data.locations
+    results: Dict[int, schemas.BulkItemResult] = {}
+
+    # Dedupe by name within the request (first occurrence wins)
+    first_by_name: Dict[str, int] = {}
+    for index, item in enumerate(items):
+        if item.name in first_by_name:
+            results[index] = schemas.BulkItemResult(index=index, status="duplicate", detail="Repeated in request")
+        else:
+            first_by_name[item.name] = index
+
+    # One query for names the user already has
+    existing_names = {
+        name for (name,) in db.query(models.UserLocation.name).filter(
+            models.UserLocation.user_id == current_user.id,
+            models.UserLocation.name.in_(list(first_by_name))
+        )
+    }
+    pending = []
+    for name, index in first_by_name.items():
+        if name in existing_names:
+            results[index] = schemas.BulkItemResult(
+                index=index, status="exists", detail="Location with this name already exists"
+            )
+        else:
+            pending.append(index)
+
+    # Geocode each distinct value once, concurrently
+    geocoded = await LocationService.geocode_many(
+        (items[i].location_type, items[i].location_value) for i in pending
+    )
+
+    new_locations = []
+    for index in pending:
+        item = items[index]
+        coords = geocoded[(item.location_type, item.location_value)]
+        if isinstance(coords, HTTPException):
+            results[index] = schemas.BulkItemResult(index=index, status="error", detail=str(coords.detail))
+            continue
+        new_locations.append((index, models.UserLocation(
+            user_id=current_user.id,
+            name=item.name,
+            location_type=item.location_type,
+            location_value=item.location_value,
+            lat=coords[0],
+            lng=coords[1],
+            is_default=False
+        )))
+
+    # The last imported location marked default becomes the default
+    default_index = next(
+        (i for i, _ in reversed(new_locations) if items[i].is_default), None
+    )
+    if default_index is not None:
+        db.query(models.UserLocation).filter(
+            models.UserLocation.user_id == current_user.id
+        ).update({"is_default": False})
+        for index, location in new_locations:
+            location.is_default = index == default_index
+
+    # Single transaction for the whole batch
+    db.add_all([location for _, location in new_locations])
+    db.commit()
+    for index, location in new_locations:
+        results[index] = schemas.BulkItemResult(index=index, status="created", id=location.id)
+
+    return [results[i] for i in range(len(items))]
+
+@router.post("/favorites/bulk", response_model=List[schemas.BulkItemResult])
+async def bulk_add_favorites(
+    import_data: schemas.BulkFavoriteImport,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Add many favorite birds at once; returns one result per input item."""
+    items = import_data.favorites
+    results: Dict[int, schemas.BulkItemResult] = {}
+
+    # Dedupe by species within the request (first occurrence wins)
+    seen_names = set()
+    seen_codes = set()
+    pending = []
+    for index, item in enumerate(items):
+        if item.species_name in seen_names or item.species_code in seen_codes:
+            results[index] = schemas.BulkItemResult(index=index, status="duplicate", detail="Repeated in request")
+            continue
+        seen_names.add(item.species_name)
+        seen_codes.add(item.species_code)
+        pending.append(index)
+
+    # One query for species the user has already favorited, by name or code
+    existing = db.query(
+        models.UserFavoriteBird.species_name, models.UserFavoriteBird.species_code
+    ).filter(
+        models.UserFavoriteBird.user_id == current_user.id,
+        or_(
+            models.UserFavoriteBird.species_name.in_(list(seen_names)),
+            models.UserFavoriteBird.species_code.in_(list(seen_codes))
+        )
+    ).all()
+    existing_names = {name for name, _ in existing}
+    existing_codes = {code for _, code in existing}
+
+    new_favorites = []
+    for index in pending:
+        item = items[index]
+        if item.species_name in existing_names or item.species_code in existing_codes:
+            results[index] = schemas.BulkItemResult(index=index, status="exists", detail="Bird already in favorites")
+            continue
+        new_favorites.append((index, models.UserFavoriteBird(user_id=current_user.id, **item.model_dump())))
+
+    # Single transaction for the whole batch
+    db.add_all([favorite for _, favorite in new_favorites])
+    db.commit()
+    for index, favorite in new_favorites:
+        results[index] = schemas.BulkItemResult(index=index, status="created", id=favorite.id)
+
+    return [results[i] for i in range(len(items))]
+
+@router.get("/export", response_model=schemas.UserDataExport)
+async def export_user_data(
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Export all saved locations and favorites in the bulk import format."""
+    locations = db.query(models.UserLocation)\
+        .filter(models.UserLocation.user_id == current_user.id)\
+        .order_by(models.UserLocation.is_default.desc(), models.UserLocation.created_at.desc())\
+        .all()
+    favorites = db.query(models.UserFavoriteBird)\
+        .filter(models.UserFavoriteBird.user_id == current_user.id)\
+        .order_by(models.UserFavoriteBird.added_date.desc())\
+        .all()
+    return {"locations": locations, "favorites": favorites}
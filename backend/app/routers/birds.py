@@ -0,0 +1,160 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import asyncio
+import json
+
+from .. import models, schemas, auth
+from ..database import get_db
+from ..rate_limit import rate_limited
+from ..http_cache import (
+    HISTORIC_CACHE_CONTROL,
+    OBSERVATIONS_CACHE_CONTROL,
+    PRIVATE_HISTORIC_CACHE_CONTROL,
+    PRIVATE_OBSERVATIONS_CACHE_CONTROL,
+    conditional_json,
+)
+from ..services import BirdService, historic
+from ..services.dashboard import MAX_DASHBOARD_LOCATIONS, build_dashboard
+from ..services.live_feed import LIVE_FEED_HEARTBEAT_SECONDS, live_feed, max_subscriber_radius_km
+from ..services.observations import MAX_PAGE_SIZE, MAX_UPSTREAM_RADIUS_KM, query_observations, validate_date_param
+
+router = APIRouter(
+    prefix="/birds",
+    tags=["birds"]
+)
+
+@router.get(
+    "/rare",
+    response_model=list[schemas.ObservedBird],
+    dependencies=[Depends(rate_limited("rare"))],
+)
+async def rare_birds(
+    lat: float,
+    lng: float,
+    request: Request,
+    radius: int = 25,
+    sort: Optional[str] = Query(None, pattern="^(distance|date|count)$"),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD; only observations on or after this date"),
+    min_count: Optional[int] = Query(None, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    start_date: Optional[str] = Query(None, description="YYYY-MM-DD; with end_date, query past days instead of recent ones"),
+    end_date: Optional[str] = Query(None, description="YYYY-MM-DD inclusive end of the date range"),
+    current_user: Optional[models.User] = Depends(auth.get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """Fetch notable sightings from the eBird API.
+
+    Results include distance from the center and can be sorted, filtered and
+    paged server-side; the next page cursor is returned in ``X-Next-Cursor``
+    (409 once the observations behind it have been refetched and differ).
+    Responses carry an ETag and answer ``If-None-Match`` with 304.
+    With ``start_date``/``end_date`` the sightings come from eBird's per-day
+    historic lists, which are cached permanently once a day has settled. Those
+    lists have no notable flag: the range returns flagged records (pending or
+    accepted after review) and at most one per species per county and day.
+    """
+    validate_date_param(since, "since")
+    date_range = historic.parse_date_range(start_date, end_date)
+    # Fetch bird data using the service
+    if date_range:
+        region_codes = await historic.regions_for(lat, lng, radius)
+        observations = await historic.fetch_historic_notable(region_codes, *date_range, lat, lng, radius)
+    else:
+        observations = await BirdService.fetch_rare_birds(lat, lng, radius)
+    birds, total, next_cursor = query_observations(
+        observations, lat, lng,
+        sort=sort, since=since, min_count=min_count, limit=limit, cursor=cursor,
+        scope=("rare", radius, start_date, end_date),
+    )
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+
+    # Save search to user's history if authenticated (once, not for every page)
+    if current_user and cursor is None:
+        BirdService.save_user_search(
+            db=db,
+            user=current_user,
+            lat=lat,
+            lng=lng,
+            radius=radius,
+            bird_count=total
+        )
+
+    if date_range and historic.is_settled_range(date_range[1]):
+        cache_control = PRIVATE_HISTORIC_CACHE_CONTROL if current_user else HISTORIC_CACHE_CONTROL
+    else:
+        cache_control = PRIVATE_OBSERVATIONS_CACHE_CONTROL if current_user else OBSERVATIONS_CACHE_CONTROL
+    return conditional_json(request, birds, cache_control, vary=["Authorization"], extra_headers=headers)
+
+
+@router.get(
+    "/dashboard",
+    response_model=schemas.DashboardResponse,
+    dependencies=[Depends(rate_limited("dashboard"))],
+)
+async def dashboard(
+    request: Request,
+    radius: int = Query(25, ge=1, le=MAX_UPSTREAM_RADIUS_KM),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Notable sightings around every saved location of the current user.
+
+    Overlapping location circles share upstream fetches, which run concurrently.
+    Each sighting appears once in ``observations``; every location lists the
+    indices of the ones within ``radius`` km, with their distances. Unlike
+    ``/birds/rare`` this is not recorded in search history.
+    """
+    locations = db.query(models.UserLocation)\
+        .filter(models.UserLocation.user_id == current_user.id)\
+        .order_by(models.UserLocation.is_default.desc(), models.UserLocation.created_at.desc())\
+        .limit(MAX_DASHBOARD_LOCATIONS)\
+        .all()
+    result = await build_dashboard(locations, radius)
+    return conditional_json(request, result, PRIVATE_OBSERVATIONS_CACHE_CONTROL, vary=["Authorization"])
+
+
+@router.get("/rare/stream")
+async def rare_birds_stream(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: int = Query(25, ge=1, le=max_subscriber_radius_km()),
+):
+    """Server-Sent Events feed of new notable sightings within ``radius`` km.
+
+    Sends ``sightings`` events carrying a JSON list of new observations (load the
+    current ones from ``/birds/rare`` first). A ``reset`` event means the client
+    fell behind and should reload. Everyone watching the same area tile shares
+    one upstream poller.
+    """
+    async def events():
+        feed, subscriber = live_feed.subscribe(lat, lng, radius)
+        try:
+            yield "retry: 10000\n\n"
+            while True:
+                if subscriber.dropped:
+                    yield "event: reset\ndata: {}\n\n"
+                    break
+                try:
+                    birds = await asyncio.wait_for(subscriber.queue.get(), timeout=LIVE_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: sightings\ndata: {json.dumps(jsonable_encoder(birds), separators=(',', ':'))}\n\n"
+        finally:
+            live_feed.unsubscribe(feed, subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,47 @@
+import ipaddress
+import os
+import secrets
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from .. import admission, logging_config, rate_limit
+from ..services.live_feed import live_feed
+from ..services.response_cache import response_cache
+
+# Bearer token for scrapers; without one, only clients on this host may read the counters
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def require_metrics_access(request: Request) -> None:
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Invalid metrics token",
+                                headers={"WWW-Authenticate": "Bearer"})
+        return
+    try:
+        local = request.client is not None and ipaddress.ip_address(request.client.host).is_loopback
+    except ValueError:
+        local = False
+    if not local:
+        raise HTTPException(status_code=403, detail="Metrics are only served to local clients")
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(require_metrics_access)]
+)
+
+
+@router.get("")
+async def metrics() -> Dict[str, Any]:
+    """Load-shedding, rate limit, cache, live feed and logging counters for this worker."""
+    return {
+        "admission": admission.stats(),
+        "rate_limit": rate_limit.stats(),
+        "response_cache": response_cache.stats(),
+        "live_feed": live_feed.stats(),
+        "logging": logging_config.stats(),
+    }
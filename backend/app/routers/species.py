@@ -1,22 +1,61 @@
+import asyncio
 from datetime import datetime, timezone
 from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
 
 from .. import schemas
+from ..database import get_db
+from ..http_cache import (
+    HISTORIC_CACHE_CONTROL,
+    OBSERVATIONS_CACHE_CONTROL,
+    SPECIES_IMAGES_CACHE_CONTROL,
+    SUGGEST_CACHE_CONTROL,
+    conditional_json,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from ..rate_limit import rate_limited
+from ..services import historic
+from ..services.hotspots import HotspotService
 from ..services.locations import LocationService
 from ..services import species as species_service
+from ..services.observations import MAX_PAGE_SIZE, query_observations, validate_date_param
+from ..services.regions import REGION_CODE_PATTERN, resolve_region
+from ..services.species_images import MAX_SPECIES_IMAGE_CODES, species_images
 
 
 router = APIRouter(prefix="/species", tags=["species"])
 
 
 @router.get("/suggest", response_model=List[schemas.SpeciesSuggestion])
-async def suggest_species(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=25)):
-    """Return species suggestions for autocomplete."""
-    suggestions = await species_service.search_species_suggestions(q, limit)
+async def suggest_species(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=25),
+    region: Optional[str] = Query(None, pattern=REGION_CODE_PATTERN, description="eBird region code, e.g. US-CO"),
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+):
+    """Return species suggestions for autocomplete.
+
+    Pass ``region`` or ``lat``/``lng`` to rank species reported in that region first.
+    The ETag depends only on the data versions and the query, so a revalidation
+    is answered with 304 before searching.
+    """
+    region_code = region
+    if region_code is None and lat is not None and lng is not None:
+        region_code = await resolve_region(lat, lng)
+    version = await species_service.suggestion_data_version(region_code)
+    etag = make_etag("suggest", version, q.lower().strip(), limit, region_code)
+    if etag_matches(request, etag):
+        return not_modified(etag, SUGGEST_CACHE_CONTROL)
+
+    suggestions = await species_service.search_species_suggestions(q, limit, region_code)
     # Map into schema list
-    return [
+    results = [
         schemas.SpeciesSuggestion(
             species_name=item.get("species_name", ""),
             species_code=item.get("species_code", ""),
@@ -24,6 +63,27 @@ async def suggest_species(q: str = Query(..., min_length=1), limit: int = Query(
         )
         for item in suggestions
     ]
+    return conditional_json(request, results, SUGGEST_CACHE_CONTROL, etag=etag)
+
+
+@router.get("/images", response_model=List[schemas.SpeciesImage])
+async def species_image_batch(
+    request: Request,
+    codes: str = Query(..., min_length=1, description="Comma-separated eBird species codes"),
+):
+    """Photos for up to 100 species codes, in the order given.
+
+    Meant to be called once per results page. Lookups are cached per species on
+    the server; species without a photo come back with ``url`` null.
+    """
+    species_codes = list(dict.fromkeys(code.strip() for code in codes.split(",") if code.strip()))
+    if not species_codes:
+        raise HTTPException(status_code=400, detail="Provide at least one species code")
+    if len(species_codes) > MAX_SPECIES_IMAGE_CODES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SPECIES_IMAGE_CODES} species codes per request")
+    images = await species_images.resolve(species_codes)
+    results = [schemas.SpeciesImage(**images[code]) for code in species_codes]
+    return conditional_json(request, results, SPECIES_IMAGES_CACHE_CONTROL)
 
 
 def _parse_cutoff_to_back_days(cutoff_date: Optional[str]) -> Optional[int]:
@@ -39,8 +99,13 @@ def _parse_cutoff_to_back_days(cutoff_date: Optional[str]) -> Optional[int]:
         raise HTTPException(status_code=400, detail="Invalid cutoff_date format. Use YYYY-MM-DD")
 
 
-@router.get("/observations", response_model=List[schemas.ObservedBird])
+@router.get(
+    "/observations",
+    response_model=List[schemas.ObservedBird],
+    dependencies=[Depends(rate_limited("observations"))],
+)
 async def species_observations(
+    request: Request,
     species_code: str = Query(..., min_length=2),
     lat: Optional[float] = None,
     lng: Optional[float] = None,
@@ -48,8 +113,25 @@ async def species_observations(
     location_value: Optional[str] = None,
     radius_km: int = Query(25, ge=1, le=100),
     cutoff_date: Optional[str] = Query(None, description="YYYY-MM-DD inclusive start date"),
+    sort: Optional[str] = Query(None, pattern="^(distance|date|count)$"),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD; only observations on or after this date"),
+    min_count: Optional[int] = Query(None, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    start_date: Optional[str] = Query(None, description="YYYY-MM-DD; with end_date, query past days instead of recent ones"),
+    end_date: Optional[str] = Query(None, description="YYYY-MM-DD inclusive end of the date range"),
 ):
-    """Get nearby observations for a species by code. Provide lat/lng or a location (zip or city)."""
+    """Get nearby observations for a species by code. Provide lat/lng or a location (zip or city).
+
+    Results include distance from the center and can be sorted, filtered and
+    paged server-side; the next page cursor is returned in ``X-Next-Cursor``
+    (409 once the observations behind it have been refetched and differ).
+    Responses carry an ETag and answer ``If-None-Match`` with 304.
+    With ``start_date``/``end_date`` (instead of ``cutoff_date``) observations
+    come from eBird's per-day historic lists, cached permanently once settled.
+    """
+    validate_date_param(since, "since")
+    date_range = historic.parse_date_range(start_date, end_date)
     # Resolve location
     coords: Optional[Tuple[float, float]] = None
     if lat is not None and lng is not None:
@@ -60,15 +142,54 @@ async def species_observations(
     else:
         raise HTTPException(status_code=400, detail="Provide lat/lng or location_type and location_value")
 
-    back_days = _parse_cutoff_to_back_days(cutoff_date)
-
-    observations = await species_service.fetch_species_observations(
-        species_code=species_code,
-        lat=coords[0],
-        lng=coords[1],
-        radius_km=radius_km,
-        back_days=back_days,
+    if date_range:
+        region_codes = await historic.regions_for(coords[0], coords[1], radius_km)
+        observations = await historic.fetch_historic_species(
+            region_codes, species_code, *date_range, coords[0], coords[1], radius_km
+        )
+    else:
+        back_days = _parse_cutoff_to_back_days(cutoff_date)
+        observations = await species_service.fetch_species_observations(
+            species_code=species_code,
+            lat=coords[0],
+            lng=coords[1],
+            radius_km=radius_km,
+            back_days=back_days,
+        )
+    page, total, next_cursor = query_observations(
+        observations, coords[0], coords[1],
+        sort=sort, since=since, min_count=min_count, limit=limit, cursor=cursor,
+        scope=("species", species_code, radius_km, cutoff_date, start_date, end_date),
     )
-    return observations
+    headers = {"X-Total-Count": str(total)}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    settled = date_range is not None and historic.is_settled_range(date_range[1])
+    cache_control = HISTORIC_CACHE_CONTROL if settled else OBSERVATIONS_CACHE_CONTROL
+    return conditional_json(request, page, cache_control, extra_headers=headers)
+
 
+@router.get("/hotspots", response_model=List[schemas.HotspotResponse])
+async def nearby_hotspots(
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    location_type: Optional[str] = Query(None, pattern="^(zip|city)$"),
+    location_value: Optional[str] = None,
+    radius_km: float = Query(25, gt=0, le=200),
+    k: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Nearest eBird hotspots to a point, closest first.
+
+    Served from a locally synced copy of the hotspot lists for the configured
+    regions (``HOTSPOT_REGIONS``); no eBird call is made per request.
+    """
+    if lat is not None and lng is not None:
+        coords = (lat, lng)
+    elif location_type and location_value:
+        coords = await LocationService.geocode_location(location_type, location_value)
+    else:
+        raise HTTPException(status_code=400, detail="Provide lat/lng or location_type and location_value")
 
+    # The first call after a sync rebuilds the index from the database
+    return await asyncio.to_thread(HotspotService.nearest, db, coords[0], coords[1], radius_km=radius_km, k=k)
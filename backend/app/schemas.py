@@ -34,6 +34,9 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    jti: Optional[str] = None
+    family_id: Optional[str] = None
+    expires_at: Optional[int] = None
 
 # Search history schemas
 class SearchHistoryBase(BaseModel):
@@ -75,6 +78,8 @@ class FavoriteBirdResponse(FavoriteBirdBase):
 class UserWithRelations(UserResponse):
     recent_searches: List[SearchHistoryResponse] = []
     favorites: List[FavoriteBirdResponse] = []
+    # Set when there are more favorites; pass as cursor to /auth/favorites
+    favorites_next_cursor: Optional[str] = None
 
 # Bird observation schemas
 class ObservedBird(BaseModel):
@@ -87,6 +92,32 @@ class ObservedBird(BaseModel):
     lng: float
     how_many: Optional[int] = None
     user_display_name: Optional[str] = None
+    distance_km: Optional[float] = None  # From the query center, filled in server-side
+
+class DashboardLocation(BaseModel):
+    location_id: int
+    name: str
+    lat: float
+    lng: float
+    observation_indices: List[int]  # Into DashboardResponse.observations
+    distances_km: List[float]  # Parallel to observation_indices
+
+class DashboardResponse(BaseModel):
+    radius_km: int
+    locations: List[DashboardLocation]
+    observations: List[ObservedBird]  # Each sighting once, shared by every location that sees it
+    upstream_fetches: int
+
+# Hotspot schemas
+class HotspotResponse(BaseModel):
+    loc_id: str
+    name: str
+    lat: float
+    lng: float
+    subnational1_code: Optional[str] = None
+    latest_obs_dt: Optional[str] = None
+    num_species_all_time: Optional[int] = None
+    distance_km: float
 
 # Location schemas
 class LocationBase(BaseModel):
@@ -112,8 +143,53 @@ class LocationResponse(LocationBase):
     class Config:
         from_attributes = True
 
+class NotificationResponse(BaseModel):
+    id: int
+    species_code: str
+    species_name: str
+    loc_id: Optional[str] = None
+    location_name: Optional[str] = None
+    lat: float
+    lng: float
+    distance_km: float  # From the user's default location
+    obs_date: str
+    how_many: Optional[int] = None
+    is_read: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class NotificationsRead(BaseModel):
+    # Omit to mark every notification as read
+    ids: Optional[List[int]] = Field(None, max_length=500)
+
 # Species suggestion schema
 class SpeciesSuggestion(BaseModel):
     species_name: str
     species_code: str
-    scientific_name: Optional[str] = None
\ No newline at end of file
+    scientific_name: Optional[str] = None
+
+class SpeciesImage(BaseModel):
+    species_code: str
+    url: Optional[str] = None  # None when no photo was found
+    thumbnail_url: Optional[str] = None
+    attribution: Optional[str] = None
+    source_url: Optional[str] = None  # Article or file page the photo comes from
+
+# Bulk import/export schemas
+class BulkLocationImport(BaseModel):
+    locations: List[LocationCreate] = Field(..., min_length=1, max_length=500)
+
+class BulkFavoriteImport(BaseModel):
+    favorites: List[FavoriteBirdCreate] = Field(..., min_length=1, max_length=500)
+
+class BulkItemResult(BaseModel):
+    index: int  # Position in the request list
+    status: str  # "created", "duplicate" (repeated in request), "exists" or "error"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class UserDataExport(BaseModel):
+    locations: List[LocationResponse] = []
+    favorites: List[FavoriteBirdResponse] = []
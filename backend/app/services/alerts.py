@@ -0,0 +1,264 @@
+"""
+Notifications when a user's favorite species is seen near their default location.
+
+Every favorite is turned into a (species, location tile) pair. Users who
+favorite the same species and live in the same tile share that pair, so each run
+fetches each pair once, around the tile center, however many users watch it.
+Upstream cost therefore grows with the number of distinct pairs, not users. New
+observations are found by diffing each fetch against the pair's seen set in
+``alert_seen_observations``. They become ``notifications`` rows for every
+watcher within ``ALERT_RADIUS_KM``. The first fetch of a pair only records what
+is already there.
+
+Several workers can run the job: each pair is claimed with a conditional
+update, so only one of them checks it per interval.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from .observations import MAX_UPSTREAM_RADIUS_KM, ObservationBatch, distance_km, haversine_km, within_radius
+from .species import fetch_species_observations
+
+logger = logging.getLogger(__name__)
+
+ALERTS_INTERVAL_SECONDS = float(os.getenv("ALERTS_INTERVAL_SECONDS", "900"))
+ALERT_TILE_DEGREES = float(os.getenv("ALERT_TILE_DEGREES", "0.25"))
+ALERT_RADIUS_KM = float(os.getenv("ALERT_RADIUS_KM", "25"))
+# eBird "back" window; seen rows older than this can never be reported again and are purged
+ALERT_BACK_DAYS = int(os.getenv("ALERT_BACK_DAYS", "3"))
+ALERT_FETCH_CONCURRENCY = int(os.getenv("ALERT_FETCH_CONCURRENCY", "4"))
+
+PairKey = Tuple[str, int, int]
+
+
+class Watcher(NamedTuple):
+    user_id: int
+    species_name: str
+    lat: float
+    lng: float
+
+
+def tile_for(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / ALERT_TILE_DEGREES), math.floor(lng / ALERT_TILE_DEGREES)
+
+
+def tile_center(tile_lat: int, tile_lng: int) -> Tuple[float, float]:
+    return (tile_lat + 0.5) * ALERT_TILE_DEGREES, (tile_lng + 0.5) * ALERT_TILE_DEGREES
+
+
+def alert_radii() -> Tuple[float, int]:
+    """(alert radius, fetch radius): one fetch at the tile center must cover any watcher in it."""
+    half_diagonal = distance_km(0, 0, ALERT_TILE_DEGREES / 2, ALERT_TILE_DEGREES / 2)
+    alert_radius = min(ALERT_RADIUS_KM, MAX_UPSTREAM_RADIUS_KM - half_diagonal)
+    return alert_radius, min(MAX_UPSTREAM_RADIUS_KM, math.ceil(alert_radius + half_diagonal))
+
+
+def _window_start(back_days: int = ALERT_BACK_DAYS) -> str:
+    """Oldest observation date handled; a day of slack for time zones."""
+    return (datetime.now(timezone.utc) - timedelta(days=back_days + 1)).strftime("%Y-%m-%d")
+
+
+def _obs_key(batch: ObservationBatch, i: int) -> str:
+    raw = "\x1f".join(str(part) for part in (batch.loc_ids[i], batch.dates[i], batch.count(i), batch.observers[i]))
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+class AlertService:
+    """Batched favorite-species alert job."""
+
+    @staticmethod
+    def collect_watchers(db: Session) -> Dict[PairKey, List[Watcher]]:
+        """Group every active user's favorites by (species, tile of their default location)."""
+        rows = db.query(
+            models.UserFavoriteBird.user_id,
+            models.UserFavoriteBird.species_code,
+            models.UserFavoriteBird.species_name,
+            models.UserLocation.lat,
+            models.UserLocation.lng,
+        ).join(
+            models.UserLocation,
+            (models.UserLocation.user_id == models.UserFavoriteBird.user_id) & models.UserLocation.is_default.is_(True),
+        ).join(
+            models.User, models.User.id == models.UserFavoriteBird.user_id
+        ).filter(models.User.is_active.is_(True)).all()
+
+        pairs: Dict[PairKey, List[Watcher]] = defaultdict(list)
+        for user_id, species_code, species_name, lat, lng in rows:
+            pairs[(species_code, *tile_for(lat, lng))].append(Watcher(user_id, species_name, lat, lng))
+        return dict(pairs)
+
+    @staticmethod
+    def claim_pairs(db: Session, keys: List[PairKey], now: int, interval: float) -> Dict[PairKey, models.AlertPair]:
+        """Create missing pair rows and claim the ones not checked within ``interval``."""
+        pair = models.AlertPair
+        existing = {
+            (p.species_code, p.tile_lat, p.tile_lng): p
+            for p in db.query(pair).filter(pair.species_code.in_({key[0] for key in keys}))
+        }
+        for key in keys:
+            if key not in existing:
+                db.add(pair(species_code=key[0], tile_lat=key[1], tile_lng=key[2]))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another worker created it first; the claim below sorts out who checks it
+                    db.rollback()
+        rows = {
+            (p.species_code, p.tile_lat, p.tile_lng): p
+            for p in db.query(pair).filter(pair.species_code.in_({key[0] for key in keys}))
+        }
+
+        claimed: Dict[PairKey, models.AlertPair] = {}
+        stale_before = now - interval / 2
+        for key in keys:
+            row = rows.get(key)
+            if row is None:
+                continue
+            result = db.execute(
+                update(pair)
+                .where(pair.id == row.id)
+                .where(or_(pair.last_checked_at.is_(None), pair.last_checked_at < stale_before))
+                .values(last_checked_at=now)
+            )
+            if result.rowcount == 1:
+                claimed[key] = row
+        db.commit()
+        for row in claimed.values():
+            db.refresh(row)
+        return claimed
+
+    @staticmethod
+    def record(
+        db: Session,
+        pair: models.AlertPair,
+        batch: ObservationBatch,
+        watchers: List[Watcher],
+        alert_radius_km: float,
+    ) -> int:
+        """Diff ``batch`` against the pair's seen set and notify watchers of new observations.
+
+        Observations older than the fetch window are ignored, so forgetting them
+        in ``purge_seen`` cannot make them look new. Returns the number of
+        notifications written.
+        """
+        since = _window_start()
+        recent = [i for i in range(len(batch)) if batch.dates[i] >= since]
+        keys = {i: _obs_key(batch, i) for i in recent}
+        seen = {
+            key for (key,) in db.query(models.AlertSeenObservation.obs_key).filter(
+                models.AlertSeenObservation.pair_id == pair.id,
+                models.AlertSeenObservation.obs_key.in_(list(keys.values())),
+            )
+        }
+        new = []
+        for i, key in keys.items():
+            if key not in seen:
+                seen.add(key)  # The same sighting can be listed twice
+                new.append(i)
+        for i in new:
+            db.add(models.AlertSeenObservation(pair_id=pair.id, obs_key=keys[i], obs_date=batch.dates[i]))
+
+        written = 0
+        if pair.baselined and new:
+            for watcher in watchers:
+                distances = haversine_km(watcher.lat, watcher.lng, batch.lats, batch.lngs)
+                nearby = set(within_radius(distances, alert_radius_km))
+                for i in new:
+                    if i not in nearby:
+                        continue
+                    db.add(models.Notification(
+                        user_id=watcher.user_id,
+                        species_code=pair.species_code,
+                        species_name=batch.species[i] or watcher.species_name,
+                        loc_id=batch.loc_ids[i],
+                        location_name=batch.locs[i],
+                        lat=float(batch.lats[i]),
+                        lng=float(batch.lngs[i]),
+                        distance_km=round(float(distances[i]), 3),
+                        obs_date=batch.dates[i],
+                        how_many=batch.count(i),
+                    ))
+                    written += 1
+        pair.baselined = True
+        db.commit()
+        return written
+
+    @staticmethod
+    def purge_seen(db: Session, back_days: int = ALERT_BACK_DAYS) -> int:
+        """Forget observations older than the fetch window; eBird will not return them again."""
+        result = db.execute(
+            delete(models.AlertSeenObservation).where(models.AlertSeenObservation.obs_date < _window_start(back_days))
+        )
+        db.commit()
+        return result.rowcount
+
+
+async def run_alerts() -> Dict[str, int]:
+    """Run one alert pass with its own session (for the periodic job)."""
+    from ..database import SessionLocal, get_engine
+
+    get_engine()
+    alert_radius_km, fetch_radius_km = alert_radii()
+
+    def claim():
+        db = SessionLocal()
+        try:
+            watchers = AlertService.collect_watchers(db)
+            claimed = AlertService.claim_pairs(db, list(watchers), int(time.time()), ALERTS_INTERVAL_SECONDS)
+            # Plain values: the rows are used again from another thread and session
+            return {key: (pair.id, watchers[key]) for key, pair in claimed.items()}
+        finally:
+            db.close()
+
+    claimed = await asyncio.to_thread(claim)
+    semaphore = asyncio.Semaphore(max(1, ALERT_FETCH_CONCURRENCY))
+
+    async def fetch(key: PairKey) -> Optional[ObservationBatch]:
+        species_code, tile_lat, tile_lng = key
+        lat, lng = tile_center(tile_lat, tile_lng)
+        async with semaphore:
+            try:
+                return await fetch_species_observations(
+                    species_code, lat, lng, radius_km=fetch_radius_km, back_days=ALERT_BACK_DAYS
+                )
+            except HTTPException as e:
+                logger.warning("Alert fetch for %s in tile (%s, %s) failed: %s", species_code, tile_lat, tile_lng, e.detail)
+                return None
+
+    keys = list(claimed)
+    batches = await asyncio.gather(*(fetch(key) for key in keys))
+
+    def record():
+        db = SessionLocal()
+        stats = {"pairs": len(keys), "fetched": 0, "notifications": 0}
+        try:
+            for key, batch in zip(keys, batches):
+                if batch is None:
+                    continue
+                pair_id, watchers = claimed[key]
+                pair = db.get(models.AlertPair, pair_id)
+                stats["fetched"] += 1
+                stats["notifications"] += AlertService.record(db, pair, batch, watchers, alert_radius_km)
+            stats["purged"] = AlertService.purge_seen(db)
+        finally:
+            db.close()
+        return stats
+
+    stats = await asyncio.to_thread(record)
+    if stats["notifications"]:
+        logger.info("Alert run checked %d pairs and wrote %d notifications", stats["pairs"], stats["notifications"])
+    return stats
@@ -1,18 +1,21 @@
 import httpx
 import os
 import logging
-from typing import List, Optional
+from typing import Optional
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-from .. import models, schemas
+from .. import models
+from ..http_client import error_excerpt, get_client
+from .observations import ObservationBatch, SupersetCache
+from .response_cache import cached_get
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+EBIRD_API_BASE_URL = os.getenv("EBIRD_API_BASE_URL", "https://api.ebird.org/v2")
+EBIRD_API_URL = f"{EBIRD_API_BASE_URL}/data/obs/geo/recent/notable"
 
-EBIRD_API_URL = "https://api.ebird.org/v2/data/obs/geo/recent/notable"
+# Notable sightings fetched at the max radius per center; smaller radii are filtered locally
+_rare_birds_cache = SupersetCache()
 
 class BirdService:
     """Service for handling bird data operations."""
@@ -22,7 +25,7 @@ class BirdService:
         lat: float,
         lng: float,
         radius: int = 25
-    ) -> List[schemas.ObservedBird]:
+    ) -> ObservationBatch:
         """
         Fetch notable bird sightings from the eBird API.
         
@@ -32,11 +35,27 @@ class BirdService:
             radius: Search radius in kilometers (default: 25)
             
         Returns:
-            List of ObservedBird objects containing sighting information
+            ObservationBatch of the sightings within ``radius``
             
         Raises:
             HTTPException: If the API request fails
         """
+        return await _rare_birds_cache.get(
+            "notable", lat, lng, radius, BirdService._fetch_notable_from_ebird
+        )
+
+    @staticmethod
+    async def _fetch_notable_from_ebird(
+        lat: float,
+        lng: float,
+        radius: int,
+        use_cache: bool = True
+    ) -> ObservationBatch:
+        """Call the eBird notable-observations endpoint for one circle.
+
+        ``use_cache=False`` skips the persistent response cache, for callers
+        that need sightings newer than its TTL.
+        """
         api_key = os.getenv("EBIRD_API_KEY", "")
         if not api_key:
             logger.error("EBIRD_API_KEY not found in environment variables")
@@ -48,48 +67,39 @@ class BirdService:
         headers = {"X-eBirdApiToken": api_key}
         params = {"lat": lat, "lng": lng, "dist": radius}
         
-        logger.info(f"Making eBird API request to {EBIRD_API_URL} with params: {params}")
+        logger.info("Making eBird API request to %s with params: %s", EBIRD_API_URL, params)
         
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                response = await client.get(
+        try:
+            if use_cache:
+                response = await cached_get(
+                    "ebird_notable",
                     EBIRD_API_URL,
                     params=params,
-                    headers=headers
-                )
-                response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"eBird API error: {e.response.status_code} - {e.response.text}")
-                raise HTTPException(
-                    status_code=e.response.status_code,
-                    detail=f"Failed to fetch bird data: {e.response.text}"
-                )
-            except httpx.RequestError as e:
-                logger.error(f"Request error: {str(e)}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="Service temporarily unavailable"
+                    headers=headers,
+                    timeout=10
                 )
-            
-            data = response.json()
-        
-        birds = []
-        for item in data:
-            birds.append(
-                schemas.ObservedBird(
-                    species=item.get("comName", "unknown"),
-                    species_code=item.get("speciesCode", ""),
-                    loc=item.get("locName", ""),
-                    loc_id=item.get("locId", ""),
-                    date=item.get("obsDt", ""),
-                    lat=item.get("lat", 0.0),
-                    lng=item.get("lng", 0.0),
-                    how_many=item.get("howMany"),
-                    user_display_name=item.get("userDisplayName"),
+            else:
+                response = await get_client().get(
+                    EBIRD_API_URL,
+                    params=params,
+                    headers=headers,
+                    timeout=10
                 )
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error("eBird API error: %s - %s", e.response.status_code, error_excerpt(e.response))
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail="Failed to fetch bird data"
             )
-        
-        return birds
+        except httpx.RequestError as e:
+            logger.error("Request error: %s", str(e))
+            raise HTTPException(
+                status_code=503,
+                detail="Service temporarily unavailable"
+            )
+
+        return ObservationBatch.from_ebird(response.json())
     
     @staticmethod
     def save_user_search(
@@ -125,5 +135,5 @@ class BirdService:
         db.commit()
         db.refresh(search_record)
         
-        logger.info(f"Saved search for user {user.email}: {bird_count} birds found")
+        logger.info("Saved search for user %s: %s birds found", user.id, bird_count)
         return search_record
\ No newline at end of file
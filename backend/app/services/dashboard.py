@@ -0,0 +1,130 @@
+"""
+Notable sightings for all of a user's saved locations in one call.
+
+Saved locations tend to cluster (home, work, a favourite park), so their
+circles overlap. Instead of one upstream fetch per location, the circles are
+grouped into as few fetch circles of ``MAX_UPSTREAM_RADIUS_KM`` as a greedy
+pass finds, the groups are fetched concurrently, and each observation is sent
+once with every location referring to it by index.
+"""
+
+import asyncio
+from typing import Dict, List, Sequence, Tuple
+
+from .. import models, schemas
+from ..tracing import span
+from .birds import BirdService
+from .observations import MAX_UPSTREAM_RADIUS_KM, ObservationBatch, distance_km, haversine_km, within_radius
+
+SightingKey = Tuple[str, str, str, int, str]
+
+# Locations beyond this (default location first, then newest) are left off the dashboard
+MAX_DASHBOARD_LOCATIONS = 50
+
+
+class FetchGroup:
+    """One upstream fetch circle and the saved locations it fully covers."""
+
+    __slots__ = ("lat", "lng", "members")
+
+    def __init__(self, lat: float, lng: float, members: List[int]):
+        self.lat = lat
+        self.lng = lng
+        self.members = members
+
+
+def _enclosing_center(points: Sequence[Tuple[float, float]]) -> Tuple[float, float]:
+    """Center of the lat/lng bounding box; close to the smallest enclosing circle at these scales."""
+    lats = [p[0] for p in points]
+    lngs = [p[1] for p in points]
+    return (min(lats) + max(lats)) / 2, (min(lngs) + max(lngs)) / 2
+
+
+def _covers(center: Tuple[float, float], points: Sequence[Tuple[float, float]], radius_km: float, fetch_radius_km: float) -> bool:
+    return all(distance_km(center[0], center[1], lat, lng) + radius_km <= fetch_radius_km for lat, lng in points)
+
+
+def plan_fetches(
+    points: Sequence[Tuple[float, float]],
+    radius_km: float,
+    fetch_radius_km: float = MAX_UPSTREAM_RADIUS_KM,
+) -> List[FetchGroup]:
+    """Group circles of ``radius_km`` around ``points`` into few covering fetch circles.
+
+    Greedy: each group starts from the densest remaining point (most neighbours
+    that could share a fetch) and absorbs the nearest points for as long as one
+    circle of ``fetch_radius_km`` still contains every member's whole circle.
+    The exact minimum cover is NP-hard; the greedy result is not always optimal.
+    """
+    # Two circles can share a fetch only if their centers are this close
+    reach = 2 * (fetch_radius_km - radius_km)
+    remaining = set(range(len(points)))
+    groups: List[FetchGroup] = []
+    while remaining:
+        neighbours = {
+            i: [j for j in remaining if distance_km(*points[i], *points[j]) <= reach]
+            for i in remaining
+        }
+        seed = max(remaining, key=lambda i: (len(neighbours[i]), -i))
+        members = [seed]
+        center = points[seed]
+        for j in sorted(neighbours[seed], key=lambda j: (distance_km(*points[seed], *points[j]), j)):
+            if j == seed:
+                continue
+            candidate = _enclosing_center([points[k] for k in members + [j]])
+            if _covers(candidate, [points[k] for k in members + [j]], radius_km, fetch_radius_km):
+                members.append(j)
+                center = candidate
+        groups.append(FetchGroup(center[0], center[1], sorted(members)))
+        remaining.difference_update(members)
+    return groups
+
+
+def _sighting_key(batch: ObservationBatch, i: int) -> SightingKey:
+    return batch.species_codes[i], batch.loc_ids[i], batch.dates[i], batch.how_many[i], batch.observers[i] or ""
+
+
+async def build_dashboard(locations: Sequence[models.UserLocation], radius_km: int) -> schemas.DashboardResponse:
+    """Fetch and split notable sightings for ``locations``, deduplicated across them.
+
+    ``radius_km`` must not exceed ``MAX_UPSTREAM_RADIUS_KM``.
+    """
+    points = [(location.lat, location.lng) for location in locations]
+    groups = plan_fetches(points, radius_km)
+    # Through the observation cache: a lone location's fetch is the same one /birds/rare makes
+    batches = await asyncio.gather(
+        *(BirdService.fetch_rare_birds(group.lat, group.lng, MAX_UPSTREAM_RADIUS_KM) for group in groups)
+    )
+
+    observations: List[schemas.ObservedBird] = []
+    index_by_key: Dict[SightingKey, int] = {}
+    results: Dict[int, schemas.DashboardLocation] = {}
+    with span("build"):
+        for group, batch in zip(groups, batches):
+            for member in group.members:
+                location = locations[member]
+                distances = haversine_km(location.lat, location.lng, batch.lats, batch.lngs)
+                indices, member_distances = [], []
+                for i in within_radius(distances, radius_km):
+                    key = _sighting_key(batch, i)
+                    shared = index_by_key.get(key)
+                    if shared is None:
+                        shared = index_by_key[key] = len(observations)
+                        observations.append(batch.to_model(i))
+                    indices.append(shared)
+                    member_distances.append(round(float(distances[i]), 3))
+                results[member] = schemas.DashboardLocation(
+                    location_id=location.id,
+                    name=location.name,
+                    lat=location.lat,
+                    lng=location.lng,
+                    observation_indices=indices,
+                    distances_km=member_distances,
+                )
+
+    return schemas.DashboardResponse(
+        radius_km=radius_km,
+        locations=[results[i] for i in range(len(locations))],
+        observations=observations,
+        upstream_fetches=len(groups),
+    )
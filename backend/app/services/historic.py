@@ -0,0 +1,413 @@
+"""
+Date-range observations from eBird's historic per-day endpoint.
+
+``/data/obs/{region}/historic/{y}/{m}/{d}`` returns one region's observations
+for one day, but only one record per species: the most recent with
+``rank=mrec``, the first with ``rank=create``. So a search circle is covered
+by the county-level regions (eBird subnational2) whose bounds it overlaps,
+across state borders, rather than by a single state. The remaining cap is one
+sighting per species per county and day.
+
+A range query fetches its region-days concurrently and filters them locally by
+distance and species. At most ``HISTORIC_FETCH_CONCURRENCY`` upstream calls run
+at once per worker, across all requests. Days that are old enough to be
+settled never change, so each is written once to
+``CACHE_DIR/historic/<region>/<day>.json`` and later range queries over those
+days are local reads.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from ..http_client import get_client
+from ..tracing import span
+from .observations import ObservationBatch, haversine_km, within_radius
+from .regions import resolve_region
+from .taxonomy_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+EBIRD_API_BASE_URL = os.getenv("EBIRD_API_BASE_URL", "https://api.ebird.org/v2")
+EBIRD_HISTORIC_URL = EBIRD_API_BASE_URL + "/data/obs/{region_code}/historic/{year}/{month}/{day}"
+EBIRD_SUBREGIONS_URL = EBIRD_API_BASE_URL + "/ref/region/list/subnational2/{region_code}"
+EBIRD_REGION_INFO_URL = EBIRD_API_BASE_URL + "/ref/region/info/{region_code}"
+
+HISTORIC_FETCH_CONCURRENCY = int(os.getenv("HISTORIC_FETCH_CONCURRENCY", "4"))
+HISTORIC_MAX_DAYS = int(os.getenv("HISTORIC_MAX_DAYS", "93"))
+# Region-days one query may read; a wide circle over small counties multiplies the days
+HISTORIC_MAX_REGION_DAYS = int(os.getenv("HISTORIC_MAX_REGION_DAYS", "1500"))
+# Checklists for a day keep arriving for a while; only days older than this are final
+HISTORIC_SETTLE_DAYS = int(os.getenv("HISTORIC_SETTLE_DAYS", "3"))
+# Unsettled days are cached too, but refetched after this long
+HISTORIC_RECENT_TTL_SECONDS = int(os.getenv("HISTORIC_RECENT_TTL_SECONDS", "3600"))
+HISTORIC_MEMORY_DAYS = int(os.getenv("HISTORIC_MEMORY_DAYS", "1024"))
+# County lists and bounds change about once a decade
+HISTORIC_SUBREGION_TTL_SECONDS = int(os.getenv("HISTORIC_SUBREGION_TTL_SECONDS", str(60 * 60 * 24 * 30)))
+
+# Compact on-disk row: only the fields ObservedBird and the filters need
+_FIELDS = (
+    "speciesCode", "comName", "locName", "locId", "obsDt", "lat", "lng",
+    "howMany", "userDisplayName", "obsValid", "obsReviewed",
+)
+_VALID = _FIELDS.index("obsValid")
+_REVIEWED = _FIELDS.index("obsReviewed")
+_KM_PER_DEGREE = 111.32
+# Stored alongside the region-day directories; region codes are upper case
+_SUBREGIONS_DIR = "_subregions"
+
+Row = list
+# (min_lat, max_lat, min_lng, max_lng)
+Bounds = Tuple[float, float, float, float]
+
+
+class HistoricDay:
+    """One region-day held in memory as a compact batch plus the review flags."""
+
+    __slots__ = ("final", "fetched_at", "batch", "valid", "reviewed")
+
+    def __init__(self, final: bool, fetched_at: float, rows: List[Row]):
+        self.final = final
+        self.fetched_at = fetched_at
+        self.batch = ObservationBatch.from_rows(rows, _FIELDS)
+        self.valid = bytearray(bool(row[_VALID]) for row in rows)
+        self.reviewed = bytearray(bool(row[_REVIEWED]) for row in rows)
+
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]) -> Optional[Tuple[date, date]]:
+    """Validate a start/end pair; returns None when neither is given (recent mode)."""
+    if not start_date and not end_date:
+        return None
+    if not (start_date and end_date):
+        raise HTTPException(status_code=400, detail="Provide both start_date and end_date")
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if end > datetime.now(timezone.utc).date():
+        raise HTTPException(status_code=400, detail="end_date cannot be in the future")
+    if (end - start).days + 1 > HISTORIC_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date ranges are limited to {HISTORIC_MAX_DAYS} days")
+    return start, end
+
+
+def _is_settled(day: date) -> bool:
+    return day <= datetime.now(timezone.utc).date() - timedelta(days=HISTORIC_SETTLE_DAYS)
+
+
+def is_settled_range(end: date) -> bool:
+    """Whether every day up to ``end`` is final, so a response over it can be cached long."""
+    return _is_settled(end)
+
+
+def _overlaps(a: Bounds, b: Bounds) -> bool:
+    return a[0] <= b[1] and b[0] <= a[1] and a[2] <= b[3] and b[2] <= a[3]
+
+
+async def regions_for(lat: float, lng: float, radius_km: float) -> List[str]:
+    """County-level regions whose per-day lists together cover the circle.
+
+    The states are found from the center and eight points on the circle, so a
+    circle over a border loads both sides. Each state contributes its counties
+    that overlap the circle's bounding box. A state whose counties are unknown
+    (none exist, or the lookup failed) is used whole.
+    """
+    center = await resolve_region(lat, lng)
+    if center is None:
+        raise HTTPException(status_code=400, detail="Could not determine the eBird region for this location")
+
+    d_lat = radius_km / _KM_PER_DEGREE
+    d_lng = radius_km / (_KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    # A point without a nearby hotspot costs a reverse geocode, and resolve_region
+    # caches per 0.1 degree cell: look up each cell on the circle once
+    cells: Dict[Tuple[float, float], Tuple[float, float]] = {}
+    for k in range(8):
+        point = (lat + d_lat * math.cos(k * math.pi / 4), lng + d_lng * math.sin(k * math.pi / 4))
+        cells.setdefault((round(point[0], 1), round(point[1], 1)), point)
+    cells.pop((round(lat, 1), round(lng, 1)), None)
+    edges = await asyncio.gather(*(resolve_region(*point) for point in cells.values()))
+
+    states: List[str] = [center]
+    for region_code in edges:
+        if region_code and region_code not in states:
+            states.append(region_code)
+
+    box = (lat - d_lat, lat + d_lat, lng - d_lng, lng + d_lng)
+    regions: List[str] = []
+    for state in states:
+        try:
+            counties = await _day_store.subregions(state)
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            logger.warning("County lookup for %s failed, using the whole region: %s", state, e)
+            counties = {}
+        if not counties:
+            regions.append(state)
+            continue
+        regions.extend(code for code, bounds in counties.items() if _overlaps(bounds, box))
+    return regions or states[:1]
+
+
+class HistoricDayStore:
+    """Per-(region, day) observation rows: memory LRU over a permanent disk cache."""
+
+    def __init__(
+        self,
+        directory: str | Path = CACHE_DIR,
+        memory_days: int = HISTORIC_MEMORY_DAYS,
+        concurrency: int = HISTORIC_FETCH_CONCURRENCY,
+    ):
+        self.directory = Path(directory) / "historic"
+        self.memory_days = memory_days
+        self._memory: "OrderedDict[Tuple[str, date], HistoricDay]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, date], asyncio.Future] = {}
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        self._subregions: Dict[str, Tuple[float, Dict[str, Bounds]]] = {}
+        self._subregion_tasks: Dict[str, asyncio.Future] = {}
+        self.fetches = 0
+
+    def _fetch_slot(self) -> asyncio.Semaphore:
+        """Upstream call limit shared by every request in the worker (one per event loop)."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore[0] is not loop:
+            self._semaphore = (loop, asyncio.Semaphore(self.concurrency))
+        return self._semaphore[1]
+
+    def _path(self, region_code: str, day: date) -> Path:
+        return self.directory / region_code / f"{day.isoformat()}.json"
+
+    def _read(self, region_code: str, day: date) -> Optional[Tuple[bool, float, List[Row]]]:
+        try:
+            data = json.loads(self._path(region_code, day).read_text())
+            # Days written with another row layout are fetched again
+            if data["fields"] != list(_FIELDS):
+                return None
+            return bool(data["final"]), float(data["fetched_at"]), data["rows"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, region_code: str, day: date, final: bool, fetched_at: float, rows: List[Row]) -> None:
+        _write_json(
+            self._path(region_code, day),
+            {"final": final, "fetched_at": fetched_at, "fields": list(_FIELDS), "rows": rows},
+        )
+
+    def _subregions_path(self, region_code: str) -> Path:
+        return self.directory / _SUBREGIONS_DIR / f"{region_code}.json"
+
+    def _read_subregions(self, region_code: str) -> Optional[Tuple[float, Dict[str, Bounds]]]:
+        try:
+            data = json.loads(self._subregions_path(region_code).read_text())
+            return float(data["fetched_at"]), {code: tuple(bounds) for code, bounds in data["regions"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    async def subregions(self, region_code: str) -> Dict[str, Bounds]:
+        """Counties of ``region_code`` with their bounds; empty when it has none."""
+        stored = self._subregions.get(region_code)
+        if stored is None or time.time() - stored[0] >= HISTORIC_SUBREGION_TTL_SECONDS:
+            task = self._subregion_tasks.get(region_code)
+            if task is None:
+                task = asyncio.ensure_future(self._load_subregions(region_code))
+                self._subregion_tasks[region_code] = task
+                task.add_done_callback(lambda _: self._subregion_tasks.pop(region_code, None))
+            stored = await asyncio.shield(task)
+        return stored[1]
+
+    async def _load_subregions(self, region_code: str) -> Tuple[float, Dict[str, Bounds]]:
+        stored = await asyncio.to_thread(self._read_subregions, region_code)
+        if stored is None or time.time() - stored[0] >= HISTORIC_SUBREGION_TTL_SECONDS:
+            stored = (time.time(), await self._fetch_subregions(region_code))
+            await asyncio.to_thread(
+                _write_json, self._subregions_path(region_code), {"fetched_at": stored[0], "regions": stored[1]}
+            )
+        self._subregions[region_code] = stored
+        return stored
+
+    async def _fetch_subregions(self, region_code: str) -> Dict[str, Bounds]:
+        """List a region's counties, then each county's bounding box (once per TTL)."""
+        headers = {"X-eBirdApiToken": _api_key()}
+        client = get_client()
+        async with self._fetch_slot():
+            with span("ebird_regions"):
+                response = await client.get(
+                    EBIRD_SUBREGIONS_URL.format(region_code=region_code), headers=headers, timeout=20.0
+                )
+        response.raise_for_status()
+        codes = [item["code"] for item in response.json()]
+
+        async def bounds(code: str) -> Tuple[str, Bounds]:
+            async with self._fetch_slot():
+                with span("ebird_regions"):
+                    info = await client.get(EBIRD_REGION_INFO_URL.format(region_code=code), headers=headers, timeout=20.0)
+            info.raise_for_status()
+            box = info.json()["bounds"]
+            return code, (float(box["minY"]), float(box["maxY"]), float(box["minX"]), float(box["maxX"]))
+
+        return dict(await asyncio.gather(*(bounds(code) for code in codes)))
+
+    @staticmethod
+    def _usable(final: bool, fetched_at: float) -> bool:
+        return final or time.time() - fetched_at < HISTORIC_RECENT_TTL_SECONDS
+
+    def _cached(self, key: Tuple[str, date]) -> Optional[HistoricDay]:
+        day = self._memory.get(key)
+        if day is None or not self._usable(day.final, day.fetched_at):
+            return None
+        self._memory.move_to_end(key)
+        return day
+
+    def _remember(self, key: Tuple[str, date], entry: HistoricDay) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_days:
+            self._memory.popitem(last=False)
+
+    async def _load(self, region_code: str, day: date) -> HistoricDay:
+        stored = await asyncio.to_thread(self._read, region_code, day)
+        if stored is None or not self._usable(stored[0], stored[1]):
+            # Decide finality before fetching so a day that settles mid-request is refetched later
+            final = _is_settled(day)
+            async with self._fetch_slot():
+                self.fetches += 1
+                rows = await _fetch_day(region_code, day)
+            stored = (final, time.time(), rows)
+            await asyncio.to_thread(self._write, region_code, day, *stored)
+        entry = HistoricDay(*stored)
+        self._remember((region_code, day), entry)
+        return entry
+
+    async def get(self, region_code: str, day: date) -> HistoricDay:
+        key = (region_code, day)
+        entry = self._cached(key)
+        if entry is not None:
+            return entry
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(region_code, day))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def get_range(self, region_code: str, start: date, end: date) -> List[HistoricDay]:
+        """Every day in [start, end]; missing days are fetched within the store's concurrency limit."""
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        return await asyncio.gather(*(self.get(region_code, day) for day in days))
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _api_key() -> str:
+    api_key = os.getenv("EBIRD_API_KEY", "")
+    if not api_key:
+        logger.error("EBIRD_API_KEY not configured")
+        raise HTTPException(status_code=500, detail="eBird API key not configured")
+    return api_key
+
+
+async def _fetch_day(region_code: str, day: date) -> List[Row]:
+    """Call the eBird historic endpoint for one region and day.
+
+    Provisional records are included: flagged sightings still waiting for
+    review are the recent notable ones.
+    """
+    api_key = _api_key()
+    url = EBIRD_HISTORIC_URL.format(region_code=region_code, year=day.year, month=day.month, day=day.day)
+    client = get_client()
+    try:
+        with span("ebird_historic"):
+            response = await client.get(
+                url,
+                params={"detail": "full", "rank": "mrec", "includeProvisional": "true"},
+                headers={"X-eBirdApiToken": api_key},
+                timeout=20.0,
+            )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.error("Historic observations for %s on %s failed: %s", region_code, day, e.response.status_code)
+        raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch historic observations")
+    except httpx.RequestError as e:
+        logger.error("Historic request error for %s on %s: %s", region_code, day, str(e))
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    return [[item.get(field) for field in _FIELDS] for item in response.json()]
+
+
+_day_store = HistoricDayStore()
+
+
+async def _observations_in_range(
+    region_codes: Sequence[str],
+    start: date,
+    end: date,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    candidates: Callable[[HistoricDay], Sequence[int]],
+) -> ObservationBatch:
+    if len(region_codes) * ((end - start).days + 1) > HISTORIC_MAX_REGION_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"This area spans {len(region_codes)} eBird regions; shorten the date range or the radius",
+        )
+    per_region = await asyncio.gather(*(_day_store.get_range(code, start, end) for code in region_codes))
+    parts = []
+    # Newest day first, matching the recent endpoints' ordering
+    for offset in reversed(range((end - start).days + 1)):
+        for days in per_region:
+            matches = days[offset].batch.take(candidates(days[offset]))
+            if len(matches):
+                parts.append(matches.take(within_radius(haversine_km(lat, lng, matches.lats, matches.lngs), radius_km)))
+    return ObservationBatch.concat(parts)
+
+
+async def fetch_historic_species(
+    region_codes: Sequence[str], species_code: str, start: date, end: date, lat: float, lng: float, radius_km: float
+) -> ObservationBatch:
+    """One species' accepted observations within ``radius_km`` of (lat, lng) between two dates."""
+    return await _observations_in_range(
+        region_codes, start, end, lat, lng, radius_km,
+        lambda day: [
+            i for i, code in enumerate(day.batch.species_codes) if code == species_code and day.valid[i]
+        ],
+    )
+
+
+async def fetch_historic_notable(
+    region_codes: Sequence[str], start: date, end: date, lat: float, lng: float, radius_km: float
+) -> ObservationBatch:
+    """Flagged observations within ``radius_km`` of (lat, lng) between two dates.
+
+    An approximation of eBird's notable list, which the historic endpoint does
+    not offer. A flagged record is either still pending review (not valid, not
+    reviewed) or accepted by a reviewer (valid and reviewed); rejected records
+    are left out. Records a reviewer looked at for other reasons than rarity
+    are included too, and the per-species cap of the historic lists applies.
+    """
+    return await _observations_in_range(
+        region_codes, start, end, lat, lng, radius_km,
+        lambda day: [i for i, (valid, reviewed) in enumerate(zip(day.valid, day.reviewed)) if valid == reviewed],
+    )
@@ -0,0 +1,152 @@
+import logging
+import math
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+
+logger = logging.getLogger(__name__)
+
+# Raw search rows younger than this are kept as-is
+SEARCH_RETENTION_DAYS = int(os.getenv("SEARCH_RETENTION_DAYS", "90"))
+# Rows moved per transaction; keeps each write lock short
+SEARCH_COMPACTION_BATCH_SIZE = int(os.getenv("SEARCH_COMPACTION_BATCH_SIZE", "1000"))
+# Size of the lat/lng grid cell searches are rolled up into (~11 km at 0.1)
+SEARCH_ROLLUP_CELL_DEGREES = float(os.getenv("SEARCH_ROLLUP_CELL_DEGREES", "0.1"))
+
+RollupKey = Tuple[int, date, float, float]
+
+
+def _cell(value: float) -> float:
+    return round(math.floor(value / SEARCH_ROLLUP_CELL_DEGREES) * SEARCH_ROLLUP_CELL_DEGREES, 6)
+
+
+class SearchHistoryService:
+    """Retention and rollup of the user_searches table."""
+
+    @staticmethod
+    def compact(
+        db: Session,
+        retention_days: int = SEARCH_RETENTION_DAYS,
+        batch_size: int = SEARCH_COMPACTION_BATCH_SIZE,
+        max_batches: int | None = None,
+    ) -> Dict[str, int]:
+        """
+        Roll searches older than the retention window into daily per-area
+        aggregates and delete the raw rows, one bounded batch per transaction.
+
+        Each batch deletes with RETURNING and aggregates exactly the rows it
+        deleted, so concurrent runs from several workers never double count.
+
+        Args:
+            db: Database session
+            retention_days: Raw rows newer than this many days are kept
+            batch_size: Maximum rows deleted per transaction
+            max_batches: Optional cap on batches for this run
+
+        Returns:
+            Counts of compacted rows and batches
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        stats = {"rows": 0, "batches": 0}
+        conflicts = 0
+
+        while max_batches is None or stats["batches"] < max_batches:
+            oldest = (
+                select(models.UserSearch.id)
+                .where(models.UserSearch.search_date < cutoff)
+                .order_by(models.UserSearch.id)
+                .limit(batch_size)
+            )
+            statement = (
+                delete(models.UserSearch)
+                .where(models.UserSearch.id.in_(oldest))
+                .returning(
+                    models.UserSearch.user_id,
+                    models.UserSearch.lat,
+                    models.UserSearch.lng,
+                    models.UserSearch.radius,
+                    models.UserSearch.bird_count,
+                    models.UserSearch.search_date,
+                )
+            )
+            try:
+                deleted = db.execute(statement).all()
+                if not deleted:
+                    db.rollback()
+                    break
+                SearchHistoryService._merge_rollups(db, deleted)
+                db.commit()
+            except IntegrityError:
+                # Another worker inserted the same rollup cell first; retry the batch
+                db.rollback()
+                conflicts += 1
+                if conflicts > 3:
+                    raise
+                continue
+
+            stats["rows"] += len(deleted)
+            stats["batches"] += 1
+
+        if stats["rows"]:
+            logger.info("Compacted %d search rows in %d batches", stats["rows"], stats["batches"])
+        return stats
+
+    @staticmethod
+    def _merge_rollups(db: Session, rows) -> None:
+        aggregates: Dict[RollupKey, list] = defaultdict(lambda: [0, 0, 0])
+        for user_id, lat, lng, radius, bird_count, search_date in rows:
+            key = (user_id, search_date.date(), _cell(lat), _cell(lng))
+            aggregate = aggregates[key]
+            aggregate[0] += 1
+            aggregate[1] += bird_count or 0
+            aggregate[2] = max(aggregate[2], radius or 0)
+
+        rollup = models.UserSearchRollup
+        existing = {
+            (r.user_id, r.day, r.lat_cell, r.lng_cell): r
+            for r in db.query(rollup).filter(
+                tuple_(rollup.user_id, rollup.day, rollup.lat_cell, rollup.lng_cell).in_(list(aggregates))
+            )
+        }
+        for key, (count, birds, radius) in aggregates.items():
+            row = existing.get(key)
+            if row is None:
+                user_id, day, lat_cell, lng_cell = key
+                db.add(rollup(
+                    user_id=user_id,
+                    day=day,
+                    lat_cell=lat_cell,
+                    lng_cell=lng_cell,
+                    search_count=count,
+                    bird_count_total=birds,
+                    max_radius=radius,
+                ))
+            else:
+                row.search_count += count
+                row.bird_count_total += birds
+                row.max_radius = max(row.max_radius, radius)
+        db.flush()
+
+
+def run_compaction() -> Dict[str, int]:
+    """Run one compaction pass with its own session (for schedulers and the CLI)."""
+    from ..database import SessionLocal, get_engine
+
+    get_engine()
+    db = SessionLocal()
+    try:
+        return SearchHistoryService.compact(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(run_compaction())
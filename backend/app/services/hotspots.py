@@ -0,0 +1,298 @@
+"""
+Local hotspot store with an in-memory grid index.
+
+eBird hotspot lists for the regions in ``HOTSPOT_REGIONS`` are synced into the
+``hotspots`` table on a schedule. Each worker builds a grid index over the
+table, so nearest-hotspot lookups are answered from memory with no upstream
+call per request.
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import os
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..http_client import get_client
+from .observations import EARTH_RADIUS_KM, distance_km
+
+logger = logging.getLogger(__name__)
+
+EBIRD_API_BASE_URL = os.getenv("EBIRD_API_BASE_URL", "https://api.ebird.org/v2")
+EBIRD_HOTSPOT_URL = EBIRD_API_BASE_URL + "/ref/hotspot/{region_code}"
+
+# Comma-separated eBird region codes to sync, e.g. "US-CO,US-NM"
+HOTSPOT_REGIONS = [r.strip() for r in os.getenv("HOTSPOT_REGIONS", "").split(",") if r.strip()]
+HOTSPOT_SYNC_INTERVAL_SECONDS = int(os.getenv("HOTSPOT_SYNC_INTERVAL_SECONDS", str(60 * 60 * 24)))
+# How often workers check whether another worker synced and the index is stale
+HOTSPOT_REFRESH_SECONDS = float(os.getenv("HOTSPOT_REFRESH_SECONDS", "300"))
+HOTSPOT_GRID_DEGREES = float(os.getenv("HOTSPOT_GRID_DEGREES", "0.1"))
+
+_KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+
+class HotspotIndex:
+    """Uniform lat/lng grid over hotspot coordinates."""
+
+    def __init__(self, rows: List[models.Hotspot], cell_degrees: float = HOTSPOT_GRID_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._columns = max(1, round(360 / cell_degrees))
+        self.items: List[Tuple[str, str, Optional[str], Optional[str], Optional[int]]] = []
+        self.lats = array("d")
+        self.lngs = array("d")
+        self._cells: Dict[Tuple[int, int], array] = {}
+        seen = set()
+        for row in rows:
+            # Overlapping regions (e.g. "US" and "US-CO") list the same hotspot
+            if row.loc_id in seen:
+                continue
+            seen.add(row.loc_id)
+            index = len(self.items)
+            self.items.append(
+                (row.loc_id, row.name, row.subnational1_code, row.latest_obs_dt, row.num_species_all_time)
+            )
+            self.lats.append(row.lat)
+            self.lngs.append(row.lng)
+            self._cells.setdefault(self._cell(row.lat, row.lng), array("I")).append(index)
+        # Latitude-sorted view for searches too wide for the grid to help
+        self._lat_order = array("I", sorted(range(len(self.items)), key=self.lats.__getitem__))
+        self._sorted_lats = array("d", (self.lats[i] for i in self._lat_order))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor((lng + 180) / self.cell_degrees) % self._columns
+
+    def _ring(self, row0: int, col0: int, ring: int, max_rows: int):
+        """Cells at Chebyshev distance ``ring`` from (row0, col0) within ``max_rows`` rows, longitudes wrapped."""
+        if ring == 0:
+            yield row0, col0 % self._columns
+            return
+        for row in range(row0 - min(ring, max_rows), row0 + min(ring, max_rows) + 1):
+            if abs(row - row0) == ring:
+                cols = range(col0 - ring, col0 + ring + 1)
+            else:
+                cols = (col0 - ring, col0 + ring)
+            for col in cols:
+                yield row, col % self._columns
+
+    def nearest(self, lat: float, lng: float, radius_km: float, k: int) -> List[Tuple[float, int]]:
+        """Up to ``k`` (distance_km, index) pairs within ``radius_km``, closest first.
+
+        Scans rings of cells outward from the query cell and stops once no
+        unscanned cell can hold anything closer than the current k-th hit.
+        """
+        # Never look past the bounding box of the search circle
+        dlat = radius_km / _KM_PER_DEGREE
+        widest = min(89.9, abs(lat) + dlat)
+        dlng = min(180.0, dlat / math.cos(math.radians(widest)))
+        max_rows = math.ceil(dlat / self.cell_degrees) + 1
+        max_cols = min(self._columns // 2, math.ceil(dlng / self.cell_degrees) + 1)
+        lo = bisect.bisect_left(self._sorted_lats, lat - dlat)
+        hi = bisect.bisect_right(self._sorted_lats, lat + dlat)
+        # Near the poles, for huge radii or sparse data, probing empty cells costs
+        # more than measuring every hotspot in the latitude band (~4 probes per distance)
+        if (2 * max_rows + 1) * (2 * max_cols + 1) > 4 * (hi - lo):
+            return self._scan_band(lat, lng, radius_km, lo, hi, k)
+
+        row0, col0 = self._cell(lat, lng)
+        cell_km = self.cell_degrees * _KM_PER_DEGREE
+        lats, lngs, cells = self.lats, self.lngs, self._cells
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance, index)
+        max_ring = max(max_rows, max_cols)
+        for ring in range(max_ring + 1):
+            if ring > 1:
+                # A point in this ring is at least ring - 1 whole cells away; cells
+                # narrow towards the poles, so use the width at the ring's far edge.
+                edge_lat = min(89.9, abs(lat) + (ring + 1) * self.cell_degrees)
+                floor_km = (ring - 1) * cell_km * math.cos(math.radians(edge_lat)) * 0.99
+                if floor_km > radius_km or (len(best) == k and -best[0][0] <= floor_km):
+                    break
+            seen = set() if 2 * ring + 1 >= self._columns else None
+            for cell in self._ring(row0, col0, ring, max_rows):
+                if seen is not None:
+                    if cell in seen:
+                        continue
+                    seen.add(cell)
+                members = cells.get(cell)
+                if not members:
+                    continue
+                for index in members:
+                    distance = distance_km(lat, lng, lats[index], lngs[index])
+                    if distance > radius_km:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, index))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, index))
+        return sorted((-d, index) for d, index in best)
+
+    def _scan_band(self, lat: float, lng: float, radius_km: float, lo: int, hi: int, k: int) -> List[Tuple[float, int]]:
+        lats, lngs = self.lats, self.lngs
+        hits = []
+        for index in self._lat_order[lo:hi]:
+            distance = distance_km(lat, lng, lats[index], lngs[index])
+            if distance <= radius_km:
+                hits.append((distance, index))
+        return heapq.nsmallest(k, hits)
+
+
+_index: Optional[HotspotIndex] = None
+_index_fingerprint: Optional[Tuple[int, Optional[int]]] = None
+
+
+class HotspotService:
+    """Service for syncing hotspots and answering nearest-hotspot queries."""
+
+    @staticmethod
+    async def _fetch_region(region_code: str) -> List[dict]:
+        """Call the eBird hotspot list endpoint for one region."""
+        api_key = os.getenv("EBIRD_API_KEY", "")
+        if not api_key:
+            logger.error("EBIRD_API_KEY not configured")
+            raise HTTPException(status_code=500, detail="eBird API key not configured")
+
+        client = get_client()
+        try:
+            response = await client.get(
+                EBIRD_HOTSPOT_URL.format(region_code=region_code),
+                params={"fmt": "json"},
+                headers={"X-eBirdApiToken": api_key},
+                timeout=30.0,
+            )
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error("Hotspot sync for %s failed: %s", region_code, e.response.status_code)
+            raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch hotspots")
+        except httpx.RequestError as e:
+            logger.error("Hotspot request error for %s: %s", region_code, str(e))
+            raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+        return response.json()
+
+    @staticmethod
+    def store_region(db: Session, region_code: str, items: List[dict]) -> int:
+        """Replace the stored hotspots for a region in one transaction."""
+        synced_at = int(time.time())
+        rows = [
+            {
+                "region_code": region_code,
+                "loc_id": item["locId"],
+                "name": item.get("locName") or item["locId"],
+                "country_code": item.get("countryCode"),
+                "subnational1_code": item.get("subnational1Code"),
+                "lat": item["lat"],
+                "lng": item["lng"],
+                "latest_obs_dt": item.get("latestObsDt"),
+                "num_species_all_time": item.get("numSpeciesAllTime"),
+                "synced_at": synced_at,
+            }
+            for item in items
+            if item.get("locId") and item.get("lat") is not None and item.get("lng") is not None
+        ]
+        try:
+            db.query(models.Hotspot).filter(models.Hotspot.region_code == region_code).delete(
+                synchronize_session=False
+            )
+            if rows:
+                db.bulk_insert_mappings(models.Hotspot, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return len(rows)
+
+    @staticmethod
+    def _stale_regions(db: Session, regions: List[str], max_age_seconds: int) -> List[str]:
+        synced = dict(
+            db.query(models.Hotspot.region_code, func.max(models.Hotspot.synced_at))
+            .filter(models.Hotspot.region_code.in_(regions))
+            .group_by(models.Hotspot.region_code)
+            .all()
+        )
+        cutoff = time.time() - max_age_seconds
+        return [region for region in regions if synced.get(region) is None or synced[region] < cutoff]
+
+    @staticmethod
+    def _fingerprint(db: Session) -> Tuple[int, Optional[int]]:
+        count, latest = db.query(func.count(models.Hotspot.id), func.max(models.Hotspot.synced_at)).one()
+        return count, latest
+
+    @staticmethod
+    def rebuild_index(db: Session, force: bool = False) -> HotspotIndex:
+        """Rebuild this worker's index if the table changed since it was built."""
+        global _index, _index_fingerprint
+        fingerprint = HotspotService._fingerprint(db)
+        if force or _index is None or fingerprint != _index_fingerprint:
+            started = time.perf_counter()
+            _index = HotspotIndex(db.query(models.Hotspot).all())
+            _index_fingerprint = fingerprint
+            logger.info(
+                "Built hotspot index: %d hotspots in %.1f ms", len(_index), (time.perf_counter() - started) * 1000
+            )
+        return _index
+
+    @staticmethod
+    async def refresh(regions: Optional[List[str]] = None) -> None:
+        """Sync stale regions from eBird, then bring the index up to date."""
+        from ..database import SessionLocal, get_engine
+
+        regions = HOTSPOT_REGIONS if regions is None else regions
+        get_engine()
+        db = SessionLocal()
+        try:
+            if regions and os.getenv("EBIRD_API_KEY"):
+                stale = await asyncio.to_thread(
+                    HotspotService._stale_regions, db, regions, HOTSPOT_SYNC_INTERVAL_SECONDS
+                )
+                for region_code in stale:
+                    try:
+                        items = await HotspotService._fetch_region(region_code)
+                    except HTTPException:
+                        continue  # Keep serving the previous copy
+                    stored = await asyncio.to_thread(HotspotService.store_region, db, region_code, items)
+                    logger.info("Synced %d hotspots for %s", stored, region_code)
+            await asyncio.to_thread(HotspotService.rebuild_index, db)
+        finally:
+            db.close()
+
+    @staticmethod
+    def region_near(lat: float, lng: float, radius_km: float = 50) -> Optional[str]:
+        """State/province code of the closest synced hotspot, if the index has one nearby."""
+        if _index is None:
+            return None
+        hits = _index.nearest(lat, lng, radius_km, 1)
+        return _index.items[hits[0][1]][2] if hits else None
+
+    @staticmethod
+    def nearest(
+        db: Session, lat: float, lng: float, radius_km: float = 25, k: int = 10
+    ) -> List[schemas.HotspotResponse]:
+        """Closest hotspots to (lat, lng) within ``radius_km``, from the in-memory index."""
+        index = _index if _index is not None else HotspotService.rebuild_index(db)
+        results = []
+        for distance, i in index.nearest(lat, lng, radius_km, k):
+            loc_id, name, subnational1_code, latest_obs_dt, num_species = index.items[i]
+            results.append(
+                schemas.HotspotResponse(
+                    loc_id=loc_id,
+                    name=name,
+                    lat=index.lats[i],
+                    lng=index.lngs[i],
+                    subnational1_code=subnational1_code,
+                    latest_obs_dt=latest_obs_dt,
+                    num_species_all_time=num_species,
+                    distance_km=round(distance, 3),
+                )
+            )
+        return results
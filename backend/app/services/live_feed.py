@@ -0,0 +1,185 @@
+"""
+Live feed of new notable sightings, shared per area tile.
+
+Subscribers are grouped by grid tile. Each tile with at least one subscriber
+has a single poller that fetches notable observations around the tile center,
+diffs them against what it has already seen and pushes only new sightings to
+every subscriber in the tile. Upstream calls therefore scale with the number of
+watched areas, not the number of watching clients.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from .. import schemas
+from .birds import BirdService
+from .observations import MAX_UPSTREAM_RADIUS_KM, ObservationBatch, distance_km, haversine_km, within_radius
+
+logger = logging.getLogger(__name__)
+
+LIVE_FEED_TILE_DEGREES = float(os.getenv("LIVE_FEED_TILE_DEGREES", "0.25"))
+# One subscriber polls every LIVE_FEED_MAX_INTERVAL_SECONDS; busier tiles poll more
+# often, down to LIVE_FEED_MIN_INTERVAL_SECONDS
+LIVE_FEED_MIN_INTERVAL_SECONDS = float(os.getenv("LIVE_FEED_MIN_INTERVAL_SECONDS", "60"))
+LIVE_FEED_MAX_INTERVAL_SECONDS = float(os.getenv("LIVE_FEED_MAX_INTERVAL_SECONDS", "300"))
+LIVE_FEED_QUEUE_SIZE = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "256"))
+LIVE_FEED_HEARTBEAT_SECONDS = float(os.getenv("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+
+Tile = Tuple[int, int]
+SightingKey = Tuple[str, str, str, Optional[int], Optional[str]]
+
+
+def tile_for(lat: float, lng: float) -> Tile:
+    return math.floor(lat / LIVE_FEED_TILE_DEGREES), math.floor(lng / LIVE_FEED_TILE_DEGREES)
+
+
+def tile_center(tile: Tile) -> Tuple[float, float]:
+    return (tile[0] + 0.5) * LIVE_FEED_TILE_DEGREES, (tile[1] + 0.5) * LIVE_FEED_TILE_DEGREES
+
+
+def max_subscriber_radius_km() -> int:
+    """Largest radius a subscriber anywhere in a tile can ask for and still be fully covered."""
+    half_diagonal = distance_km(0, 0, LIVE_FEED_TILE_DEGREES / 2, LIVE_FEED_TILE_DEGREES / 2)
+    return max(1, int(MAX_UPSTREAM_RADIUS_KM - half_diagonal))
+
+
+def _sighting_key(batch: ObservationBatch, i: int) -> SightingKey:
+    return batch.species_codes[i], batch.loc_ids[i], batch.dates[i], batch.count(i), batch.observers[i]
+
+
+class Subscriber:
+    """One connected client: its point of interest and a bounded outbox."""
+
+    def __init__(self, lat: float, lng: float, radius_km: float):
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = radius_km
+        self.queue: "asyncio.Queue[List[schemas.ObservedBird]]" = asyncio.Queue(LIVE_FEED_QUEUE_SIZE)
+        self.dropped = False
+
+    def offer(self, batch: ObservationBatch) -> None:
+        """Queue the sightings inside this subscriber's circle, with distances from its point."""
+        distances = haversine_km(self.lat, self.lng, batch.lats, batch.lngs)
+        mine = [
+            batch.to_model(i, round(float(distances[i]), 3))
+            for i in within_radius(distances, self.radius_km)
+        ]
+        if not mine:
+            return
+        try:
+            self.queue.put_nowait(mine)
+        except asyncio.QueueFull:
+            # A client this far behind gets disconnected rather than holding memory
+            self.dropped = True
+
+
+class TileFeed:
+    """Shared poller for one tile."""
+
+    def __init__(self, hub: "LiveFeedHub", tile: Tile):
+        self.hub = hub
+        self.tile = tile
+        self.subscribers: Set[Subscriber] = set()
+        self.seen: Optional[Set[SightingKey]] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def interval(self) -> float:
+        # More watchers make fresher data worth more upstream calls, sub-linearly
+        count = max(1, len(self.subscribers))
+        return max(LIVE_FEED_MIN_INTERVAL_SECONDS, LIVE_FEED_MAX_INTERVAL_SECONDS / math.sqrt(count))
+
+    async def poll_once(self) -> ObservationBatch:
+        """Fetch the tile, return sightings not seen before and fan them out."""
+        lat, lng = tile_center(self.tile)
+        self.hub.polls += 1
+        batch = await self.hub.fetch(lat, lng, MAX_UPSTREAM_RADIUS_KM)
+        keys = {_sighting_key(batch, i): i for i in range(len(batch))}
+        if self.seen is None:
+            # First poll is the baseline; clients load current sightings from /birds/rare
+            new = batch.take([])
+        else:
+            new = batch.take([i for key, i in keys.items() if key not in self.seen])
+        # Keep only what upstream still returns so the seen set cannot grow without bound
+        self.seen = set(keys)
+        if len(new):
+            for subscriber in list(self.subscribers):
+                subscriber.offer(new)
+        return new
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.subscribers:
+            polled_at = loop.time()
+            try:
+                await self.poll_once()
+            except HTTPException as e:
+                logger.warning("Live feed poll for tile %s failed: %s", self.tile, e.detail)
+            except Exception:
+                logger.exception("Live feed poll for tile %s failed", self.tile)
+            # Joins only shorten the wait (the interval depends on the subscriber
+            # count); they never trigger a poll of their own.
+            while True:
+                remaining = polled_at + self.interval() - loop.time()
+                if remaining <= 0:
+                    break
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+
+class LiveFeedHub:
+    """Registry of tile pollers for this worker."""
+
+    def __init__(self):
+        self.tiles: Dict[Tile, TileFeed] = {}
+        self.polls = 0
+
+    async def fetch(self, lat: float, lng: float, radius_km: int) -> ObservationBatch:
+        # Straight to eBird: the observation and response caches would hide new sightings for their TTL
+        return await BirdService._fetch_notable_from_ebird(lat, lng, radius_km, use_cache=False)
+
+    def subscribe(self, lat: float, lng: float, radius_km: float) -> Tuple[TileFeed, Subscriber]:
+        tile = tile_for(lat, lng)
+        feed = self.tiles.get(tile)
+        if feed is None:
+            feed = self.tiles[tile] = TileFeed(self, tile)
+        subscriber = Subscriber(lat, lng, radius_km)
+        feed.subscribers.add(subscriber)
+        if feed.task is None or feed.task.done():
+            feed.task = asyncio.create_task(feed.run())
+        else:
+            feed.wakeup.set()
+        return feed, subscriber
+
+    def unsubscribe(self, feed: TileFeed, subscriber: Subscriber) -> None:
+        feed.subscribers.discard(subscriber)
+        if not feed.subscribers:
+            if feed.task is not None:
+                feed.task.cancel()
+            if self.tiles.get(feed.tile) is feed:
+                del self.tiles[feed.tile]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tiles": len(self.tiles),
+            "subscribers": sum(len(feed.subscribers) for feed in self.tiles.values()),
+            "polls": self.polls,
+        }
+
+    async def close(self) -> None:
+        tasks = [feed.task for feed in self.tiles.values() if feed.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tiles.clear()
+
+
+live_feed = LiveFeedHub()
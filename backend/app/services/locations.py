@@ -1,10 +1,89 @@
+import asyncio
 import httpx
 import logging
-from typing import Optional, Tuple
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple, Union
 from fastapi import HTTPException
 
+from ..tracing import span
+from .response_cache import cached_get
+from .taxonomy_store import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX development machines
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+ZIPPOPOTAM_BASE_URL = os.getenv("ZIPPOPOTAM_BASE_URL", "https://api.zippopotam.us")
+NOMINATIM_BASE_URL = os.getenv("NOMINATIM_BASE_URL", "https://nominatim.openstreetmap.org")
+
+# Upper bound on concurrent geocoder calls for bulk operations (Nominatim is throttled separately)
+BULK_GEOCODE_CONCURRENCY = int(os.getenv("BULK_GEOCODE_CONCURRENCY", "4"))
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL_SECONDS = float(os.getenv("NOMINATIM_MIN_INTERVAL_SECONDS", "1.0"))
+
+
+class RequestThrottle:
+    """One request at a time, with starts at least ``interval`` seconds apart.
+
+    With ``path``, the next allowed start is kept in that file under an flock,
+    so every worker on the host shares the same spacing.
+    """
+
+    def __init__(self, interval: float, path: Optional[Union[str, Path]] = None):
+        self.interval = interval
+        self.path = Path(path) if path is not None else None
+        self._next_at = 0.0
+        self._lock: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock[0] is not loop:
+            self._lock = (loop, asyncio.Lock())
+        return self._lock[1]
+
+    async def _wait_shared(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a+b") as fh:
+            await asyncio.to_thread(fcntl.flock, fh.fileno(), fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                try:
+                    next_at = float(fh.read() or 0)
+                except ValueError:
+                    next_at = 0.0
+                # Capped, so a wall clock stepping back cannot stall every worker
+                delay = min(next_at - time.time(), self.interval)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                fh.truncate(0)
+                fh.write(repr(time.time() + self.interval).encode())
+                fh.flush()
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self._loop_lock():
+            if self.path is not None and fcntl is not None:
+                await self._wait_shared(self.path)
+            else:
+                delay = self._next_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_at = time.monotonic() + self.interval
+            yield
+
+
+# Shared by the workers on this host; every Nominatim call that misses the response cache goes through it
+_nominatim_throttle = RequestThrottle(NOMINATIM_MIN_INTERVAL_SECONDS, Path(CACHE_DIR) / "nominatim.throttle")
+
+
 class LocationService:
     """Service for handling location geocoding and management."""
     
@@ -23,31 +102,30 @@ class LocationService:
             HTTPException: If geocoding fails
         """
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(f"https://api.zippopotam.us/us/{zip_code}")
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Invalid ZIP code: {zip_code}"
-                    )
-                
-                data = response.json()
-                if not data.get("places"):
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"No location found for ZIP: {zip_code}"
-                    )
-                
-                place = data["places"][0]
-                lat = float(place["latitude"])
-                lng = float(place["longitude"])
-                
-                logger.info(f"Geocoded ZIP {zip_code} to ({lat}, {lng})")
-                return lat, lng
-                
+            response = await cached_get("zippopotam", f"{ZIPPOPOTAM_BASE_URL}/us/{zip_code}", timeout=10)
+            
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid ZIP code: {zip_code}"
+                )
+            
+            data = response.json()
+            if not data.get("places"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"No location found for ZIP: {zip_code}"
+                )
+            
+            place = data["places"][0]
+            lat = float(place["latitude"])
+            lng = float(place["longitude"])
+            
+            logger.info("Geocoded ZIP %s to (%s, %s)", zip_code, lat, lng)
+            return lat, lng
+            
         except httpx.RequestError as e:
-            logger.error(f"Error geocoding ZIP {zip_code}: {str(e)}")
+            logger.error("Error geocoding ZIP %s: %s", zip_code, str(e))
             raise HTTPException(
                 status_code=503,
                 detail="Geocoding service temporarily unavailable"
@@ -77,53 +155,95 @@ class LocationService:
             query_parts.append(country)
             query = ", ".join(query_parts)
             
-            async with httpx.AsyncClient(timeout=10) as client:
-                # Use Nominatim (OpenStreetMap) for city geocoding
-                params = {
-                    "q": query,
-                    "format": "json",
-                    "limit": 1,
-                    "countrycodes": "us"  # Limit to US for now
-                }
-                
-                # Add User-Agent header as required by Nominatim
-                headers = {
-                    "User-Agent": "BirdSpotter/1.0"
-                }
-                
-                response = await client.get(
-                    "https://nominatim.openstreetmap.org/search",
-                    params=params,
-                    headers=headers
+            # Use Nominatim (OpenStreetMap) for city geocoding
+            params = {
+                "q": query,
+                "format": "json",
+                "limit": 1,
+                "countrycodes": "us"  # Limit to US for now
+            }
+            
+            # Add User-Agent header as required by Nominatim
+            headers = {
+                "User-Agent": "BirdSpotter/1.0"
+            }
+            
+            response = await cached_get(
+                "nominatim_search",
+                f"{NOMINATIM_BASE_URL}/search",
+                params=params,
+                headers=headers,
+                throttle=_nominatim_throttle.slot,
+                timeout=10
+            )
+            
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Geocoding service error"
+                )
+            
+            data = response.json()
+            if not data:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Location not found: {query}"
                 )
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=503,
-                        detail="Geocoding service error"
-                    )
-                
-                data = response.json()
-                if not data:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Location not found: {query}"
-                    )
-                
-                result = data[0]
-                lat = float(result["lat"])
-                lng = float(result["lon"])
-                
-                logger.info(f"Geocoded city '{query}' to ({lat}, {lng})")
-                return lat, lng
-                
+            
+            result = data[0]
+            lat = float(result["lat"])
+            lng = float(result["lon"])
+            
+            logger.info("Geocoded city '%s' to (%s, %s)", query, lat, lng)
+            return lat, lng
+            
         except httpx.RequestError as e:
-            logger.error(f"Error geocoding city {city_name}: {str(e)}")
+            logger.error("Error geocoding city %s: %s", city_name, str(e))
             raise HTTPException(
                 status_code=503,
                 detail="Geocoding service temporarily unavailable"
             )
     
+    @staticmethod
+    async def reverse_region(lat: float, lng: float) -> Optional[str]:
+        """
+        Get the state/province code (ISO 3166-2, e.g. "US-CO") for a point using Nominatim.
+        
+        Args:
+            lat: Latitude
+            lng: Longitude
+            
+        Returns:
+            The subdivision code, the country code if there is none, or None
+            
+        Raises:
+            HTTPException: If the geocoding service is unavailable
+        """
+        try:
+            response = await cached_get(
+                "nominatim_reverse",
+                f"{NOMINATIM_BASE_URL}/reverse",
+                params={"lat": lat, "lon": lng, "format": "json", "zoom": 5, "addressdetails": 1},
+                headers={"User-Agent": "BirdSpotter/1.0"},
+                throttle=_nominatim_throttle.slot,
+                timeout=10
+            )
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Geocoding service error"
+                )
+            address = response.json().get("address") or {}
+        except httpx.RequestError as e:
+            logger.error("Error reverse geocoding (%s, %s): %s", lat, lng, str(e))
+            raise HTTPException(
+                status_code=503,
+                detail="Geocoding service temporarily unavailable"
+            )
+        
+        region_code = address.get("ISO3166-2-lvl4") or address.get("country_code")
+        return region_code.upper() if region_code else None
+    
     @staticmethod
     async def geocode_location(location_type: str, location_value: str) -> Tuple[float, float]:
         """
@@ -137,15 +257,52 @@ class LocationService:
             Tuple of (latitude, longitude)
         """
         if location_type == "zip":
-            return await LocationService.geocode_zip(location_value)
+            with span("geocode"):
+                return await LocationService.geocode_zip(location_value)
         elif location_type == "city":
             # Parse city input (could be "Denver, CO" or just "Denver")
             parts = location_value.split(",")
             city = parts[0].strip()
             state = parts[1].strip() if len(parts) > 1 else None
-            return await LocationService.geocode_city(city, state)
+            with span("geocode"):
+                return await LocationService.geocode_city(city, state)
         else:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid location type: {location_type}"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    async def geocode_many(
+        locations: Iterable[Tuple[str, str]],
+        concurrency: int = BULK_GEOCODE_CONCURRENCY
+    ) -> Dict[Tuple[str, str], Union[Tuple[float, float], HTTPException]]:
+        """
+        Geocode distinct (location_type, location_value) pairs concurrently.
+        
+        City lookups still go to Nominatim one at a time, at most one per
+        second; only ZIP lookups and cache hits run in parallel.
+        
+        Args:
+            locations: Pairs to geocode; duplicates are looked up once
+            concurrency: Maximum geocoder requests in flight
+            
+        Returns:
+            Mapping of each pair to its (latitude, longitude) or the HTTPException it raised
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def resolve(location_type: str, location_value: str):
+            async with semaphore:
+                try:
+                    return await LocationService.geocode_location(location_type, location_value)
+                except HTTPException as e:
+                    return e
+                except Exception:
+                    # An unexpected payload fails this item, not the whole import
+                    logger.exception("Error geocoding %s %r", location_type, location_value)
+                    return HTTPException(status_code=503, detail="Geocoding service error")
+        
+        distinct = list(dict.fromkeys(locations))
+        results = await asyncio.gather(*(resolve(t, v) for t, v in distinct))
+        return dict(zip(distinct, results))
@@ -0,0 +1,502 @@
+"""
+Radius-superset caching for observation queries.
+
+eBird geo endpoints are queried once per center at the maximum supported
+radius; every smaller radius around the same center is then served locally by
+filtering an array-backed copy of the cached observations with a vectorized
+haversine distance.
+
+Observations are held as an ``ObservationBatch`` (parallel columns with
+interned strings); ``ObservedBird`` models are only built for the page a
+response returns.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from .. import schemas
+from ..tracing import span
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# eBird geo endpoints cap "dist" at 50 km
+MAX_UPSTREAM_RADIUS_KM = 50
+SUPERSET_FETCH_ENABLED = os.getenv("SUPERSET_FETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+OBSERVATION_CACHE_TTL_SECONDS = int(os.getenv("OBSERVATION_CACHE_TTL_SECONDS", "300"))
+OBSERVATION_CACHE_MAX_ENTRIES = int(os.getenv("OBSERVATION_CACHE_MAX_ENTRIES", "512"))
+
+# Distance (km) from a cached fetch center within which a new request center is
+# treated as the same point. Covers float noise from clients re-sending coordinates.
+_CENTER_TOLERANCE_KM = 0.05
+_MAX_SETS_PER_CELL = 4
+
+# numpy (optional, for vectorized distance math) once imported; False when it is not installed
+_np: Any = None
+
+
+def _numpy():
+    """numpy, or None without it; imported on first use so it does not slow down app startup."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - exercised when numpy is not installed
+            _np = False
+        else:
+            _np = numpy
+    return _np or None
+
+
+def haversine_km(lat: float, lng: float, lats, lngs):
+    """Great-circle distance from (lat, lng) to each point of ``lats``/``lngs``.
+
+    Uses NumPy when available and returns an array of the same kind as the
+    inputs (``numpy.ndarray`` or ``array('d')``).
+    """
+    np = _numpy()
+    if np is not None and isinstance(lats, np.ndarray):
+        lat1 = math.radians(lat)
+        lat2 = np.radians(lats)
+        dlat = lat2 - lat1
+        dlng = np.radians(lngs) - math.radians(lng)
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    lat1 = math.radians(lat)
+    lng1 = math.radians(lng)
+    cos_lat1 = math.cos(lat1)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    out = array("d", bytes(8 * len(lats)))
+    for i in range(len(lats)):
+        lat2 = radians(lats[i])
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(lngs[i]) - lng1) / 2) ** 2
+        out[i] = 2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0)))
+    return out
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _coordinate_array(values: Sequence[float]):
+    np = _numpy()
+    if np is not None:
+        return np.fromiter(values, dtype=np.float64, count=len(values))
+    return array("d", values)
+
+
+_NO_COUNT = -1  # how_many column value for "present, not counted" (None in the API)
+
+
+def _intern(value: Any, default: Optional[str]) -> Optional[str]:
+    if value is None:
+        return default
+    return sys.intern(value) if type(value) is str else sys.intern(str(value))
+
+
+class ObservationBatch:
+    """Observations as parallel columns rather than one model per sighting.
+
+    Strings that repeat across records (species, locations, dates, observers)
+    are interned, so each distinct value is stored once per process, and
+    coordinates are float arrays ready for vectorized distance math. Batches
+    are shared between requests and never modified after construction.
+    """
+
+    __slots__ = (
+        "species", "species_codes", "locs", "loc_ids", "dates", "lats", "lngs", "how_many", "observers",
+        "_version",
+    )
+
+    def __init__(
+        self,
+        species: List[str],
+        species_codes: List[str],
+        locs: List[str],
+        loc_ids: List[str],
+        dates: List[str],
+        lats,
+        lngs,
+        how_many: "array[int]",
+        observers: List[Optional[str]],
+    ):
+        self.species = species
+        self.species_codes = species_codes
+        self.locs = locs
+        self.loc_ids = loc_ids
+        self.dates = dates
+        self.lats = lats
+        self.lngs = lngs
+        self.how_many = how_many
+        self.observers = observers
+        self._version: Optional[str] = None
+
+    @classmethod
+    def from_ebird(cls, items: Iterable[Mapping[str, Any]], default_species_code: str = "") -> "ObservationBatch":
+        """Build a batch from eBird observation records (``comName``, ``locName``, ...)."""
+        species, codes, locs, loc_ids, dates, lats, lngs, observers = [], [], [], [], [], [], [], []
+        how_many = array("l")
+        for item in items:
+            species.append(_intern(item.get("comName"), "unknown"))
+            codes.append(_intern(item.get("speciesCode"), default_species_code))
+            locs.append(_intern(item.get("locName"), ""))
+            loc_ids.append(_intern(item.get("locId"), ""))
+            dates.append(_intern(item.get("obsDt"), ""))
+            lats.append(item.get("lat") or 0.0)
+            lngs.append(item.get("lng") or 0.0)
+            count = item.get("howMany")
+            how_many.append(count if type(count) is int and count >= 0 else _NO_COUNT)
+            observers.append(_intern(item.get("userDisplayName"), None))
+        return cls(
+            species, codes, locs, loc_ids, dates,
+            _coordinate_array(lats), _coordinate_array(lngs), how_many, observers,
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]], fields: Sequence[str]) -> "ObservationBatch":
+        """Build a batch from eBird records flattened to lists in ``fields`` order."""
+        if not rows:
+            return cls.empty()
+        columns = dict(zip(fields, zip(*rows)))
+
+        def strings(name: str, default: Optional[str]) -> List[Optional[str]]:
+            return [_intern(value, default) for value in columns[name]]
+
+        return cls(
+            strings("comName", "unknown"),
+            strings("speciesCode", ""),
+            strings("locName", ""),
+            strings("locId", ""),
+            strings("obsDt", ""),
+            _coordinate_array([value or 0.0 for value in columns["lat"]]),
+            _coordinate_array([value or 0.0 for value in columns["lng"]]),
+            array("l", (
+                value if type(value) is int and value >= 0 else _NO_COUNT for value in columns["howMany"]
+            )),
+            strings("userDisplayName", None),
+        )
+
+    @classmethod
+    def empty(cls) -> "ObservationBatch":
+        return cls([], [], [], [], [], _coordinate_array([]), _coordinate_array([]), array("l"), [])
+
+    @classmethod
+    def concat(cls, batches: Sequence["ObservationBatch"]) -> "ObservationBatch":
+        if len(batches) == 1:
+            return batches[0]
+        if not batches:
+            return cls.empty()
+
+        def joined(name: str) -> list:
+            out: list = []
+            for batch in batches:
+                out.extend(getattr(batch, name))
+            return out
+
+        how_many = array("l")
+        for batch in batches:
+            how_many.extend(batch.how_many)
+        return cls(
+            joined("species"), joined("species_codes"), joined("locs"), joined("loc_ids"), joined("dates"),
+            _coordinate_array(joined("lats")), _coordinate_array(joined("lngs")), how_many, joined("observers"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.species_codes)
+
+    @property
+    def version(self) -> str:
+        """Digest of the rows in order; equal across workers that fetched the same data."""
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=8)
+            for column in (self.species_codes, self.loc_ids, self.dates, self.observers):
+                digest.update("\x1f".join(value or "" for value in column).encode())
+                digest.update(b"\x1e")
+            digest.update(bytes(self.how_many))
+            digest.update(bytes(self.lats))
+            digest.update(bytes(self.lngs))
+            self._version = digest.hexdigest()
+        return self._version
+
+    def take(self, indices: Sequence[int]) -> "ObservationBatch":
+        """A new batch with the rows at ``indices``, in that order."""
+        np = _numpy()
+        if np is not None and isinstance(self.lats, np.ndarray):
+            index_array = np.asarray(indices, dtype=np.intp)
+            lats, lngs = self.lats[index_array], self.lngs[index_array]
+        else:
+            lats = array("d", (self.lats[i] for i in indices))
+            lngs = array("d", (self.lngs[i] for i in indices))
+        return ObservationBatch(
+            [self.species[i] for i in indices],
+            [self.species_codes[i] for i in indices],
+            [self.locs[i] for i in indices],
+            [self.loc_ids[i] for i in indices],
+            [self.dates[i] for i in indices],
+            lats,
+            lngs,
+            array("l", (self.how_many[i] for i in indices)),
+            [self.observers[i] for i in indices],
+        )
+
+    def count(self, i: int) -> Optional[int]:
+        value = self.how_many[i]
+        return None if value == _NO_COUNT else value
+
+    def to_model(self, i: int, distance: Optional[float] = None) -> schemas.ObservedBird:
+        return schemas.ObservedBird(
+            species=self.species[i],
+            species_code=self.species_codes[i],
+            loc=self.locs[i],
+            loc_id=self.loc_ids[i],
+            date=self.dates[i],
+            lat=float(self.lats[i]),
+            lng=float(self.lngs[i]),
+            how_many=self.count(i),
+            user_display_name=self.observers[i],
+            distance_km=distance,
+        )
+
+    def to_models(self) -> List[schemas.ObservedBird]:
+        return [self.to_model(i) for i in range(len(self))]
+
+
+class ObservationSet:
+    """Observations fetched around one center, with coordinate arrays for filtering."""
+
+    __slots__ = ("lat", "lng", "radius_km", "batch", "fetched_at")
+
+    def __init__(self, lat: float, lng: float, radius_km: float, batch: ObservationBatch):
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = radius_km
+        self.batch = batch
+        self.fetched_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+    def distances(self, lat: float, lng: float):
+        return haversine_km(lat, lng, self.batch.lats, self.batch.lngs)
+
+    def covers(self, lat: float, lng: float, radius_km: float) -> bool:
+        """True if a circle of ``radius_km`` around (lat, lng) lies inside this set's circle."""
+        offset = distance_km(self.lat, self.lng, lat, lng)
+        if offset <= _CENTER_TOLERANCE_KM:
+            offset = 0.0
+        return offset + radius_km <= self.radius_km
+
+    def within(self, lat: float, lng: float, radius_km: float) -> ObservationBatch:
+        """Observations within ``radius_km`` of (lat, lng), in upstream order."""
+        if radius_km >= self.radius_km:
+            return self.batch
+        return self.batch.take(within_radius(self.distances(lat, lng), radius_km))
+
+
+def within_radius(distances, radius_km: float) -> Sequence[int]:
+    """Indices of ``distances`` (from ``haversine_km``) that are at most ``radius_km``."""
+    np = _numpy()
+    if np is not None and isinstance(distances, np.ndarray):
+        return np.flatnonzero(distances <= radius_km)
+    return [i for i, d in enumerate(distances) if d <= radius_km]
+
+
+Fetcher = Callable[[float, float, int], Awaitable[ObservationBatch]]
+
+
+class SupersetCache:
+    """TTL/LRU cache of ``ObservationSet`` fetched at the maximum radius.
+
+    Entries are keyed by caller-supplied scope (endpoint, species, ...) and a
+    coarse grid cell; concurrent misses for the same key share one upstream call.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = OBSERVATION_CACHE_TTL_SECONDS,
+        max_entries: int = OBSERVATION_CACHE_MAX_ENTRIES,
+        superset_radius_km: int = MAX_UPSTREAM_RADIUS_KM,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.superset_radius_km = superset_radius_km
+        self._entries: "OrderedDict[Hashable, List[ObservationSet]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cell(lat: float, lng: float) -> tuple:
+        # ~1 km cells; only used to find candidate sets, coverage is checked exactly
+        return round(lat, 2), round(lng, 2)
+
+    def _lookup(self, key: Hashable, lat: float, lng: float, radius_km: float) -> Optional[ObservationSet]:
+        sets = self._entries.get(key)
+        if not sets:
+            return None
+        now = time.monotonic()
+        fresh = [s for s in sets if now - s.fetched_at < self.ttl_seconds]
+        if len(fresh) != len(sets):
+            if fresh:
+                self._entries[key] = fresh
+            else:
+                del self._entries[key]
+                return None
+        self._entries.move_to_end(key)
+        for observation_set in fresh:
+            if observation_set.covers(lat, lng, radius_km):
+                return observation_set
+        return None
+
+    def _store(self, key: Hashable, observation_set: ObservationSet) -> None:
+        sets = self._entries.setdefault(key, [])
+        sets.append(observation_set)
+        # A cell only needs a few distinct centers; keep the most recent ones
+        del sets[:-_MAX_SETS_PER_CELL]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(
+        self, scope: Hashable, lat: float, lng: float, radius_km: int, fetch: Fetcher
+    ) -> ObservationBatch:
+        """Serve ``radius_km`` around (lat, lng), fetching the superset on a miss."""
+        if not SUPERSET_FETCH_ENABLED or radius_km > self.superset_radius_km:
+            return await fetch(lat, lng, radius_km)
+
+        key = (scope, self._cell(lat, lng))
+        observation_set = self._lookup(key, lat, lng, radius_km)
+        if observation_set is not None:
+            self.hits += 1
+            return observation_set.within(lat, lng, radius_km)
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, lat, lng, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a cancelled request does not abort a fetch others are waiting on
+        observation_set = await asyncio.shield(task)
+        if not observation_set.covers(lat, lng, radius_km):
+            # Joined a fetch for a nearby but different center
+            return await fetch(lat, lng, radius_km)
+        return observation_set.within(lat, lng, radius_km)
+
+    async def _fill(self, key: Hashable, lat: float, lng: float, fetch: Fetcher) -> ObservationSet:
+        batch = await fetch(lat, lng, self.superset_radius_km)
+        observation_set = ObservationSet(lat, lng, self.superset_radius_km, batch)
+        self._store(key, observation_set)
+        logger.debug("Superset fetch for %s returned %d observations", key, len(batch))
+        return observation_set
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+SORT_KEYS = ("distance", "date", "count")
+MAX_PAGE_SIZE = 500
+
+
+def validate_date_param(value: Optional[str], name: str) -> None:
+    """Reject date filters that are not YYYY-MM-DD."""
+    if not value:
+        return
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} format. Use YYYY-MM-DD")
+
+
+def _encode_cursor(offset: int, fingerprint: str, version: str) -> str:
+    raw = json.dumps({"o": offset, "f": fingerprint, "v": version}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, fingerprint: str, version: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        offset = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("f") != fingerprint or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not match this query")
+    # An offset into other data would skip or repeat rows
+    if data.get("v") != version:
+        raise HTTPException(status_code=409, detail="Results have changed; start again from the first page")
+    return offset
+
+
+def query_observations(
+    items: ObservationBatch,
+    lat: float,
+    lng: float,
+    sort: Optional[str] = None,
+    since: Optional[str] = None,
+    min_count: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    scope: Hashable = None,
+) -> Tuple[List[schemas.ObservedBird], int, Optional[str]]:
+    """Filter, sort and page an observation batch around (lat, lng).
+
+    Every returned observation carries ``distance_km`` from the center. Sorting
+    is by ascending distance, newest date first, or largest count first;
+    ties keep upstream order. Returns ``(page, total_matches, next_cursor)``;
+    models are only built for the returned page. A cursor is tied to the
+    observations it was issued for: once they are refetched and differ, it
+    gets 409 and the client starts over from the first page.
+    """
+    if sort is not None and sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_KEYS)}")
+
+    with span("query"):
+        distances = haversine_km(lat, lng, items.lats, items.lngs)
+        dates = items.dates
+        counts = items.how_many
+
+        indices = range(len(items))
+        if since:
+            indices = [i for i in indices if dates[i] >= since]
+        if min_count is not None:
+            indices = [i for i in indices if counts[i] != _NO_COUNT and counts[i] >= min_count]
+
+        if sort == "distance":
+            indices = sorted(indices, key=distances.__getitem__)
+        elif sort == "date":
+            indices = sorted(indices, key=dates.__getitem__, reverse=True)
+        elif sort == "count":
+            # Uncounted ("X") sorts like zero
+            indices = sorted(indices, key=lambda i: max(counts[i], 0), reverse=True)
+        indices = list(indices)
+        total = len(indices)
+        # Only cursors need it; unpaged requests skip the digest
+        version = items.version if cursor or limit is not None else ""
+
+    fingerprint = hashlib.sha1(repr((scope, lat, lng, sort, since, min_count)).encode()).hexdigest()[:12]
+    offset = _decode_cursor(cursor, fingerprint, version) if cursor else 0
+    end = total if limit is None else min(total, offset + min(limit, MAX_PAGE_SIZE))
+    next_cursor = _encode_cursor(end, fingerprint, version) if end < total else None
+
+    with span("build"):
+        page = [items.to_model(i, round(float(distances[i]), 3)) for i in indices[offset:end]]
+    return page, total, next_cursor
@@ -0,0 +1,211 @@
+"""
+Per-region species lists as bitsets over the packed taxonomy.
+
+eBird's spplist product gives the species codes ever reported in a region. The
+code lists are cached on disk under ``CACHE_DIR`` (shared by workers) and kept
+in memory as one bit per taxonomy entry, so checking whether a suggestion
+candidate occurs in the user's region is a single bit test.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from ..http_client import get_client
+from ..tracing import span
+from .hotspots import HotspotService
+from .locations import LocationService
+from .taxonomy_store import CACHE_DIR, PackedTaxonomy
+
+logger = logging.getLogger(__name__)
+
+EBIRD_API_BASE_URL = os.getenv("EBIRD_API_BASE_URL", "https://api.ebird.org/v2")
+EBIRD_SPPLIST_URL = EBIRD_API_BASE_URL + "/product/spplist/{region_code}"
+
+SPPLIST_TTL_SECONDS = int(os.getenv("SPPLIST_TTL_SECONDS", str(60 * 60 * 24 * 7)))
+SPPLIST_MAX_REGIONS = int(os.getenv("SPPLIST_MAX_REGIONS", "256"))
+# After a failed fetch, suggestions for that region use global ranking for this long
+SPPLIST_RETRY_SECONDS = int(os.getenv("SPPLIST_RETRY_SECONDS", "300"))
+
+REGION_CODE_PATTERN = r"^[A-Z]{2}(-[A-Z0-9]{1,3}){0,2}$"
+_REGION_CODE_RE = re.compile(REGION_CODE_PATTERN)
+
+# Points resolve to the region of the nearest synced hotspot within this distance
+_HOTSPOT_REGION_RADIUS_KM = 50
+_REVERSE_CACHE_SIZE = 4096
+
+
+class RegionalBitset:
+    """Which taxonomy entries occur in a region, one bit per entry."""
+
+    __slots__ = ("region_code", "bits", "members", "taxonomy_built_at", "fetched_at")
+
+    def __init__(self, region_code: str, bits: bytearray, taxonomy_built_at: float, fetched_at: float):
+        self.region_code = region_code
+        self.bits = bits
+        # Set indices in taxonomy order, for searching only the regional species
+        self.members = array("I", (
+            (byte_index << 3) | bit
+            for byte_index, byte in enumerate(bits) if byte
+            for bit in range(8) if byte & (1 << bit)
+        ))
+        self.taxonomy_built_at = taxonomy_built_at
+        self.fetched_at = fetched_at
+
+    def __contains__(self, index: int) -> bool:
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+
+class RegionalSpeciesIndex:
+    """Per-process LRU of regional bitsets backed by a shared on-disk code list cache."""
+
+    def __init__(self, directory: str | Path = CACHE_DIR, max_regions: int = SPPLIST_MAX_REGIONS):
+        self.directory = Path(directory) / "spplist"
+        self.max_regions = max_regions
+        self._bitsets: "OrderedDict[str, RegionalBitset]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._code_index: Optional[Tuple[float, Dict[str, int]]] = None
+
+    def _codes_to_index(self, taxonomy: PackedTaxonomy) -> Dict[str, int]:
+        if self._code_index is None or self._code_index[0] != taxonomy.built_at:
+            mapping = {taxonomy.species_code(i): i for i in range(len(taxonomy))}
+            self._code_index = (taxonomy.built_at, mapping)
+        return self._code_index[1]
+
+    def _build(self, region_code: str, codes: List[str], fetched_at: float, taxonomy: PackedTaxonomy) -> RegionalBitset:
+        mapping = self._codes_to_index(taxonomy)
+        bits = bytearray((len(taxonomy) + 7) // 8)
+        for code in codes:
+            index = mapping.get(code)
+            if index is not None:
+                bits[index >> 3] |= 1 << (index & 7)
+        return RegionalBitset(region_code, bits, taxonomy.built_at, fetched_at)
+
+    def _read_disk(self, region_code: str) -> Optional[Tuple[float, List[str]]]:
+        try:
+            data = json.loads((self.directory / f"{region_code}.json").read_text())
+            return float(data["fetched_at"]), list(data["codes"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_disk(self, region_code: str, fetched_at: float, codes: List[str]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{region_code}.")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump({"fetched_at": fetched_at, "codes": codes}, fh)
+            os.replace(tmp_path, self.directory / f"{region_code}.json")
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < SPPLIST_TTL_SECONDS
+
+    async def _load(self, region_code: str, taxonomy: PackedTaxonomy) -> RegionalBitset:
+        cached = await asyncio.to_thread(self._read_disk, region_code)
+        if cached is None or not self._is_fresh(cached[0]):
+            codes = await _fetch_spplist(region_code)
+            fetched_at = time.time()
+            await asyncio.to_thread(self._write_disk, region_code, fetched_at, codes)
+            cached = (fetched_at, codes)
+        bitset = self._build(region_code, cached[1], cached[0], taxonomy)
+        self._failed_at.pop(region_code, None)
+        self._bitsets[region_code] = bitset
+        self._bitsets.move_to_end(region_code)
+        while len(self._bitsets) > self.max_regions:
+            self._bitsets.popitem(last=False)
+        return bitset
+
+    async def get(self, region_code: str, taxonomy: PackedTaxonomy) -> Optional[RegionalBitset]:
+        """Bitset for ``region_code`` over ``taxonomy``, or None if the list is unavailable."""
+        bitset = self._bitsets.get(region_code)
+        if bitset is not None and bitset.taxonomy_built_at == taxonomy.built_at and self._is_fresh(bitset.fetched_at):
+            self._bitsets.move_to_end(region_code)
+            return bitset
+
+        failed_at = self._failed_at.get(region_code)
+        if failed_at is not None and time.monotonic() - failed_at < SPPLIST_RETRY_SECONDS:
+            return bitset  # Possibly stale, or None
+        task = self._inflight.get(region_code)
+        if task is None:
+            task = asyncio.ensure_future(self._load(region_code, taxonomy))
+            self._inflight[region_code] = task
+            task.add_done_callback(lambda _: self._inflight.pop(region_code, None))
+        try:
+            # Shielded so one cancelled keystroke does not abort a load others wait on
+            return await asyncio.shield(task)
+        except Exception as e:
+            # Suggestions still work without regional ranking; an expired list beats none
+            if not isinstance(e, HTTPException):
+                # Upstream errors are logged where they are raised; anything else is unexpected
+                logger.warning("Loading species list for %s failed", region_code, exc_info=True)
+            self._failed_at[region_code] = time.monotonic()
+            return bitset
+
+
+async def _fetch_spplist(region_code: str) -> List[str]:
+    """Call the eBird species list endpoint for one region."""
+    api_key = os.getenv("EBIRD_API_KEY", "")
+    if not api_key:
+        logger.error("EBIRD_API_KEY not configured")
+        raise HTTPException(status_code=500, detail="eBird API key not configured")
+
+    client = get_client()
+    try:
+        with span("ebird_spplist"):
+            response = await client.get(
+                EBIRD_SPPLIST_URL.format(region_code=region_code),
+                headers={"X-eBirdApiToken": api_key},
+                timeout=10.0,
+            )
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.warning("Species list for %s failed: %s", region_code, e.response.status_code)
+        raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch regional species list")
+    except httpx.RequestError as e:
+        logger.warning("Species list request error for %s: %s", region_code, str(e))
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    return [code for code in response.json() if isinstance(code, str)]
+
+
+_reverse_cache: "OrderedDict[Tuple[float, float], Optional[str]]" = OrderedDict()
+
+
+def is_region_code(value: str) -> bool:
+    return bool(_REGION_CODE_RE.match(value))
+
+
+async def resolve_region(lat: float, lng: float) -> Optional[str]:
+    """eBird region code (e.g. "US-CO") for a point, or None if it cannot be found."""
+    region_code = HotspotService.region_near(lat, lng, _HOTSPOT_REGION_RADIUS_KM)
+    if region_code:
+        return region_code
+
+    # Regions are large; ~10 km cells keep typing from re-querying the geocoder
+    cell = (round(lat, 1), round(lng, 1))
+    if cell in _reverse_cache:
+        _reverse_cache.move_to_end(cell)
+        return _reverse_cache[cell]
+    try:
+        region_code = await LocationService.reverse_region(lat, lng)
+    except HTTPException:
+        return None  # Not cached: the geocoder may be back next time
+    if region_code and not is_region_code(region_code):
+        region_code = None
+    _reverse_cache[cell] = region_code
+    while len(_reverse_cache) > _REVERSE_CACHE_SIZE:
+        _reverse_cache.popitem(last=False)
+    return region_code
@@ -0,0 +1,261 @@
+"""
+Persistent cache of upstream HTTP responses.
+
+Successful GET responses from eBird and the geocoders are stored in a SQLite
+file under ``CACHE_DIR`` keyed by the normalized request (endpoint, URL and
+sorted parameters; credentials are never part of the key). The file survives
+restarts and is shared by all workers, so a fresh deploy serves warm data
+instead of replaying every lookup upstream. Species photo lookups are stored in
+the same file, keyed by species code (see ``species_images``).
+
+Each endpoint has its own TTL. The total size is capped; when a write goes over
+the cap, expired entries are dropped first and then the least recently used.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, AsyncContextManager, Callable, Dict, Iterable, Mapping, Optional
+
+import httpx
+
+from ..http_client import get_client
+from ..tracing import span
+from .taxonomy_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Recent observations change constantly; match the in-memory observation cache
+RESPONSE_CACHE_OBSERVATIONS_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_OBSERVATIONS_TTL_SECONDS", "300"))
+# Places do not move
+RESPONSE_CACHE_GEOCODE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_GEOCODE_TTL_SECONDS", str(60 * 60 * 24 * 30)))
+
+# TTL and whether parameter values are case-insensitive upstream, per endpoint
+ENDPOINT_POLICIES: Dict[str, Dict[str, Any]] = {
+    "ebird_notable": {"ttl": RESPONSE_CACHE_OBSERVATIONS_TTL_SECONDS, "fold_case": False},
+    "ebird_species": {"ttl": RESPONSE_CACHE_OBSERVATIONS_TTL_SECONDS, "fold_case": False},
+    "zippopotam": {"ttl": RESPONSE_CACHE_GEOCODE_TTL_SECONDS, "fold_case": False},
+    "nominatim_search": {"ttl": RESPONSE_CACHE_GEOCODE_TTL_SECONDS, "fold_case": True},
+    "nominatim_reverse": {"ttl": RESPONSE_CACHE_GEOCODE_TTL_SECONDS, "fold_case": False},
+}
+
+# A hit refreshes its LRU position at most this often, so hot keys do not turn reads into writes
+_TOUCH_INTERVAL_SECONDS = 60
+# Eviction frees down to this fraction of the cap so it does not run on every write
+_EVICT_TO_FRACTION = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS ix_responses_expires_at ON responses (expires_at);
+"""
+
+
+def request_key(endpoint: str, url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """Stable key for a request: parameter order, ``None`` values and (optionally) case do not matter."""
+    fold_case = ENDPOINT_POLICIES.get(endpoint, {}).get("fold_case", False)
+    normalized = []
+    for name, value in sorted((params or {}).items()):
+        if value is None:
+            continue
+        value = " ".join(str(value).split())
+        normalized.append((name, value.casefold() if fold_case else value))
+    raw = json.dumps([endpoint, url, normalized], separators=(",", ":"))
+    return hashlib.blake2b(raw.encode(), digest_size=20).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store shared by every worker on the host."""
+
+    def __init__(self, path: str | Path | None = None, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.path = Path(path) if path is not None else Path(CACHE_DIR) / "responses.sqlite3"
+        self.max_bytes = max_bytes
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            # WAL lets workers read while another one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT body, expires_at, accessed_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            if now - row[2] > _TOUCH_INTERVAL_SECONDS:
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(row[0])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Unexpired bodies for ``keys`` in one query; missing keys are left out."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            connection = self._connect()
+            stale = []
+            # Well under SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT key, body, expires_at, accessed_at FROM responses WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, body, expires_at, accessed_at in rows:
+                    if expires_at <= now:
+                        continue
+                    found[key] = body
+                    if now - accessed_at > _TOUCH_INTERVAL_SECONDS:
+                        stale.append((now, key))
+            if stale:
+                connection.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", stale)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {key: zlib.decompress(body) for key, body in found.items()}
+
+    def put(self, key: str, endpoint: str, body: bytes, ttl_seconds: float) -> None:
+        compressed = zlib.compress(body, 1)
+        if len(compressed) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, body, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, compressed, len(compressed), now + ttl_seconds, now),
+            )
+            # Other workers write too, so the running total is re-read whenever it might be over
+            if self._size is None or self._size + len(compressed) > self.max_bytes:
+                self._size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            else:
+                self._size += len(compressed)
+            if self._size > self.max_bytes:
+                self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        target = int(self.max_bytes * _EVICT_TO_FRACTION)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if size > target:
+                # Oldest-accessed rows until the running total fits
+                rows = connection.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+                doomed = []
+                for key, row_size in rows:
+                    if size <= target:
+                        break
+                    doomed.append((key,))
+                    size -= row_size
+                connection.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._size = size
+        logger.info("Response cache evicted down to %d bytes", size)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._size or 0}
+
+
+response_cache = ResponseCache()
+
+
+async def cached_get(
+    endpoint: str,
+    url: str,
+    params: Optional[Mapping[str, Any]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    throttle: Optional[Callable[[], AsyncContextManager[Any]]] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """``GET`` through the shared client, answered from the response cache when possible.
+
+    Drop-in for ``get_client().get(...)``: a hit comes back as a synthetic 200
+    response, so callers keep their status and error handling. Only 200
+    responses are stored; a broken cache file never fails the request.
+    ``throttle`` wraps the upstream call only, so hits are never delayed.
+    """
+    policy = ENDPOINT_POLICIES.get(endpoint)
+    client = get_client()
+
+    async def fetch() -> httpx.Response:
+        if throttle is None:
+            with span(endpoint):
+                return await client.get(url, params=params, headers=headers, **kwargs)
+        async with throttle():
+            with span(endpoint):
+                return await client.get(url, params=params, headers=headers, **kwargs)
+
+    if not RESPONSE_CACHE_ENABLED or policy is None:
+        return await fetch()
+
+    key = request_key(endpoint, url, params)
+    try:
+        with span("response_cache"):
+            body = await asyncio.to_thread(response_cache.get, key)
+    except sqlite3.Error as e:
+        logger.warning("Response cache read failed for %s: %s", endpoint, e)
+        body = None
+    if body is not None:
+        return httpx.Response(
+            200,
+            content=body,
+            headers={"content-type": "application/json"},
+            request=httpx.Request("GET", url, params=params),
+        )
+
+    response = await fetch()
+    if response.status_code == 200:
+        try:
+            await asyncio.to_thread(response_cache.put, key, endpoint, response.content, policy["ttl"])
+        except sqlite3.Error as e:
+            logger.warning("Response cache write failed for %s: %s", endpoint, e)
+    return response
@@ -1,44 +1,42 @@
+import heapq
 import os
-import time
 import logging
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 from fastapi import HTTPException
 
-from .. import schemas
+from ..http_client import error_excerpt, get_client
+from .observations import ObservationBatch, SupersetCache
+from .regions import RegionalSpeciesIndex
+from .response_cache import cached_get
+from .taxonomy_store import PackedTaxonomy, SharedTaxonomy, TaxonomyEntry
 
 logger = logging.getLogger(__name__)
 
-EBIRD_TAXONOMY_URL = "https://api.ebird.org/v2/ref/taxonomy/ebird"
-EBIRD_SPECIES_GEO_URL = "https://api.ebird.org/v2/data/obs/geo/recent/{species_code}"
+EBIRD_API_BASE_URL = os.getenv("EBIRD_API_BASE_URL", "https://api.ebird.org/v2")
+EBIRD_TAXONOMY_URL = f"{EBIRD_API_BASE_URL}/ref/taxonomy/ebird"
+EBIRD_TAXONOMY_VERSIONS_URL = f"{EBIRD_API_BASE_URL}/ref/taxa/versions"
+EBIRD_SPECIES_GEO_URL = EBIRD_API_BASE_URL + "/data/obs/geo/recent/{species_code}"
 
 
-# Simple in-memory cache for taxonomy
-_taxonomy_cache: List[Dict[str, Any]] | None = None
-_taxonomy_cached_at: float | None = None
-_taxonomy_ttl_seconds = 60 * 60 * 12  # 12 hours
+# Taxonomy lives in a packed, memory-mapped file shared by all worker processes
+_taxonomy_store = SharedTaxonomy()
+# How often the stored taxonomy version is checked against eBird's; the full
+# download only happens when the version changed (about once a year)
+TAXONOMY_TTL_SECONDS = int(os.getenv("TAXONOMY_TTL_SECONDS", str(60 * 60)))
+# When the version check fails, the current copy is kept and the check retried after this long
+TAXONOMY_VERSION_RETRY_SECONDS = int(os.getenv("TAXONOMY_VERSION_RETRY_SECONDS", "300"))
 
+# Species reported per region, as bitsets over the taxonomy
+_regional_index = RegionalSpeciesIndex()
 
-async def _get_httpx_client() -> httpx.AsyncClient:
-    return httpx.AsyncClient(timeout=15)
+# Per-species observations fetched at the max radius per center
+_observations_cache = SupersetCache()
 
 
-async def load_taxonomy(force_refresh: bool = False) -> List[Dict[str, Any]]:
-    """Load eBird taxonomy with minimal fields and cache it in memory.
-
-    Returns a list of dicts containing at least comName, sciName, speciesCode.
-    """
-    global _taxonomy_cache, _taxonomy_cached_at
-
-    if (
-        not force_refresh
-        and _taxonomy_cache is not None
-        and _taxonomy_cached_at is not None
-        and (time.time() - _taxonomy_cached_at) < _taxonomy_ttl_seconds
-    ):
-        return _taxonomy_cache
-
+async def _download_taxonomy() -> List[TaxonomyEntry]:
+    """Fetch the eBird taxonomy and keep only the fields we search on."""
     api_key = os.getenv("EBIRD_API_KEY", "")
     if not api_key:
         logger.error("EBIRD_API_KEY not configured")
@@ -51,74 +49,122 @@ async def load_taxonomy(force_refresh: bool = False) -> List[Dict[str, Any]]:
 
     headers = {"X-eBirdApiToken": api_key}
 
-    async with await _get_httpx_client() as client:
-        try:
-            resp = await client.get(EBIRD_TAXONOMY_URL, params=params, headers=headers)
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            logger.error("Taxonomy load failed: %s - %s", e.response.status_code, e.response.text)
-            raise HTTPException(status_code=e.response.status_code, detail="Failed to load taxonomy")
-        except httpx.RequestError as e:
-            logger.error("Taxonomy request error: %s", str(e))
-            raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    client = get_client()
+    try:
+        resp = await client.get(EBIRD_TAXONOMY_URL, params=params, headers=headers)
+        resp.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.error("Taxonomy load failed: %s - %s", e.response.status_code, error_excerpt(e.response))
+        raise HTTPException(status_code=e.response.status_code, detail="Failed to load taxonomy")
+    except httpx.RequestError as e:
+        logger.error("Taxonomy request error: %s", str(e))
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
 
-        data = resp.json()
+    data = resp.json()
 
     # Normalize fields we care about
-    taxonomy: List[Dict[str, Any]] = []
+    taxonomy: List[TaxonomyEntry] = []
     for item in data:
         com_name = item.get("comName")
         sci_name = item.get("sciName")
         species_code = item.get("speciesCode")
         if com_name and species_code:
-            taxonomy.append(
-                {
-                    "comName": com_name,
-                    "sciName": sci_name,
-                    "speciesCode": species_code,
-                }
-            )
-
-    _taxonomy_cache = taxonomy
-    _taxonomy_cached_at = time.time()
+            taxonomy.append((com_name, sci_name or "", species_code))
+
     logger.info("Loaded taxonomy entries: %d", len(taxonomy))
     return taxonomy
 
 
-async def search_species_suggestions(query: str, limit: int = 10) -> List[Dict[str, str]]:
-    """Search taxonomy for species suggestions by common or scientific name."""
+async def _taxonomy_version() -> Optional[str]:
+    """Current eBird taxonomy version, or None if it cannot be determined."""
+    api_key = os.getenv("EBIRD_API_KEY", "")
+    if not api_key:
+        return None
+    try:
+        resp = await get_client().get(EBIRD_TAXONOMY_VERSIONS_URL, headers={"X-eBirdApiToken": api_key})
+        resp.raise_for_status()
+        versions = resp.json()
+    except httpx.HTTPStatusError as e:
+        logger.warning("Taxonomy version check failed: %s - %s", e.response.status_code, error_excerpt(e.response))
+        return None
+    except (httpx.RequestError, ValueError) as e:
+        logger.warning("Taxonomy version check error: %s", str(e))
+        return None
+
+    latest = [item for item in versions if item.get("latest")] or versions
+    if not latest:
+        return None
+    return str(max(item.get("authorityVer", 0) for item in latest))
+
+
+async def load_taxonomy(force_refresh: bool = False) -> PackedTaxonomy:
+    """Load the eBird taxonomy, shared between workers through a memory-mapped file.
+
+    Returns a read-only sequence of dicts containing comName, sciName, speciesCode.
+    Only one process refreshes when the shared copy is missing or stale, and a
+    stale copy is only downloaded again when eBird's taxonomy version changed.
+    """
+    return await _taxonomy_store.get(
+        TAXONOMY_TTL_SECONDS, _download_taxonomy, force_refresh, _taxonomy_version, TAXONOMY_VERSION_RETRY_SECONDS
+    )
+
+
+async def suggestion_data_version(region_code: Optional[str] = None) -> Tuple[Any, ...]:
+    """Versions of the data suggestions are computed from (for ETags)."""
+    taxonomy = await load_taxonomy()
+    regional = await _regional_index.get(region_code, taxonomy) if region_code else None
+    return taxonomy.version, taxonomy.built_at, regional.fetched_at if regional is not None else None
+
+
+async def search_species_suggestions(
+    query: str, limit: int = 10, region_code: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """Search taxonomy for species suggestions by common or scientific name.
+
+    With ``region_code``, species reported in that eBird region rank ahead of
+    the rest; if the regional list cannot be loaded the global ranking is used.
+    """
     if not query:
         return []
     taxonomy = await load_taxonomy()
     q = query.lower().strip()
-
-    matches: List[Tuple[int, Dict[str, str]]] = []
-
-    for item in taxonomy:
-        com_name = item.get("comName", "")
-        sci_name = item.get("sciName", "")
-        species_code = item.get("speciesCode", "")
-        text = f"{com_name} {sci_name}".lower()
-        if q in text:
-            # Simple ranking: prefix match is better
-            rank = 0
-            if com_name.lower().startswith(q) or sci_name.lower().startswith(q):
-                rank -= 10
-            # Shorter common name slightly preferred
-            rank += len(com_name)
-            matches.append(
-                (
-                    rank,
-                    {
-                        "species_name": com_name,
-                        "species_code": species_code,
-                        "scientific_name": sci_name or "",
-                    },
-                )
-            )
-
-    matches.sort(key=lambda x: x[0])
-    return [m[1] for m in matches[: max(1, min(limit, 25))]]
+    regional = await _regional_index.get(region_code, taxonomy) if region_code else None
+    limit = max(1, min(limit, 25))
+
+    candidates = taxonomy.find(q)
+    if regional is not None:
+        # Regional species always rank first, so when the region alone fills the
+        # page there is no need to look at the rest of the taxonomy.
+        local = [index for index in regional.members if q in taxonomy.search_text(index)]
+        if len(local) >= limit:
+            candidates = local
+
+    matches: List[Tuple[int, int]] = []
+
+    for index in candidates:
+        com_name = taxonomy.common_name(index)
+        sci_name = taxonomy.scientific_name(index)
+        # Simple ranking: prefix match is better
+        rank = 0
+        if com_name.lower().startswith(q) or sci_name.lower().startswith(q):
+            rank -= 10
+        # Shorter common name slightly preferred
+        rank += len(com_name)
+        # Regional species first (names are far shorter than this offset)
+        if regional is not None and index not in regional:
+            rank += 1000
+        matches.append((rank, index))
+
+    # nsmallest is stable, so ties keep taxonomic order like a full sort would
+    best = heapq.nsmallest(limit, matches, key=lambda x: x[0])
+    return [
+        {
+            "species_name": taxonomy.common_name(index),
+            "species_code": taxonomy.species_code(index),
+            "scientific_name": taxonomy.scientific_name(index),
+        }
+        for _, index in best
+    ]
 
 
 async def fetch_species_observations(
@@ -127,11 +173,25 @@ async def fetch_species_observations(
     lng: float,
     radius_km: int = 25,
     back_days: Optional[int] = None,
-) -> List[schemas.ObservedBird]:
+) -> ObservationBatch:
     """Fetch nearby observations for a given species code."""
     if radius_km < 1 or radius_km > 100:
         raise HTTPException(status_code=400, detail="radius_km must be between 1 and 100")
 
+    async def fetch(lat: float, lng: float, dist: int) -> ObservationBatch:
+        return await _fetch_species_observations_from_ebird(species_code, lat, lng, dist, back_days)
+
+    return await _observations_cache.get(("species", species_code, back_days), lat, lng, radius_km, fetch)
+
+
+async def _fetch_species_observations_from_ebird(
+    species_code: str,
+    lat: float,
+    lng: float,
+    radius_km: int,
+    back_days: Optional[int],
+) -> ObservationBatch:
+    """Call the eBird per-species geo endpoint for one circle."""
     api_key = os.getenv("EBIRD_API_KEY", "")
     if not api_key:
         logger.error("EBIRD_API_KEY not configured")
@@ -144,35 +204,14 @@ async def fetch_species_observations(
 
     headers = {"X-eBirdApiToken": api_key}
 
-    async with await _get_httpx_client() as client:
-        try:
-            resp = await client.get(url, params=params, headers=headers)
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            logger.error("Species obs request failed: %s - %s", e.response.status_code, e.response.text)
-            raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch observations")
-        except httpx.RequestError as e:
-            logger.error("Species obs request error: %s", str(e))
-            raise HTTPException(status_code=503, detail="Service temporarily unavailable")
-
-        data = resp.json()
-
-    results: List[schemas.ObservedBird] = []
-    for item in data:
-        results.append(
-            schemas.ObservedBird(
-                species=item.get("comName", "unknown"),
-                species_code=item.get("speciesCode", species_code),
-                loc=item.get("locName", ""),
-                loc_id=item.get("locId", ""),
-                date=item.get("obsDt", ""),
-                lat=item.get("lat", 0.0),
-                lng=item.get("lng", 0.0),
-                how_many=item.get("howMany"),
-                user_display_name=item.get("userDisplayName"),
-            )
-        )
-
-    return results
-
-
+    try:
+        resp = await cached_get("ebird_species", url, params=params, headers=headers)
+        resp.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        logger.error("Species obs request failed: %s - %s", e.response.status_code, error_excerpt(e.response))
+        raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch observations")
+    except httpx.RequestError as e:
+        logger.error("Species obs request error: %s", str(e))
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+
+    return ObservationBatch.from_ebird(resp.json(), default_species_code=species_code)
@@ -0,0 +1,243 @@
+"""
+Species photos resolved on the server, for whole result pages at once.
+
+A species code is resolved to a Wikipedia lead image, looked up by scientific
+name and then by common name. Up to 50 titles go in one API call. Species
+without a lead image fall back to a Wikimedia Commons file search, one call
+each, with at most ``SPECIES_IMAGE_CONCURRENCY`` running at a time. The result
+is stored per species code in the response cache file. Found photos are kept
+for ``SPECIES_IMAGE_TTL_SECONDS`` and misses for the shorter
+``SPECIES_IMAGE_MISS_TTL_SECONDS``. Browsers therefore share the lookups, and a
+results page costs one request to us.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from ..http_client import get_client
+from ..tracing import span
+from .response_cache import response_cache
+from .species import load_taxonomy
+from .taxonomy_store import PackedTaxonomy
+
+logger = logging.getLogger(__name__)
+
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+COMMONS_API_URL = os.getenv("COMMONS_API_URL", "https://commons.wikimedia.org/w/api.php")
+# Lead images rarely change; a miss is retried sooner in case an article gains one
+SPECIES_IMAGE_TTL_SECONDS = int(os.getenv("SPECIES_IMAGE_TTL_SECONDS", str(60 * 60 * 24 * 30)))
+SPECIES_IMAGE_MISS_TTL_SECONDS = int(os.getenv("SPECIES_IMAGE_MISS_TTL_SECONDS", str(60 * 60 * 24)))
+SPECIES_IMAGE_CONCURRENCY = int(os.getenv("SPECIES_IMAGE_CONCURRENCY", "4"))
+SPECIES_IMAGE_WIDTH = int(os.getenv("SPECIES_IMAGE_WIDTH", "800"))
+# Codes accepted per request, so one call cannot queue thousands of lookups
+MAX_SPECIES_IMAGE_CODES = 100
+
+# Wikimedia asks API clients to identify themselves
+_HEADERS = {"User-Agent": "BirdSpotter/1.0"}
+# Titles per MediaWiki query (the API limit for anonymous clients)
+_TITLES_PER_QUERY = 50
+_ATTRIBUTION_MAX_CHARS = 100
+_TAG_RE = re.compile(r"<[^>]*>")
+_CACHE_ENDPOINT = "species_image"
+
+
+def _cache_key(species_code: str) -> str:
+    return f"{_CACHE_ENDPOINT}:{species_code}"
+
+
+def _missing(species_code: str) -> Dict[str, Any]:
+    return {"species_code": species_code, "url": None, "thumbnail_url": None, "attribution": None, "source_url": None}
+
+
+class SpeciesImageResolver:
+    """Batch lookups with a persistent per-species cache and in-flight sharing."""
+
+    def __init__(self, concurrency: int = SPECIES_IMAGE_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._code_index: Optional[Tuple[float, Dict[str, int]]] = None
+
+    def _codes_to_index(self, taxonomy: PackedTaxonomy) -> Dict[str, int]:
+        if self._code_index is None or self._code_index[0] != taxonomy.built_at:
+            mapping = {taxonomy.species_code(i): i for i in range(len(taxonomy))}
+            self._code_index = (taxonomy.built_at, mapping)
+        return self._code_index[1]
+
+    async def resolve(self, species_codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Image records for ``species_codes``; unknown codes and misses have ``url`` None."""
+        codes = list(dict.fromkeys(species_codes))
+        try:
+            with span("response_cache"):
+                cached = await asyncio.to_thread(response_cache.get_many, [_cache_key(code) for code in codes])
+        except sqlite3.Error as e:
+            logger.warning("Species image cache read failed: %s", e)
+            cached = {}
+        results = {code: json.loads(cached[_cache_key(code)]) for code in codes if _cache_key(code) in cached}
+
+        # Codes another request is already looking up are awaited, not fetched again
+        waiting = {code: self._inflight[code] for code in codes if code not in results and code in self._inflight}
+        todo = [code for code in codes if code not in results and code not in waiting]
+        if todo:
+            task = asyncio.ensure_future(self._lookup(todo))
+            for code in todo:
+                self._inflight[code] = task
+            task.add_done_callback(lambda done: self._finish(todo, done))
+            waiting.update((code, task) for code in todo)
+        for code, pending in waiting.items():
+            # Shielded so a client that disconnects does not cancel a lookup others wait on
+            results[code] = (await asyncio.shield(pending)).get(code) or _missing(code)
+        return {code: results[code] for code in codes}
+
+    def _finish(self, codes: List[str], task: asyncio.Future) -> None:
+        for code in codes:
+            if self._inflight.get(code) is task:
+                del self._inflight[code]
+        # Retrieved here so a failure nobody is left to await is not logged as lost
+        if not task.cancelled():
+            task.exception()
+
+    async def _lookup(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        taxonomy = await load_taxonomy()
+        mapping = self._codes_to_index(taxonomy)
+        names = {
+            code: (taxonomy.scientific_name(mapping[code]), taxonomy.common_name(mapping[code]))
+            for code in codes if code in mapping
+        }
+        results: Dict[str, Dict[str, Any]] = {}
+        # Codes whose lookup hit an upstream error; their misses are not cached
+        failed: Set[str] = set()
+        # Scientific names are unambiguous and redirect to the species article; common names come next
+        for position in (0, 1):
+            pending = {code: pair[position] for code, pair in names.items() if code not in results and pair[position]}
+            if pending:
+                results.update(await self._wikipedia_images(pending, failed))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def commons(code: str) -> None:
+            async with semaphore:
+                record = await self._commons_image(code, names[code][1], failed)
+            if record is not None:
+                results[code] = record
+
+        await asyncio.gather(*(commons(code) for code in names if code not in results))
+
+        found = {code: results.get(code) or _missing(code) for code in codes}
+        entries = []
+        for code, record in found.items():
+            # Unknown codes may be in the next taxonomy, and a failed lookup is not a real miss
+            if code not in names or (record["url"] is None and code in failed):
+                continue
+            ttl = SPECIES_IMAGE_TTL_SECONDS if record["url"] else SPECIES_IMAGE_MISS_TTL_SECONDS
+            entries.append((_cache_key(code), json.dumps(record).encode(), ttl))
+        try:
+            await asyncio.to_thread(self._store, entries)
+        except sqlite3.Error as e:
+            logger.warning("Species image cache write failed: %s", e)
+        return found
+
+    @staticmethod
+    def _store(entries: List[Tuple[str, bytes, int]]) -> None:
+        for key, body, ttl in entries:
+            response_cache.put(key, _CACHE_ENDPOINT, body, ttl)
+
+    async def _wikipedia_images(self, titles_by_code: Dict[str, str], failed: Set[str]) -> Dict[str, Dict[str, Any]]:
+        """Lead images of the articles named by ``titles_by_code``, 50 titles per call."""
+        client = get_client()
+        found: Dict[str, Dict[str, Any]] = {}
+        items = list(titles_by_code.items())
+        for start in range(0, len(items), _TITLES_PER_QUERY):
+            chunk = items[start:start + _TITLES_PER_QUERY]
+            params = {
+                "action": "query",
+                "prop": "pageimages",
+                "piprop": "original|thumbnail",
+                "pithumbsize": SPECIES_IMAGE_WIDTH,
+                "titles": "|".join(title for _, title in chunk),
+                "redirects": 1,
+                "format": "json",
+                "formatversion": 2,
+            }
+            try:
+                with span("wikipedia"):
+                    response = await client.get(WIKIPEDIA_API_URL, params=params, headers=_HEADERS)
+                response.raise_for_status()
+                query = response.json().get("query", {})
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning("Wikipedia image lookup failed for %d titles: %s", len(chunk), e)
+                failed.update(code for code, _ in chunk)
+                continue
+
+            # Follow normalization ("American Robin" -> "American robin") and redirects to the page
+            renamed = {entry["from"]: entry["to"] for entry in query.get("normalized", [])}
+            redirects = {entry["from"]: entry["to"] for entry in query.get("redirects", [])}
+            pages = {page.get("title"): page for page in query.get("pages", [])}
+            for code, title in chunk:
+                title = renamed.get(title, title)
+                page = pages.get(redirects.get(title, title))
+                if not page or page.get("missing") or "original" not in page:
+                    continue
+                page_title = page["title"]
+                found[code] = {
+                    "species_code": code,
+                    "url": page["original"]["source"],
+                    "thumbnail_url": page.get("thumbnail", {}).get("source"),
+                    "attribution": "Wikipedia",
+                    "source_url": "https://en.wikipedia.org/wiki/" + quote(page_title.replace(" ", "_")),
+                }
+        return found
+
+    async def _commons_image(self, code: str, common_name: str, failed: Set[str]) -> Optional[Dict[str, Any]]:
+        """First file a Commons search for the species turns up, or None."""
+        params = {
+            "action": "query",
+            "generator": "search",
+            "gsrsearch": f"{common_name} bird",
+            "gsrnamespace": 6,  # File pages
+            "gsrlimit": 5,
+            "prop": "imageinfo",
+            "iiprop": "url|extmetadata",
+            "iiurlwidth": SPECIES_IMAGE_WIDTH,
+            "iiextmetadatafilter": "Artist|Credit|LicenseShortName",
+            "format": "json",
+            "formatversion": 2,
+        }
+        try:
+            with span("commons"):
+                response = await get_client().get(COMMONS_API_URL, params=params, headers=_HEADERS)
+            response.raise_for_status()
+            pages = response.json().get("query", {}).get("pages", [])
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Commons image search failed for %s: %s", code, e)
+            failed.add(code)
+            return None
+
+        for page in sorted(pages, key=lambda page: page.get("index", 0)):
+            info = (page.get("imageinfo") or [None])[0]
+            if not info:
+                continue
+            metadata = info.get("extmetadata") or {}
+            credit = (metadata.get("Artist") or metadata.get("Credit") or {}).get("value", "")
+            attribution = " ".join(_TAG_RE.sub("", credit).split())[:_ATTRIBUTION_MAX_CHARS] or "Wikimedia Commons"
+            license_name = (metadata.get("LicenseShortName") or {}).get("value")
+            if license_name:
+                attribution = f"{attribution} ({license_name})"
+            return {
+                "species_code": code,
+                "url": info.get("url"),
+                "thumbnail_url": info.get("thumburl"),
+                "attribution": attribution,
+                "source_url": info.get("descriptionurl"),
+            }
+        return None
+
+
+species_images = SpeciesImageResolver()
@@ -0,0 +1,365 @@
+"""
+Shared, read-only taxonomy storage.
+
+The taxonomy is written once to a packed file (string tables plus uint32
+offset arrays) and memory-mapped by every worker process. Pages live in the OS
+page cache and are shared between workers, so per-process memory no longer
+grows with the taxonomy size. A file lock elects a single loader per refresh
+and new versions are swapped in atomically with ``os.replace``.
+
+When the file goes stale, the loader's version check runs first. If the
+upstream version matches the one stored in the file, only a small
+``.checked`` sidecar is rewritten. The packed file, and the indexes keyed on
+its ``built_at``, are left alone.
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+_MAGIC = b"TAXO"
+_FORMAT_VERSION = 1
+# magic, format version, entry count, metadata length
+_HEADER = struct.Struct("<4sIII")
+# Column order in the file: common name, scientific name, species code, search text
+_COLUMNS = 4
+
+TaxonomyEntry = Tuple[str, str, str]  # (comName, sciName, speciesCode)
+
+
+def _search_text(com_name: str, sci_name: str) -> str:
+    # Same text the suggestion search has always matched against
+    return f"{com_name} {sci_name}".lower()
+
+
+class PackedTaxonomy(Sequence):
+    """Read-only view over a packed taxonomy file.
+
+    Behaves like a sequence of ``{"comName", "sciName", "speciesCode"}`` dicts,
+    but dicts are only built on access; the data itself stays in the mapping.
+    """
+
+    def __init__(self, buffer: mmap.mmap, path: Path):
+        self._buffer = buffer
+        self.path = path
+        magic, fmt, count, meta_len = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or fmt != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported taxonomy file: {path}")
+        self._count = count
+        pos = _HEADER.size
+        self.metadata: Dict[str, Any] = json.loads(bytes(buffer[pos:pos + meta_len]))
+        pos = _align(pos + meta_len)
+
+        view = memoryview(buffer)
+        self._offsets = []
+        self._blobs = []
+        try:
+            for _ in range(_COLUMNS):
+                size = (count + 1) * 4
+                if pos + size > len(buffer):
+                    raise ValueError(f"Truncated taxonomy file: {path}")
+                self._offsets.append(view[pos:pos + size].cast("I"))
+                pos += size
+            for offsets in self._offsets:
+                length = offsets[count]
+                self._blobs.append((pos, length))
+                pos += length
+            # A file cut short (or with a damaged offset table) does not add up
+            if pos != len(buffer):
+                raise ValueError(f"Taxonomy file {path} is {len(buffer)} bytes, expected {pos}")
+        except BaseException:
+            self._release_offsets()
+            view.release()
+            raise
+
+    @classmethod
+    def open(cls, path: Path) -> "PackedTaxonomy":
+        with open(path, "rb") as fh:
+            buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(buffer, path)
+        except BaseException:
+            buffer.close()
+            raise
+
+    @property
+    def built_at(self) -> float:
+        return float(self.metadata.get("built_at", 0))
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.metadata.get("version")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _field(self, column: int, index: int) -> str:
+        offsets = self._offsets[column]
+        base = self._blobs[column][0]
+        return self._buffer[base + offsets[index]:base + offsets[index + 1]].decode("utf-8")
+
+    def common_name(self, index: int) -> str:
+        return self._field(0, index)
+
+    def scientific_name(self, index: int) -> str:
+        return self._field(1, index)
+
+    def species_code(self, index: int) -> str:
+        return self._field(2, index)
+
+    def search_text(self, index: int) -> str:
+        """Lowercased "common scientific" text that ``find`` matches against."""
+        return self._field(3, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("taxonomy index out of range")
+        return {
+            "comName": self.common_name(index),
+            "sciName": self.scientific_name(index),
+            "speciesCode": self.species_code(index),
+        }
+
+    def find(self, query: str) -> Iterator[int]:
+        """Yield indices (in taxonomy order) whose lowercased names contain ``query``."""
+        needle = query.lower().encode("utf-8")
+        if not needle:
+            return
+        offsets = self._offsets[3]
+        base, length = self._blobs[3]
+        end = base + length
+        pos = base
+        while True:
+            hit = self._buffer.find(needle, pos, end)
+            if hit < 0:
+                return
+            index = bisect_right(offsets, hit - base) - 1
+            # Skip matches that straddle two entries
+            if hit - base + len(needle) <= offsets[index + 1]:
+                yield index
+            pos = base + offsets[index + 1]
+
+    def _release_offsets(self) -> None:
+        for offsets in self._offsets:
+            offsets.release()
+        self._offsets = []
+
+    def close(self) -> None:
+        self._release_offsets()
+        self._buffer.close()
+
+
+def _align(pos: int, to: int = 4) -> int:
+    return (pos + to - 1) // to * to
+
+
+def write_packed_taxonomy(path: Path, entries: Iterable[TaxonomyEntry], metadata: Dict[str, Any]) -> int:
+    """Write ``entries`` to ``path`` atomically; returns the number of entries."""
+    columns: List[List[bytes]] = [[] for _ in range(_COLUMNS)]
+    for com_name, sci_name, species_code in entries:
+        columns[0].append(com_name.encode("utf-8"))
+        columns[1].append((sci_name or "").encode("utf-8"))
+        columns[2].append(species_code.encode("utf-8"))
+        columns[3].append(_search_text(com_name, sci_name or "").encode("utf-8"))
+    count = len(columns[0])
+
+    meta = json.dumps(metadata).encode("utf-8")
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, count, len(meta)) + meta
+    header += b"\0" * (_align(len(header)) - len(header))
+
+    offset_arrays = []
+    for values in columns:
+        offsets = array("I", [0])
+        total = 0
+        for value in values:
+            total += len(value)
+            offsets.append(total)
+        offset_arrays.append(offsets)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header)
+            for offsets in offset_arrays:
+                offsets.tofile(fh)
+            for values in columns:
+                fh.write(b"".join(values))
+            fh.flush()
+            os.fsync(fh.fileno())
+        # Readers holding the old mapping keep the old inode until they re-attach
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return count
+
+
+class SharedTaxonomy:
+    """Per-process handle on the taxonomy file shared by all workers."""
+
+    def __init__(self, directory: str | Path = CACHE_DIR, filename: str = "taxonomy.bin"):
+        self.path = Path(directory) / filename
+        self.lock_path = Path(directory) / f"{filename}.lock"
+        # When the stored version was last confirmed upstream, shared by every worker
+        self.checked_path = Path(directory) / f"{filename}.checked"
+        self._current: Optional[PackedTaxonomy] = None
+        self._checked_at = 0.0
+        self._identity: Optional[Tuple[int, int]] = None
+        self._local_lock = asyncio.Lock()
+
+    @property
+    def current(self) -> Optional[PackedTaxonomy]:
+        return self._current
+
+    def _file_identity(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def attach_latest(self) -> Optional[PackedTaxonomy]:
+        """Map the file on disk if it changed since we last attached."""
+        identity = self._file_identity()
+        if identity is None:
+            return self._current
+        if identity != self._identity:
+            try:
+                self._current = PackedTaxonomy.open(self.path)
+                self._identity = identity
+            except (OSError, ValueError, struct.error):
+                logger.warning("Ignoring unreadable taxonomy file %s", self.path, exc_info=True)
+        return self._current
+
+    def _read_checked_at(self, taxonomy: Optional[PackedTaxonomy]) -> float:
+        """Latest time the mapped taxonomy's version was confirmed, by any worker."""
+        if taxonomy is None:
+            return 0.0
+        try:
+            checked = json.loads(self.checked_path.read_bytes())
+        except (OSError, ValueError):
+            return self._checked_at
+        # A check recorded for another version (or another unversioned file) says nothing about this one
+        if checked.get("version") == taxonomy.version and (
+            taxonomy.version is not None or checked.get("built_at") == taxonomy.built_at
+        ):
+            self._checked_at = max(self._checked_at, float(checked.get("checked_at", 0)))
+        return self._checked_at
+
+    def _write_checked_at(self, taxonomy: PackedTaxonomy, checked_at: float) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.checked_path.parent, prefix=self.checked_path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump({"version": taxonomy.version, "built_at": taxonomy.built_at, "checked_at": checked_at}, fh)
+            os.replace(tmp_name, self.checked_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        self._checked_at = checked_at
+
+    def _is_fresh(self, taxonomy: Optional[PackedTaxonomy], ttl_seconds: float, reread: bool = False) -> bool:
+        if taxonomy is None:
+            return False
+        if _is_fresh(taxonomy, ttl_seconds):
+            return True
+        checked_at = self._read_checked_at(taxonomy) if reread else self._checked_at
+        return (time.time() - checked_at) < ttl_seconds
+
+    @asynccontextmanager
+    async def _leader_lock(self):
+        """Cross-process lock so only one worker downloads per refresh."""
+        async with self._local_lock:
+            if fcntl is None:
+                yield
+                return
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a+b") as fh:
+                await asyncio.to_thread(fcntl.flock, fh.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    async def get(
+        self,
+        ttl_seconds: float,
+        loader: Callable[[], Awaitable[List[TaxonomyEntry]]],
+        force_refresh: bool = False,
+        version_loader: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+        version_retry_seconds: float = 300,
+    ) -> PackedTaxonomy:
+        """Return a fresh taxonomy, rebuilding it via ``loader`` if every copy is stale.
+
+        With ``version_loader``, a stale copy whose stored version is still
+        current upstream is marked as checked instead of being rebuilt. If the
+        version cannot be determined, the copy is kept and the check is
+        retried after ``version_retry_seconds``. ``force_refresh`` always
+        rebuilds.
+        """
+        taxonomy = self.attach_latest()
+        if not force_refresh and self._is_fresh(taxonomy, ttl_seconds):
+            return taxonomy
+        # Stale in this process; another worker may have confirmed the version since
+        if not force_refresh and self._is_fresh(taxonomy, ttl_seconds, reread=True):
+            return taxonomy
+        seen_identity = self._identity
+
+        async with self._leader_lock():
+            # Another worker may have refreshed while we waited for the lock
+            taxonomy = self.attach_latest()
+            rebuilt_meanwhile = self._identity != seen_identity
+            if self._is_fresh(taxonomy, ttl_seconds, reread=True) and (not force_refresh or rebuilt_meanwhile):
+                return taxonomy
+
+            version = await version_loader() if version_loader is not None else None
+            if version is not None and taxonomy is not None and taxonomy.version == version and not force_refresh:
+                await asyncio.to_thread(self._write_checked_at, taxonomy, time.time())
+                logger.info("Shared taxonomy is still at version %s; not downloading", version)
+                return taxonomy
+            if version is None and version_loader is not None and taxonomy is not None and not force_refresh:
+                # Recorded as checked just long enough ago that the next check is due after the retry delay
+                retry_seconds = min(version_retry_seconds, ttl_seconds)
+                await asyncio.to_thread(
+                    self._write_checked_at, taxonomy, time.time() - ttl_seconds + retry_seconds
+                )
+                logger.warning("Taxonomy version unknown; keeping the current copy, next check in %ds", retry_seconds)
+                return taxonomy
+
+            entries = await loader()
+            metadata: Dict[str, Any] = {"built_at": time.time()}
+            if version is not None:
+                metadata["version"] = version
+            count = await asyncio.to_thread(write_packed_taxonomy, self.path, entries, metadata)
+            logger.info("Wrote shared taxonomy with %d entries (version %s) to %s", count, version, self.path)
+            return self.attach_latest()
+
+
+def _is_fresh(taxonomy: Optional[PackedTaxonomy], ttl_seconds: float) -> bool:
+    return taxonomy is not None and (time.time() - taxonomy.built_at) < ttl_seconds
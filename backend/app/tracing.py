@@ -0,0 +1,171 @@
+"""
+Per-request timing spans, reported in ``Server-Timing`` and optionally as JSONL.
+
+Code marks a phase with ``with span("geocode"):``. For a traced request the
+middleware sums the spans by name into a ``Server-Timing`` header, which the
+browser's network panel shows as a waterfall. When ``TRACE_EXPORT_PATH`` is
+set, each traced request is also appended to that file as one JSON line with
+every span, its offset and its parent. The writes happen on a background
+thread. Outside a traced request ``span`` does nothing.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .logging_config import request_id_var
+
+# Share of requests that are timed at all (and get a Server-Timing header)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+# JSONL file receiving the spans of traced requests; unset disables the export
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+
+_export_logger = logging.getLogger("app.trace.export")
+_export_logger.propagate = False
+_export_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "parent")
+
+    def __init__(self, name: str, start: float, parent: Optional[int]):
+        self.name = name
+        self.start = start
+        self.duration: Optional[float] = None
+        self.parent = parent
+
+
+class Trace:
+    """Spans of one request, with times in seconds from the request's start."""
+
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+# Index of the innermost open span, so concurrent children find their parent
+_parent: ContextVar[Optional[int]] = ContextVar("trace_parent", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as ``name`` in the current request's trace."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    record = Span(name, trace.elapsed(), _parent.get())
+    trace.spans.append(record)
+    token = _parent.set(len(trace.spans) - 1)
+    try:
+        yield
+    finally:
+        record.duration = trace.elapsed() - record.start
+        _parent.reset(token)
+
+
+def server_timing(trace: Trace) -> str:
+    """``Server-Timing`` value: finished spans summed by name, then the total so far."""
+    totals: Dict[str, float] = {}
+    for record in trace.spans:
+        if record.duration is not None:
+            totals[record.name] = totals.get(record.name, 0.0) + record.duration
+    totals["total"] = trace.elapsed()
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+def start_export() -> None:
+    """Start the background writer for ``TRACE_EXPORT_PATH``, if configured."""
+    global _export_listener
+    if not TRACE_EXPORT_PATH or _export_listener is not None:
+        return
+    file_handler = logging.FileHandler(TRACE_EXPORT_PATH, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    log_queue: queue.Queue = queue.Queue(maxsize=10000)
+    _export_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    _export_logger.setLevel(logging.INFO)
+    _export_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _export_listener.start()
+
+
+def stop_export() -> None:
+    global _export_listener
+    if _export_listener is None:
+        return
+    _export_listener.stop()
+    _export_logger.handlers.clear()
+    _export_listener = None
+
+
+def _export(trace: Trace, scope, status: Optional[int], request_id: Optional[str]) -> None:
+    # Encoded here, but only on the already-sampled path; the write is on the listener thread
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "request_id": request_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "duration_ms": round(trace.elapsed() * 1000, 3),
+        "spans": [
+            {
+                "name": record.name,
+                "start_ms": round(record.start * 1000, 3),
+                "duration_ms": None if record.duration is None else round(record.duration * 1000, 3),
+                "parent": record.parent,
+            }
+            for record in trace.spans
+        ],
+    }
+    _export_logger.info(json.dumps(entry, separators=(",", ":")))
+
+
+class TracingMiddleware:
+    """Traces a sample of requests and adds their ``Server-Timing`` header.
+
+    ``timing_allow_origins`` lets those cross-origin pages (the frontend) read
+    the timings through ``Timing-Allow-Origin``.
+    """
+
+    def __init__(self, app, timing_allow_origins: Sequence[str] = ()):
+        self.app = app
+        self.timing_allow_origin = ", ".join(timing_allow_origins).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+        trace = Trace()
+        token = _trace.set(trace)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(trace).encode()))
+                if self.timing_allow_origin:
+                    headers.append((b"timing-allow-origin", self.timing_allow_origin))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _trace.reset(token)
+            if _export_listener is not None:
+                _export(trace, scope, status, request_id_var.get())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write benchmark for the SQLite settings in app.database.
+
+Reader threads page through search history while writer threads append
+searches (what /birds/rare does for signed-in users). The same workload runs
+once with SQLite's default rollback journal and once with the WAL settings the
+app now applies, and the results are printed side by side:
+
+    python -m bench.db_concurrency --readers 8 --writers 2 --seconds 5
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from .run import summarize
+
+# Settings equivalent to the previous create_engine() defaults
+BASELINE_ENV = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_BUSY_TIMEOUT_MS": "5000",
+    "SQLITE_MMAP_SIZE": "0",
+    "SQLITE_CACHE_SIZE_KB": "2000",
+}
+TUNED_ENV: Dict[str, str] = {}  # app defaults
+
+
+def _seed(session_factory, users: int, searches_per_user: int) -> None:
+    from app import models
+
+    db = session_factory()
+    for i in range(users):
+        db.add(models.User(email=f"u{i}@example.com", username=f"user{i}", hashed_password="x"))
+    db.commit()
+    for i in range(users * searches_per_user):
+        db.add(models.UserSearch(user_id=1 + i % users, lat=40.0, lng=-105.0, radius=25, bird_count=i % 9))
+        if i % 1000 == 0:
+            db.commit()
+    db.commit()
+    db.close()
+
+
+def run_workload(env: Dict[str, str], args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    from app import database, models
+    from app.pagination import keyset_page
+
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        with tempfile.TemporaryDirectory(prefix="dbbench-") as workdir:
+            engine = database.build_engine(f"sqlite:///{Path(workdir) / 'bench.db'}")
+            models.Base.metadata.create_all(engine)
+            session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            _seed(session_factory, args.users, args.searches_per_user)
+
+            stop = threading.Event()
+            read_latencies: List[float] = []
+            write_latencies: List[float] = []
+            errors = {"read": 0, "write": 0}
+
+            def reader(seed: int) -> None:
+                rng = random.Random(seed)
+                db = session_factory()
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        query = db.query(models.UserSearch).filter(
+                            models.UserSearch.user_id == rng.randint(1, args.users)
+                        )
+                        keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 20)
+                        db.rollback()
+                        read_latencies.append(time.perf_counter() - started)
+                    except OperationalError:
+                        db.rollback()
+                        errors["read"] += 1
+                db.close()
+
+            def writer(seed: int) -> None:
+                rng = random.Random(seed)
+                db = session_factory()
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        db.add(models.UserSearch(
+                            user_id=rng.randint(1, args.users), lat=40.0, lng=-105.0, radius=25, bird_count=3
+                        ))
+                        db.commit()
+                        write_latencies.append(time.perf_counter() - started)
+                    except OperationalError:
+                        db.rollback()
+                        errors["write"] += 1
+                db.close()
+
+            threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+            threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+            for thread in threads:
+                thread.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            engine.dispose()
+
+            return {
+                "reads": summarize(read_latencies, errors["read"], args.seconds),
+                "writes": summarize(write_latencies, errors["write"], args.seconds),
+            }
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--searches-per-user", type=int, default=200)
+    parser.add_argument("--output", type=Path, help="optional JSON results file")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = {
+        "rollback_journal": run_workload(BASELINE_ENV, args),
+        "wal_tuned": run_workload(TUNED_ENV, args),
+    }
+    for mode, stats in results.items():
+        for kind, row in stats.items():
+            print(
+                f"{mode:<17} {kind:<6} n={row['requests']:<7} err={row['errors']:<4} "
+                f"p50={row['p50_ms']:>8.2f}ms p99={row['p99_ms']:>8.2f}ms {row['throughput_rps']:>9.1f}/s"
+            )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
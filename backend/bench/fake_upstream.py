@@ -0,0 +1,371 @@
+"""
+Local stand-in for the eBird, Zippopotam, Nominatim and Wikimedia APIs.
+
+The fake serves deterministic payloads with configurable latency and size so
+benchmark runs are repeatable and never touch the real upstream services.
+"""
+
+import asyncio
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+@dataclass
+class FakeUpstreamConfig:
+    """Tunables for the fake upstream server."""
+
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    observations: int = 200  # records per observation response
+    taxonomy_size: int = 17000  # roughly the size of the real eBird taxonomy
+    hotspots_per_region: int = 3000  # a mid-sized US state
+    historic_per_day: int = 2000  # records per region-day from the historic endpoint
+    taxonomy_version: float = 2024.0  # reported by /ref/taxa/versions
+    seed: int = 1234
+    request_counts: Dict[str, int] = field(default_factory=dict)
+
+
+_WORDS = [
+    "Northern", "Western", "Lesser", "Greater", "Rufous", "Spotted", "Golden",
+    "Crested", "Black", "White", "Gray", "Olive", "Scarlet", "Mountain",
+]
+_GROUPS = [
+    "Warbler", "Sparrow", "Flycatcher", "Hawk", "Owl", "Tanager", "Finch",
+    "Wren", "Thrush", "Vireo", "Heron", "Plover", "Swift", "Hummingbird",
+]
+
+
+def _build_taxonomy(size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    taxonomy = []
+    for i in range(size):
+        com_name = f"{rng.choice(_WORDS)} {rng.choice(_WORDS)} {rng.choice(_GROUPS)} {i}"
+        taxonomy.append(
+            {
+                "sciName": f"Genus{i % 997} species{i}",
+                "comName": com_name,
+                "speciesCode": f"sp{i:05d}",
+                "category": "species",
+                "taxonOrder": float(i),
+            }
+        )
+    return taxonomy
+
+
+def _build_observations(
+    lat: float, lng: float, count: int, rng: random.Random, species_code: str | None = None
+) -> List[Dict[str, Any]]:
+    now = datetime.now()
+    observations = []
+    for i in range(count):
+        code = species_code or f"sp{rng.randrange(17000):05d}"
+        observations.append(
+            {
+                "speciesCode": code,
+                "comName": f"Species {code}",
+                "sciName": f"Genus species {code}",
+                "locId": f"L{rng.randrange(10**6)}",
+                "locName": f"Fake hotspot {i} near {lat:.2f},{lng:.2f}",
+                "obsDt": (now - timedelta(minutes=rng.randrange(60 * 24 * 14))).strftime("%Y-%m-%d %H:%M"),
+                "howMany": rng.randrange(1, 20),
+                "lat": lat + rng.uniform(-0.3, 0.3),
+                "lng": lng + rng.uniform(-0.3, 0.3),
+                "obsValid": True,
+                "obsReviewed": False,
+                "locationPrivate": False,
+                "subId": f"S{rng.randrange(10**8)}",
+                "userDisplayName": f"Observer {rng.randrange(500)}",
+            }
+        )
+    return observations
+
+
+def _build_hotspots(region_code: str, count: int) -> List[Dict[str, Any]]:
+    """Hotspots scattered over a few degrees around the Denver-area bench centers."""
+    rng = random.Random(region_code)
+    center_lat, center_lng = 39.7 + rng.uniform(-1, 1), -105.0 + rng.uniform(-1, 1)
+    country = region_code.split("-")[0]
+    return [
+        {
+            "locId": f"L{region_code}-{i}",
+            "locName": f"Fake hotspot {i} ({region_code})",
+            "countryCode": country,
+            "subnational1Code": region_code if "-" in region_code else f"{country}-XX",
+            "lat": round(center_lat + rng.uniform(-2.5, 2.5), 6),
+            "lng": round(center_lng + rng.uniform(-3.5, 3.5), 6),
+            "latestObsDt": f"2024-05-{1 + i % 28:02d} 08:00",
+            "numSpeciesAllTime": rng.randrange(5, 400),
+        }
+        for i in range(count)
+    ]
+
+
+def _region_center(region_code: str) -> tuple:
+    """Center of a state's fake hotspots, matching ``_build_hotspots``."""
+    center = random.Random(region_code)
+    return 39.7 + center.uniform(-1, 1), -105.0 + center.uniform(-1, 1)
+
+
+def _build_counties(region_code: str) -> Dict[str, Dict[str, float]]:
+    """A state's hotspot area cut into one-degree counties, as eBird region bounds."""
+    center_lat, center_lng = _region_center(region_code)
+    counties = {}
+    for row in range(5):
+        for column in range(7):
+            min_y, min_x = center_lat - 2.5 + row, center_lng - 3.5 + column
+            counties[f"{region_code}-{row * 7 + column + 1:03d}"] = {
+                "minX": min_x, "maxX": min_x + 1, "minY": min_y, "maxY": min_y + 1,
+            }
+    return counties
+
+
+def _build_historic_day(region_code: str, day: str, count: int) -> List[Dict[str, Any]]:
+    """One region-day of observations over the region's hotspot area (or its county)."""
+    rng = random.Random(f"{region_code}:{day}")
+    state = "-".join(region_code.split("-")[:2])
+    center_lat, center_lng = _region_center(state)
+    bounds = {"minY": center_lat - 2.5, "maxY": center_lat + 2.5, "minX": center_lng - 3.5, "maxX": center_lng + 3.5}
+    if region_code != state:
+        bounds = _build_counties(state).get(region_code, bounds)
+        count = max(1, count // 35)
+    observations = []
+    for i in range(count):
+        # A few hundred common species make up most of a day's checklists
+        code = f"sp{rng.randrange(400):05d}"
+        flagged = rng.random() < 0.05
+        pending = flagged and rng.random() < 0.3
+        observations.append(
+            {
+                "speciesCode": code,
+                "comName": f"Species {code}",
+                "sciName": f"Genus species {code}",
+                "locId": f"L{region_code}-{rng.randrange(3000)}",
+                "locName": f"Fake hotspot {i} ({region_code})",
+                "obsDt": f"{day} {rng.randrange(5, 20):02d}:{rng.randrange(60):02d}",
+                "howMany": rng.randrange(1, 20),
+                "lat": round(rng.uniform(bounds["minY"], bounds["maxY"]), 6),
+                "lng": round(rng.uniform(bounds["minX"], bounds["maxX"]), 6),
+                "obsValid": not pending,
+                "obsReviewed": flagged and not pending,
+                "locationPrivate": False,
+                "subId": f"S{rng.randrange(10**8)}",
+                "userDisplayName": f"Observer {rng.randrange(500)}",
+            }
+        )
+    return observations
+
+
+def create_fake_upstream(config: FakeUpstreamConfig) -> FastAPI:
+    """Build the fake upstream ASGI application."""
+    app = FastAPI(title="Fake upstream")
+    rng = random.Random(config.seed)
+    taxonomy = _build_taxonomy(config.taxonomy_size, rng)
+
+    async def delay(name: str) -> None:
+        config.request_counts[name] = config.request_counts.get(name, 0) + 1
+        latency = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    @app.get("/v2/data/obs/geo/recent/notable")
+    async def notable(lat: float, lng: float, dist: int = 25):
+        await delay("ebird_notable")
+        return _build_observations(lat, lng, config.observations, random.Random(f"{lat}:{lng}:{dist}"))
+
+    @app.get("/v2/data/obs/{region_code}/historic/{year}/{month}/{day}")
+    async def historic(region_code: str, year: int, month: int, day: int):
+        await delay("ebird_historic")
+        return _build_historic_day(region_code, f"{year:04d}-{month:02d}-{day:02d}", config.historic_per_day)
+
+    @app.get("/v2/ref/region/list/subnational2/{region_code}")
+    async def subregions(region_code: str):
+        await delay("ebird_regions")
+        return [{"code": code, "name": f"County {code}"} for code in _build_counties(region_code)]
+
+    @app.get("/v2/ref/region/info/{region_code}")
+    async def region_info(region_code: str):
+        await delay("ebird_regions")
+        state = "-".join(region_code.split("-")[:2])
+        bounds = _build_counties(state).get(region_code)
+        if bounds is None:
+            return {"result": region_code}
+        return {"result": f"County {region_code}", "bounds": bounds}
+
+    @app.get("/v2/data/obs/geo/recent/{species_code}")
+    async def species_recent(species_code: str, lat: float, lng: float, dist: int = 25):
+        await delay("ebird_species")
+        seeded = random.Random(f"{species_code}:{lat}:{lng}:{dist}")
+        return _build_observations(lat, lng, config.observations, seeded, species_code)
+
+    @app.get("/v2/ref/taxonomy/ebird")
+    async def taxonomy_list():
+        await delay("ebird_taxonomy")
+        return taxonomy
+
+    @app.get("/v2/ref/taxa/versions")
+    async def taxonomy_versions():
+        await delay("ebird_taxonomy_versions")
+        return [
+            {"authorityVer": config.taxonomy_version - 1, "latest": False},
+            {"authorityVer": config.taxonomy_version, "latest": True},
+        ]
+
+    @app.get("/v2/ref/hotspot/{region_code}")
+    async def hotspots(region_code: str):
+        await delay("ebird_hotspots")
+        return _build_hotspots(region_code, config.hotspots_per_region)
+
+    @app.get("/v2/product/spplist/{region_code}")
+    async def species_list(region_code: str):
+        await delay("ebird_spplist")
+        seeded = random.Random(region_code)
+        # A few hundred species per region, like a US state
+        picks = seeded.sample(range(len(taxonomy)), min(len(taxonomy), 700))
+        return [taxonomy[i]["speciesCode"] for i in sorted(picks)]
+
+    # Every fourth species has no article; half the articles are found through a redirect
+    articles: Dict[str, str] = {}
+    redirects: Dict[str, str] = {}
+    for i, item in enumerate(taxonomy):
+        if i % 4 == 0:
+            articles[item["sciName"]] = item["comName"]
+        elif i % 4 == 1:
+            redirects[item["sciName"]] = item["comName"]
+            articles[item["comName"]] = item["comName"]
+        elif i % 4 == 2:
+            articles[item["comName"]] = item["comName"]
+
+    @app.get("/wikipedia/w/api.php")
+    async def wikipedia(titles: str):
+        await delay("wikipedia")
+        pages = []
+        redirected = []
+        for title in titles.split("|"):
+            if title in redirects:
+                redirected.append({"from": title, "to": redirects[title]})
+                title = redirects[title]
+            if title in articles:
+                slug = title.replace(" ", "_")
+                pages.append({
+                    "title": title,
+                    "original": {"source": f"https://upload.example/{slug}.jpg", "width": 2400, "height": 1600},
+                    "thumbnail": {"source": f"https://upload.example/800px-{slug}.jpg", "width": 800, "height": 533},
+                })
+            else:
+                pages.append({"title": title, "missing": True})
+        return {"query": {"redirects": redirected, "pages": pages}}
+
+    @app.get("/commons/w/api.php")
+    async def commons(gsrsearch: str):
+        await delay("commons")
+        slug = gsrsearch.replace(" ", "_")
+        return {
+            "query": {
+                "pages": [
+                    {
+                        "index": 1,
+                        "title": f"File:{slug}.jpg",
+                        "imageinfo": [{
+                            "url": f"https://upload.example/{slug}.jpg",
+                            "thumburl": f"https://upload.example/800px-{slug}.jpg",
+                            "descriptionurl": f"https://commons.example/File:{slug}.jpg",
+                            "extmetadata": {
+                                "Artist": {"value": "<a href='#'>Fake Photographer</a>"},
+                                "LicenseShortName": {"value": "CC BY-SA 4.0"},
+                            },
+                        }],
+                    }
+                ]
+            }
+        }
+
+    @app.get("/us/{zip_code}")
+    async def zippopotam(zip_code: str):
+        await delay("zippopotam")
+        seeded = random.Random(zip_code)
+        return {
+            "post code": zip_code,
+            "places": [
+                {
+                    "place name": "Fakeville",
+                    "latitude": f"{seeded.uniform(30, 45):.4f}",
+                    "longitude": f"{seeded.uniform(-120, -75):.4f}",
+                }
+            ],
+        }
+
+    @app.get("/search")
+    async def nominatim(request: Request):
+        await delay("nominatim")
+        seeded = random.Random(request.query_params.get("q", ""))
+        return [{"lat": f"{seeded.uniform(30, 45):.6f}", "lon": f"{seeded.uniform(-120, -75):.6f}"}]
+
+    @app.get("/reverse")
+    async def nominatim_reverse(lat: float, lon: float):
+        await delay("nominatim_reverse")
+        return {"address": {"ISO3166-2-lvl4": "US-CO", "country_code": "us"}}
+
+    return app
+
+
+class FakeUpstreamServer:
+    """Run the fake upstream in a background thread on a free local port."""
+
+    def __init__(self, config: FakeUpstreamConfig | None = None, host: str = "127.0.0.1"):
+        self.config = config or FakeUpstreamConfig()
+        self.host = host
+        self.port = _free_port(host)
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                create_fake_upstream(self.config),
+                host=self.host,
+                port=self.port,
+                log_level="warning",
+                access_log=False,
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def environ(self) -> Dict[str, str]:
+        """Environment variables that point the app at this server."""
+        return {
+            "EBIRD_API_KEY": "fake-key",
+            "EBIRD_API_BASE_URL": f"{self.base_url}/v2",
+            "ZIPPOPOTAM_BASE_URL": self.base_url,
+            "NOMINATIM_BASE_URL": self.base_url,
+            # The public instance's rate limit does not apply to the fake
+            "NOMINATIM_MIN_INTERVAL_SECONDS": "0",
+            "WIKIPEDIA_API_URL": f"{self.base_url}/wikipedia/w/api.php",
+            "COMMONS_API_URL": f"{self.base_url}/commons/w/api.php",
+            "HOTSPOT_REGIONS": "US-CO",
+        }
+
+    def __enter__(self) -> "FakeUpstreamServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake upstream server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark for the API against a local fake upstream.
+
+Usage (from the backend directory):
+
+    python -m bench.run --concurrency 20 --requests 500
+    python -m bench.run --compare bench/results/<older-commit>.json
+
+Results are written to bench/results/<commit>.json so runs can be compared
+between commits.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from .fake_upstream import FakeUpstreamConfig, FakeUpstreamServer
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+BENCH_USER = {
+    "email": "bench@example.com",
+    "username": "benchuser",
+    "password": "benchpassword123",
+}
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Reduce raw latencies (seconds) to the numbers we track between commits."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, total: int, concurrency: int
+) -> Dict[str, float]:
+    """Fire ``total`` requests with at most ``concurrency`` in flight."""
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def _build_scenarios(tokens: Dict[str, str], refresh_pool: "asyncio.Queue[str]") -> Dict[str, Scenario]:
+    auth_headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    # A handful of distinct centers so caches see a realistic mix of hits and misses
+    centers = [(39.74 + 0.05 * k, -104.99 + 0.05 * k) for k in range(8)]
+    radii = [10, 25, 50]
+    queries = ["war", "spar", "hawk", "north", "gold", "owl", "fly", "wren"]
+
+    async def rare(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        lat, lng = centers[i % len(centers)]
+        params = {"lat": lat, "lng": lng, "radius": radii[i % len(radii)]}
+        return await client.get("/birds/rare", params=params, headers=auth_headers)
+
+    async def suggest(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        q = queries[i % len(queries)]
+        return await client.get("/species/suggest", params={"q": q[: 1 + i % len(q)]})
+
+    etags: Dict[str, str] = {}
+
+    async def suggest_revalidate(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # A browser re-sending a cached suggestion with If-None-Match
+        q = queries[i % len(queries)][: 1 + i % 3]
+        headers = {"If-None-Match": etags[q]} if q in etags else {}
+        response = await client.get("/species/suggest", params={"q": q}, headers=headers)
+        if "etag" in response.headers:
+            etags[q] = response.headers["etag"]
+        return response
+
+    async def suggest_regional(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        q = queries[i % len(queries)]
+        lat, lng = centers[i % len(centers)]
+        return await client.get("/species/suggest", params={"q": q[: 1 + i % len(q)], "lat": lat, "lng": lng})
+
+    async def observations(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        params = {"species_code": f"sp{i % 50:05d}", "radius_km": radii[i % len(radii)]}
+        if i % 2:
+            lat, lng = centers[i % len(centers)]
+            params.update(lat=lat, lng=lng)
+        else:
+            params.update(location_type="zip", location_value=f"{80200 + i % 20}")
+        return await client.get("/species/observations", params=params)
+
+    async def observations_historic(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # A month-long range ending well in the past: after the first pass every day is on disk
+        lat, lng = centers[i % len(centers)]
+        params = {
+            "species_code": f"sp{i % 50:05d}", "radius_km": radii[i % len(radii)], "lat": lat, "lng": lng,
+            "start_date": "2024-05-01", "end_date": "2024-05-31",
+        }
+        return await client.get("/species/observations", params=params)
+
+    async def hotspots(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        lat, lng = centers[i % len(centers)]
+        params = {"lat": lat, "lng": lng, "radius_km": radii[i % len(radii)], "k": 10}
+        return await client.get("/species/hotspots", params=params)
+
+    async def auth_register(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        user = {
+            "email": f"bench{i}-{time.time_ns()}@example.com",
+            "username": f"bench{i}-{time.time_ns()}",
+            "password": BENCH_USER["password"],
+        }
+        return await client.post("/auth/register", json=user)
+
+    async def auth_login(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        form = {"username": BENCH_USER["email"], "password": BENCH_USER["password"]}
+        return await client.post("/auth/login", data=form)
+
+    async def auth_me(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/auth/me", headers=auth_headers)
+
+    async def auth_refresh(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        # Refresh tokens are single use: each call continues one of the login chains
+        refresh_token = await refresh_pool.get()
+        response = await client.post("/auth/refresh", params={"refresh_token": refresh_token})
+        if response.status_code == 200:
+            refresh_token = response.json()["refresh_token"]
+        refresh_pool.put_nowait(refresh_token)
+        return response
+
+    async def dashboard(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/birds/dashboard", params={"radius": radii[i % 2]}, headers=auth_headers)
+
+    async def auth_favorites(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/auth/favorites", headers=auth_headers)
+
+    return {
+        "birds_rare": rare,
+        "birds_dashboard": dashboard,
+        "species_suggest": suggest,
+        "species_suggest_regional": suggest_regional,
+        "species_suggest_revalidate": suggest_revalidate,
+        "species_observations": observations,
+        "species_observations_historic": observations_historic,
+        "species_hotspots": hotspots,
+        "auth_register": auth_register,
+        "auth_login": auth_login,
+        "auth_me": auth_me,
+        "auth_refresh": auth_refresh,
+        "auth_favorites": auth_favorites,
+    }
+
+
+# bcrypt makes these intentionally slow; keep their request counts small
+_SLOW_SCENARIOS = {"auth_register", "auth_login"}
+
+
+async def _login(client: httpx.AsyncClient) -> Dict[str, str]:
+    await client.post("/auth/register", json=BENCH_USER)
+    response = await client.post(
+        "/auth/login", data={"username": BENCH_USER["email"], "password": BENCH_USER["password"]}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _save_locations(client: httpx.AsyncClient, tokens: Dict[str, str]) -> None:
+    # Saved locations for the dashboard scenario; repeats on a reused database report "exists"
+    locations = [
+        {"name": f"Bench {k}", "location_type": "zip", "location_value": f"{80200 + k}"} for k in range(5)
+    ]
+    response = await client.post(
+        "/auth/locations/bulk",
+        json={"locations": locations},
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    response.raise_for_status()
+
+
+async def run_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    # Imported late so the environment set up in main() is seen by the app
+    from app.main import app
+
+    # Per-request client logging would dominate the measurements
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results: Dict[str, Dict[str, float]] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            tokens = await _login(client)
+            await _save_locations(client, tokens)
+            # Separate logins so refresh rotation never touches the session used elsewhere
+            refresh_pool: "asyncio.Queue[str]" = asyncio.Queue()
+            for _ in range(args.concurrency):
+                refresh_pool.put_nowait((await _login(client))["refresh_token"])
+            scenarios = _build_scenarios(tokens, refresh_pool)
+            selected = args.scenarios or list(scenarios)
+            for name in selected:
+                total = args.requests
+                if name in _SLOW_SCENARIOS:
+                    total = max(1, total // 20)
+                # Warm-up pass so one-off loads (taxonomy, geocodes) do not skew percentiles
+                await run_scenario(client, scenarios[name], min(args.warmup, total), 1)
+                results[name] = await run_scenario(client, scenarios[name], total, args.concurrency)
+                _print_row(name, results[name])
+    return results
+
+
+def _print_row(name: str, stats: Dict[str, float]) -> None:
+    print(
+        f"{name:<22} n={stats['requests']:<6} err={stats['errors']:<4} "
+        f"p50={stats['p50_ms']:>9.2f}ms p95={stats['p95_ms']:>9.2f}ms "
+        f"p99={stats['p99_ms']:>9.2f}ms {stats['throughput_rps']:>9.1f} req/s"
+    )
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline_path: Path) -> None:
+    """Print the relative change of each tracked metric against a stored run."""
+    baseline = json.loads(baseline_path.read_text())["results"]
+    print(f"\nComparison against {baseline_path}:")
+    for name, stats in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if old.get(metric):
+                change = (stats[metric] - old[metric]) / old[metric] * 100
+                deltas.append(f"{metric} {change:+.1f}%")
+        print(f"  {name:<22} " + "  ".join(deltas))
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fake upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--payload-size", type=int, default=200, help="observations per upstream response")
+    parser.add_argument("--taxonomy-size", type=int, default=17000)
+    parser.add_argument("--scenarios", nargs="*", help="subset of scenarios to run")
+    parser.add_argument("--output", type=Path, help="results file (default: bench/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="previous results file to diff against")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    config = FakeUpstreamConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        observations=args.payload_size,
+        taxonomy_size=args.taxonomy_size,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir, FakeUpstreamServer(config) as upstream:
+        os.environ.update(upstream.environ())
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["CACHE_DIR"] = f"{workdir}/cache"
+        # Every bench request comes from one client; measure throughput, not the per-client limits
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+        results = asyncio.run(run_benchmarks(args))
+        upstream_calls = dict(config.request_counts)
+
+    commit = _git_commit()
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "upstream_calls": upstream_calls,
+        "results": results,
+    }
+    output.write_text(json.dumps(payload, indent=2))
+    print(f"\nUpstream calls: {upstream_calls}")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Shared fixtures for the backend tests."""
+
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import auth, database, http_client, models, rate_limit
+from app.main import create_app
+from app.services import BirdService, response_cache, species
+from app.services.observations import ObservationBatch
+from app.services.taxonomy_store import SharedTaxonomy, write_packed_taxonomy
+
+
+# (comName, sciName, speciesCode) in taxonomic order
+TAXONOMY = [
+    ("American Robin", "Turdus migratorius", "amerob"),
+    ("Snowy Owl", "Bubo scandiacus", "snoowl1"),
+    ("Robin Accentor", "Prunella rubeculoides", "robacc1"),
+    ("Great Horned Owl", "Bubo virginianus", "grhowl"),
+    ("Burrowing Owl", "Athene cunicularia", "burowl"),
+]
+
+
+@pytest.fixture
+def taxonomy(tmp_path, monkeypatch):
+    """A small taxonomy file, installed as the one species suggestions search."""
+    store = SharedTaxonomy(tmp_path)
+    write_packed_taxonomy(store.path, TAXONOMY, {"built_at": time.time()})
+    monkeypatch.setattr(species, "_taxonomy_store", store)
+    return store.attach_latest()
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """A throwaway SQLite database with the schema in place."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/test.db")
+    monkeypatch.setattr(database, "_engine", None)
+    engine = database.get_engine()
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create users by username; the email is derived from it."""
+
+    def make_user(username: str = "birder", is_active: bool = True) -> models.User:
+        user = models.User(
+            email=f"{username}@example.com", username=username, hashed_password="x", is_active=is_active
+        )
+        db.add(user)
+        db.commit()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    # No lifespan: the schema already exists and no background jobs are wanted
+    monkeypatch.setattr(rate_limit, "_backend", None)  # Fresh buckets per test
+    return TestClient(create_app())
+
+
+@pytest.fixture
+def auth_headers():
+    """Headers a signed-in client sends for ``user``."""
+
+    def auth_headers(user: models.User) -> dict:
+        token = auth.issue_tokens(user.email)["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return auth_headers
+
+
+@pytest.fixture
+def rare_birds(monkeypatch):
+    """Serve notable sightings from a fixed list instead of eBird; returns the fetch calls."""
+    calls = []
+
+    async def fetch_rare_birds(lat: float, lng: float, radius: int = 25):
+        calls.append((lat, lng, radius))
+        return ObservationBatch.from_ebird(
+            {
+                "comName": f"Species {i}", "speciesCode": f"sp{i}", "locName": f"Spot {i}", "locId": f"L{i}",
+                "obsDt": f"2024-05-1{i} 08:00", "lat": lat + i * 0.01, "lng": lng, "howMany": i + 1,
+            }
+            for i in range(5)
+        )
+
+    monkeypatch.setattr(BirdService, "fetch_rare_birds", staticmethod(fetch_rare_birds))
+    return calls
+
+
+class FakeUpstream:
+    """Stands in for eBird and the geocoders: canned answers by URL path, every request recorded."""
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        for suffix, answer in self.routes.items():
+            if request.url.path.endswith(suffix):
+                return answer(request) if callable(answer) else httpx.Response(200, json=answer)
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route the shared HTTP client to a ``FakeUpstream``; set ``upstream.routes`` to answer."""
+    fake = FakeUpstream()
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    return fake
+
+
+@pytest.fixture
+def responses(tmp_path, monkeypatch):
+    """An empty response cache in place of the one under ``CACHE_DIR``."""
+    cache = response_cache.ResponseCache(tmp_path / "responses.sqlite3")
+    monkeypatch.setattr(response_cache, "response_cache", cache)
+    yield cache
+    cache.close()
+
+
+class FakeClock:
+    """A ``time.time`` stand-in that only moves when a test sets ``now``."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
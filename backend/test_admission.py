@@ -0,0 +1,179 @@
+"""
+Admission control: per route class concurrency slots and the bounded wait queue.
+
+Run with: python -m pytest -q test_admission.py
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.admission import (
+    PRIORITY_ANONYMOUS,
+    PRIORITY_AUTHENTICATED,
+    AdmissionControlMiddleware,
+    RouteClassLimiter,
+)
+
+
+def _limiter(limit=1, queue_size=2, timeout_seconds=5.0):
+    return RouteClassLimiter("upstream", limit, queue_size, timeout_seconds)
+
+
+async def _queued(limiter, priority):
+    """Start an ``acquire`` and let it reach the queue."""
+    task = asyncio.ensure_future(limiter.acquire(priority))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_release_hands_the_slot_to_a_waiter():
+    async def scenario():
+        limiter = _limiter()
+        assert await limiter.acquire(PRIORITY_ANONYMOUS)
+        waiter = await _queued(limiter, PRIORITY_ANONYMOUS)
+        assert limiter.queue_depth == 1 and not waiter.done()
+
+        limiter.release()
+        assert await waiter
+        assert limiter.active == 1 and limiter.queue_depth == 0
+        limiter.release()
+        assert limiter.active == 0
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 2 and stats["max_queue_depth"] == 1
+
+
+def test_signed_in_waiters_go_first():
+    async def scenario():
+        limiter = _limiter(queue_size=3)
+        await limiter.acquire(PRIORITY_ANONYMOUS)
+        anonymous = await _queued(limiter, PRIORITY_ANONYMOUS)
+        signed_in = await _queued(limiter, PRIORITY_AUTHENTICATED)
+
+        limiter.release()
+        assert await signed_in
+        assert not anonymous.done()
+        limiter.release()
+        assert await anonymous
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_sheds_or_evicts_the_newest_anonymous_waiter():
+    async def scenario():
+        limiter = _limiter(queue_size=2)
+        await limiter.acquire(PRIORITY_ANONYMOUS)
+        first = await _queued(limiter, PRIORITY_ANONYMOUS)
+        second = await _queued(limiter, PRIORITY_ANONYMOUS)
+
+        # Another anonymous request has nobody to displace
+        assert not await limiter.acquire(PRIORITY_ANONYMOUS)
+        # A signed-in one takes the place of the latest anonymous arrival
+        signed_in = await _queued(limiter, PRIORITY_AUTHENTICATED)
+        assert await second is False
+        assert not first.done()
+
+        limiter.release()
+        assert await signed_in
+        limiter.release()
+        assert await first
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed_queue_full"] == 1 and stats["evicted"] == 1
+
+
+def test_waiting_too_long_is_shed():
+    async def scenario():
+        limiter = _limiter(timeout_seconds=0.01)
+        await limiter.acquire(PRIORITY_ANONYMOUS)
+        assert not await limiter.acquire(PRIORITY_AUTHENTICATED)
+        assert limiter.queue_depth == 0
+        # The timed-out waiter does not swallow the next release
+        limiter.release()
+        assert limiter.active == 0
+        return limiter.stats()
+
+    assert asyncio.run(scenario())["shed_timeout"] == 1
+
+
+def test_cancelled_waiter_gives_back_a_granted_slot():
+    async def scenario():
+        limiter = _limiter()
+        await limiter.acquire(PRIORITY_ANONYMOUS)
+        waiter = await _queued(limiter, PRIORITY_ANONYMOUS)
+        # The slot is handed over, but the client disconnects before the waiter runs
+        limiter.release()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        return limiter.active
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_settled_waiters_leave_the_queue():
+    async def scenario():
+        limiter = _limiter(queue_size=2, timeout_seconds=0.01)
+        await limiter.acquire(PRIORITY_ANONYMOUS)
+        for _ in range(20):
+            assert not await limiter.acquire(PRIORITY_ANONYMOUS)
+            waiter = await _queued(limiter, PRIORITY_ANONYMOUS)
+            waiter.cancel()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                pass
+            evicted = await _queued(limiter, PRIORITY_ANONYMOUS)
+            await _queued(limiter, PRIORITY_ANONYMOUS)
+            signed_in = await _queued(limiter, PRIORITY_AUTHENTICATED)
+            assert await evicted is False
+            assert not await signed_in
+            assert limiter.queue_depth == 0
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    # Timed out, cancelled and evicted waiters are all gone from the heap
+    assert limiter._waiters == []
+    assert limiter.evicted == 20 and limiter.shed_timeout == 60
+
+
+def _app(limiters):
+    app = FastAPI()
+
+    @app.get("/birds/rare")
+    def rare():
+        return {"ok": True}
+
+    @app.get("/favorites")
+    def favorites():
+        return {"ok": True}
+
+    app.add_middleware(AdmissionControlMiddleware, limiters=limiters)
+    return app
+
+
+def test_middleware_sheds_limited_routes_only():
+    # No slots and no queue: every request to the class is shed
+    limiters = {"upstream": _limiter(limit=0, queue_size=0)}
+    client = TestClient(_app(limiters))
+
+    response = client.get("/birds/rare")
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert client.get("/favorites").status_code == 200
+    assert limiters["upstream"].shed_queue_full == 1
+
+
+def test_middleware_releases_slots():
+    limiters = {"upstream": _limiter(limit=1, queue_size=0)}
+    client = TestClient(_app(limiters))
+    for _ in range(3):
+        assert client.get("/birds/rare").status_code == 200
+    assert limiters["upstream"].active == 0
+    assert limiters["upstream"].admitted == 3
@@ -0,0 +1,102 @@
+"""
+Favorite-species alerts: shared (species, tile) pairs, claims and diffing.
+
+Run with: python -m pytest -q test_alerts.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from app import models
+from app.services.alerts import AlertService, Watcher, alert_radii, tile_for
+from app.services.observations import MAX_UPSTREAM_RADIUS_KM, ObservationBatch
+
+HOME = (39.74, -104.99)
+
+
+def _date(days_ago=0):
+    return (datetime.now(timezone.utc) - timedelta(days=days_ago)).strftime("%Y-%m-%d %H:%M")
+
+
+def _record(loc_id, lat, lng, days_ago=0, how_many=1, observer="A"):
+    return {
+        "speciesCode": "snoowl1", "comName": "Snowy Owl", "locId": loc_id, "locName": f"Spot {loc_id}",
+        "obsDt": _date(days_ago), "lat": lat, "lng": lng, "howMany": how_many, "userDisplayName": observer,
+    }
+
+
+def _watcher_of(db, user, lat, lng, species_code="snoowl1"):
+    db.add(models.UserLocation(
+        user_id=user.id, name="Home", location_type="city", location_value="Denver", lat=lat, lng=lng, is_default=True
+    ))
+    db.add(models.UserFavoriteBird(user_id=user.id, species_code=species_code, species_name="Snowy Owl"))
+    db.commit()
+
+
+def _pair(db):
+    key = ("snoowl1", *tile_for(*HOME))
+    return AlertService.claim_pairs(db, [key], now=1000, interval=900)[key]
+
+
+def test_neighbours_watching_a_species_share_one_pair(db, user, make_user):
+    _watcher_of(db, user, *HOME)
+    _watcher_of(db, make_user("neighbour"), HOME[0], HOME[1] + 0.005)
+    _watcher_of(db, make_user("faraway"), 40.59, -105.08)
+    _watcher_of(db, make_user("gone", is_active=False), *HOME)
+
+    pairs = AlertService.collect_watchers(db)
+    assert len(pairs) == 2
+    assert len(pairs[("snoowl1", *tile_for(*HOME))]) == 2
+
+
+def test_a_pair_is_claimed_once_per_interval(db):
+    keys = [("snoowl1", 159, -420), ("gyrfal", 159, -420)]
+    assert set(AlertService.claim_pairs(db, keys, now=1000, interval=900)) == set(keys)
+    # Another worker running at the same time gets nothing
+    assert AlertService.claim_pairs(db, keys, now=1001, interval=900) == {}
+    assert set(AlertService.claim_pairs(db, keys, now=1000 + 900, interval=900)) == set(keys)
+    assert db.query(models.AlertPair).count() == 2
+
+
+def test_first_fetch_is_a_baseline_then_only_new_sightings_notify(db, user):
+    pair = _pair(db)
+    watchers = [Watcher(user.id, "Snowy Owl", *HOME)]
+    existing = [_record("L1", 39.75, -104.99)]
+    assert AlertService.record(db, pair, ObservationBatch.from_ebird(existing), watchers, 25) == 0
+    assert pair.baselined
+
+    latest = existing + [
+        _record("L2", 39.70, -104.95),
+        _record("L2", 39.70, -104.95),  # Listed twice
+        _record("L3", 41.0, -104.99),  # Outside the alert radius
+        _record("L4", 39.74, -104.99, days_ago=10),  # Older than the fetch window
+    ]
+    assert AlertService.record(db, pair, ObservationBatch.from_ebird(latest), watchers, 25) == 1
+    (notification,) = db.query(models.Notification).all()
+    assert (notification.user_id, notification.loc_id, notification.species_name) == (user.id, "L2", "Snowy Owl")
+    assert 0 < notification.distance_km < 25
+
+    # Nothing new on the next run
+    assert AlertService.record(db, pair, ObservationBatch.from_ebird(latest), watchers, 25) == 0
+
+
+def test_a_new_count_at_the_same_place_is_a_new_sighting(db, user):
+    pair = _pair(db)
+    watchers = [Watcher(user.id, "Snowy Owl", *HOME)]
+    AlertService.record(db, pair, ObservationBatch.from_ebird([_record("L1", *HOME)]), watchers, 25)
+    updated = [_record("L1", *HOME, how_many=2)]
+    assert AlertService.record(db, pair, ObservationBatch.from_ebird(updated), watchers, 25) == 1
+
+
+def test_purge_forgets_sightings_outside_the_window(db):
+    pair = _pair(db)
+    AlertService.record(db, pair, ObservationBatch.from_ebird([_record("L1", *HOME)]), [], 25)
+    db.add(models.AlertSeenObservation(pair_id=pair.id, obs_key="old", obs_date=_date(days_ago=30)))
+    db.commit()
+    assert AlertService.purge_seen(db, back_days=3) == 1
+    assert "old" not in {row.obs_key for row in db.query(models.AlertSeenObservation)}
+    assert db.query(models.AlertSeenObservation).count() == 1
+
+
+def test_one_fetch_per_tile_covers_every_watcher():
+    alert_radius, fetch_radius = alert_radii()
+    assert 0 < alert_radius < fetch_radius <= MAX_UPSTREAM_RADIUS_KM
@@ -0,0 +1,88 @@
+"""
+Grouping saved locations into shared upstream fetches for the dashboard.
+
+Run with: python -m pytest -q test_dashboard.py
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from app import models
+from app.services import dashboard
+from app.services.dashboard import build_dashboard, plan_fetches
+from app.services.observations import ObservationBatch, distance_km
+
+DENVER = (39.74, -104.99)
+
+
+def _check_cover(points, groups, radius_km, fetch_radius_km=50):
+    assert sorted(member for group in groups for member in group.members) == list(range(len(points)))
+    for group in groups:
+        for member in group.members:
+            lat, lng = points[member]
+            assert distance_km(group.lat, group.lng, lat, lng) + radius_km <= fetch_radius_km + 1e-9
+
+
+def test_nearby_locations_share_one_fetch():
+    # Home, work and a park a few km apart
+    points = [DENVER, (39.70, -104.95), (39.78, -105.05)]
+    groups = plan_fetches(points, radius_km=25)
+    assert len(groups) == 1
+    _check_cover(points, groups, 25)
+
+
+def test_distant_locations_are_fetched_separately():
+    points = [DENVER, (40.59, -105.08), (38.83, -104.82)]  # Denver, Fort Collins, Colorado Springs
+    groups = plan_fetches(points, radius_km=25)
+    assert len(groups) == 3
+    assert [group.members for group in groups] == [[0], [1], [2]]
+    # A lone location is fetched around its own center, so it shares the /birds/rare cache entry
+    assert [(group.lat, group.lng) for group in groups] == points
+
+
+def test_full_radius_leaves_no_room_to_share():
+    points = [DENVER, (39.7401, -104.99)]
+    assert len(plan_fetches(points, radius_km=50)) == 2
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_every_location_is_covered(seed):
+    rng = random.Random(seed)
+    points = [(39 + rng.uniform(0, 2), -106 + rng.uniform(0, 2)) for _ in range(40)]
+    for radius_km in (5, 15, 30):
+        groups = plan_fetches(points, radius_km)
+        _check_cover(points, groups, radius_km)
+        assert len(groups) < len(points)
+
+
+def _location(location_id, lat, lng):
+    return models.UserLocation(
+        id=location_id, name=f"Spot {location_id}", location_type="city", location_value="x", lat=lat, lng=lng
+    )
+
+
+def test_shared_sightings_are_sent_once(monkeypatch):
+    records = [
+        {"speciesCode": "snoowl1", "comName": "Snowy Owl", "locId": "L1", "obsDt": "2024-05-10 08:00",
+         "lat": 39.72, "lng": -104.97, "howMany": 1, "userDisplayName": "A"},
+        {"speciesCode": "gyrfal", "comName": "Gyrfalcon", "locId": "L2", "obsDt": "2024-05-11 09:00",
+         "lat": 39.95, "lng": -104.99, "howMany": 1, "userDisplayName": "B"},
+    ]
+    calls = []
+
+    async def fetch_rare_birds(lat, lng, radius):
+        calls.append((lat, lng, radius))
+        return ObservationBatch.from_ebird(records)
+
+    monkeypatch.setattr(dashboard.BirdService, "fetch_rare_birds", staticmethod(fetch_rare_birds))
+    locations = [_location(1, *DENVER), _location(2, 39.76, -104.99)]
+    response = asyncio.run(build_dashboard(locations, radius_km=10))
+
+    assert response.upstream_fetches == len(calls) == 1
+    assert [bird.species_code for bird in response.observations] == ["snoowl1"]
+    home, work = response.locations
+    assert home.observation_indices == work.observation_indices == [0]
+    assert home.distances_km[0] == pytest.approx(distance_km(*DENVER, 39.72, -104.97), abs=0.001)
+    assert (home.location_id, work.location_id) == (1, 2)
@@ -0,0 +1,72 @@
+"""
+Historic date-range mode: which regions cover a search circle.
+
+Run with: python -m pytest -q test_historic.py
+"""
+
+import asyncio
+from collections import OrderedDict
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import historic, hotspots, regions
+
+
+class _Geocoder:
+    """Reverse geocoder splitting states at latitude 41; counts calls and overlap."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.down = False
+
+    async def reverse_region(self, lat, lng):
+        self.calls.append((lat, lng))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if self.down:
+            raise HTTPException(status_code=503, detail="Geocoding service error")
+        return "US-WY" if lat >= 41 else "US-CO"
+
+
+@pytest.fixture
+def geocoder(monkeypatch):
+    fake = _Geocoder()
+    monkeypatch.setattr(regions.LocationService, "reverse_region", fake.reverse_region)
+    monkeypatch.setattr(regions, "_reverse_cache", OrderedDict())
+    monkeypatch.setattr(hotspots, "_index", None)
+
+    async def no_counties(region_code):
+        return {}
+
+    monkeypatch.setattr(historic._day_store, "subregions", no_counties)
+    return fake
+
+
+def test_small_circle_is_resolved_from_the_center_alone(geocoder):
+    # Every point on a 2 km circle falls in the center's 0.1 degree cell
+    assert asyncio.run(historic.regions_for(39.7, -105.0, 2)) == ["US-CO"]
+    assert geocoder.calls == [(39.7, -105.0)]
+
+
+def test_circle_over_a_border_looks_up_each_cell_once_in_parallel(geocoder):
+    assert asyncio.run(historic.regions_for(40.9, -105.0, 25)) == ["US-CO", "US-WY"]
+    cells = {(round(lat, 1), round(lng, 1)) for lat, lng in geocoder.calls}
+    assert len(cells) == len(geocoder.calls) <= 9
+    assert geocoder.max_in_flight > 1
+
+    # Later queries over the same cells are answered from the cache
+    asyncio.run(historic.regions_for(40.9, -105.0, 25))
+    assert len(cells) == len(geocoder.calls)
+
+
+def test_unknown_center_fails_without_edge_lookups(geocoder):
+    geocoder.down = True
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(historic.regions_for(40.9, -105.0, 25))
+    assert raised.value.status_code == 400
+    assert len(geocoder.calls) == 1
@@ -0,0 +1,118 @@
+"""
+Nearest-hotspot lookups on the in-memory grid index.
+
+Run with: python -m pytest -q test_hotspots.py
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from app import models
+from app.services import hotspots
+from app.services.hotspots import HotspotIndex, HotspotService
+from app.services.observations import distance_km
+
+
+def _hotspot(i, lat, lng, region="US-CO"):
+    return models.Hotspot(
+        region_code=region, loc_id=f"L{i}", name=f"Hotspot {i}", subnational1_code=region, lat=lat, lng=lng
+    )
+
+
+def _brute_force(rows, lat, lng, radius_km, k):
+    hits = sorted((distance_km(lat, lng, row.lat, row.lng), row.loc_id) for row in rows)
+    return [loc_id for distance, loc_id in hits if distance <= radius_km][:k]
+
+
+def _nearest(index, lat, lng, radius_km, k):
+    return [index.items[i][0] for _, i in index.nearest(lat, lng, radius_km, k)]
+
+
+@pytest.fixture
+def no_index(monkeypatch):
+    monkeypatch.setattr(hotspots, "_index", None)
+    monkeypatch.setattr(hotspots, "_index_fingerprint", None)
+
+
+@pytest.mark.parametrize("center", [(39.74, -104.99), (0.0, 179.95), (-0.05, -179.98), (89.5, 10.0), (-89.9, 0.0)])
+@pytest.mark.parametrize("radius_km,k", [(5, 3), (50, 10), (400, 25), (3000, 5)])
+def test_matches_brute_force(center, radius_km, k):
+    rng = random.Random(7)
+    lat0, lng0 = center
+    rows = []
+    for i in range(1500):
+        lat = max(-90.0, min(90.0, lat0 + rng.uniform(-6, 6)))
+        lng = (lng0 + rng.uniform(-12, 12) + 180) % 360 - 180
+        rows.append(_hotspot(i, lat, lng))
+    index = HotspotIndex(rows)
+    assert _nearest(index, lat0, lng0, radius_km, k) == _brute_force(rows, lat0, lng0, radius_km, k)
+
+
+def test_sparse_data_uses_the_latitude_band():
+    rows = [_hotspot(i, 40 + i * 0.5, -105 + i) for i in range(10)]
+    index = HotspotIndex(rows, cell_degrees=0.01)
+    # Far more cells than hotspots: the band scan answers, with the same result
+    assert _nearest(index, 40, -105, 500, 4) == _brute_force(rows, 40, -105, 500, 4)
+
+
+def test_hotspots_listed_by_two_regions_are_indexed_once():
+    index = HotspotIndex([
+        _hotspot(1, 39.7, -105.0, "US"),
+        _hotspot(1, 39.7, -105.0, "US-CO"),
+        _hotspot(2, 39.8, -105.0),
+    ])
+    assert len(index) == 2
+    assert len(index.nearest(39.7, -105.0, 50, 10)) == 2
+
+
+def test_nothing_in_range():
+    index = HotspotIndex([_hotspot(1, 10.0, 10.0)])
+    assert index.nearest(39.7, -105.0, 25, 5) == []
+    assert HotspotIndex([]).nearest(0, 0, 100, 5) == []
+
+
+def test_index_follows_the_table(db, no_index):
+    HotspotService.store_region(db, "US-CO", [
+        {"locId": "L1", "locName": "Cherry Creek", "lat": 39.64, "lng": -104.85, "subnational1Code": "US-CO"},
+        {"locId": "L2", "lat": 39.75, "lng": -105.0, "subnational1Code": "US-CO"},
+        {"locId": "L3", "lat": None, "lng": -105.0},  # Unusable rows are skipped
+    ])
+    results = HotspotService.nearest(db, 39.75, -105.0, radius_km=25, k=5)
+    assert [hotspot.loc_id for hotspot in results] == ["L2", "L1"]
+    assert results[0].distance_km == 0 and results[1].name == "Cherry Creek"
+    assert HotspotService.region_near(39.7, -105.0) == "US-CO"
+
+    # Unchanged table: the index is kept
+    index = hotspots._index
+    assert HotspotService.rebuild_index(db) is index
+
+    # Another worker replaced the region: the periodic refresh rebuilds
+    HotspotService.store_region(db, "US-CO", [{"locId": "L9", "lat": 39.7, "lng": -105.0}])
+    assert HotspotService.rebuild_index(db) is not index
+    assert [hotspot.loc_id for hotspot in HotspotService.nearest(db, 39.75, -105.0)] == ["L9"]
+
+
+def test_no_region_without_an_index(no_index):
+    assert HotspotService.region_near(39.7, -105.0) is None
+
+
+def test_route_looks_up_off_the_event_loop(client, db, no_index, monkeypatch):
+    HotspotService.store_region(db, "US-CO", [{"locId": "L1", "lat": 39.64, "lng": -104.85}])
+    HotspotService.rebuild_index(db)
+    lookup = HotspotService.nearest
+    loops = []
+
+    def nearest(*args, **kwargs):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return lookup(*args, **kwargs)
+
+    monkeypatch.setattr(HotspotService, "nearest", nearest)
+    response = client.get("/species/hotspots", params={"lat": 39.64, "lng": -104.85})
+    assert [hotspot["loc_id"] for hotspot in response.json()] == ["L1"]
+    # Ran in a worker thread, where no event loop is running
+    assert loops == [None]
@@ -0,0 +1,103 @@
+"""
+Cache-Control policies, ETags and conditional GET on read endpoints.
+
+Run with: python -m pytest -q test_http_cache.py
+"""
+
+import pytest
+from starlette.requests import Request
+
+from app.http_cache import (
+    OBSERVATIONS_CACHE_CONTROL,
+    PRIVATE_OBSERVATIONS_CACHE_CONTROL,
+    SUGGEST_CACHE_CONTROL,
+    conditional_json,
+    etag_matches,
+    make_etag,
+)
+
+RARE = {"lat": 39.74, "lng": -104.99}
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_etags_are_strong_and_stable():
+    etag = make_etag("suggest", ("2024", 1.5), "owl")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("suggest", ("2024", 1.5), "owl")
+    assert etag != make_etag("suggest", ("2024", 1.5), "owls")
+    # Parts are length-prefixed, so moving a boundary changes the tag
+    assert make_etag(b"ab", b"c") != make_etag(b"a", b"bc")
+
+
+@pytest.mark.parametrize("header,matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),  # If-None-Match compares weakly
+    ('"xyz", W/"abc"', True),
+    ('"xyz" , "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ('"ABC"', False),
+    ("", False),
+    (None, False),
+])
+def test_if_none_match(header, matches):
+    assert etag_matches(_request(header), '"abc"') is matches
+
+
+def test_conditional_json_answers_304_with_the_same_headers():
+    content = [{"a": 1}, {"a": 2}]
+
+    def respond(if_none_match=None, total="2"):
+        return conditional_json(
+            _request(if_none_match), content, OBSERVATIONS_CACHE_CONTROL, ["Authorization"], {"X-Total-Count": total}
+        )
+
+    full = respond()
+    assert full.status_code == 200 and full.body == b'[{"a":1},{"a":2}]'
+
+    etag = full.headers["etag"]
+    again = respond(etag)
+    assert again.status_code == 304 and again.body == b""
+    for name in ("etag", "cache-control", "vary", "x-total-count"):
+        assert again.headers[name] == full.headers[name]
+
+    # Paging headers are part of the representation
+    assert respond(etag, total="3").status_code == 200
+
+
+def test_rare_birds_revalidate(client, rare_birds):
+    first = client.get("/birds/rare", params=RARE)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == OBSERVATIONS_CACHE_CONTROL
+    assert "Authorization" in first.headers["vary"]
+
+    again = client.get("/birds/rare", params=RARE, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.headers["x-total-count"] == first.headers["x-total-count"]
+
+
+def test_signed_in_rare_birds_are_private(client, rare_birds, user, auth_headers):
+    response = client.get("/birds/rare", params=RARE, headers=auth_headers(user))
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == PRIVATE_OBSERVATIONS_CACHE_CONTROL
+    assert response.headers["cache-control"].startswith("private")
+
+
+def test_suggestions_revalidate_before_searching(client, taxonomy, monkeypatch):
+    from app.services import species
+
+    first = client.get("/species/suggest", params={"q": "owl"})
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == SUGGEST_CACHE_CONTROL
+
+    async def no_search(*args, **kwargs):
+        raise AssertionError("a revalidation should not search")
+
+    monkeypatch.setattr(species, "search_species_suggestions", no_search)
+    again = client.get("/species/suggest", params={"q": " OWL"}, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
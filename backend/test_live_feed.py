@@ -0,0 +1,128 @@
+"""
+Live feed of new notable sightings: one poller per tile, diffing and fan-out.
+
+Run with: python -m pytest -q test_live_feed.py
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import live_feed as live_feed_module
+from app.services.live_feed import LiveFeedHub, Subscriber, tile_for
+from app.services.observations import ObservationBatch
+
+HOME = (39.74, -104.99)
+
+
+def _bird(code, lat=HOME[0], lng=HOME[1], how_many=1):
+    return {
+        "comName": code, "speciesCode": code, "locName": "Spot", "locId": f"L-{code}", "obsDt": "2024-05-10 08:00",
+        "lat": lat, "lng": lng, "howMany": how_many,
+    }
+
+
+class _Hub(LiveFeedHub):
+    """Hub whose polls return ``self.birds`` instead of calling eBird."""
+
+    def __init__(self):
+        super().__init__()
+        self.birds = []
+        self.fetches = []
+
+    async def fetch(self, lat, lng, radius_km):
+        self.fetches.append((lat, lng, radius_km))
+        return ObservationBatch.from_ebird(self.birds)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_subscribers_in_a_tile_share_one_poller():
+    async def scenario():
+        hub = _Hub()
+        feed, first = hub.subscribe(*HOME, 10)
+        same_feed, second = hub.subscribe(HOME[0], HOME[1] + 0.01, 10)
+        other_feed, third = hub.subscribe(40.59, -105.08, 10)
+        await _settle()
+        assert same_feed is feed and other_feed is not feed
+        assert len(hub.tiles) == 2
+        # One baseline poll per tile, however many subscribers it has
+        assert hub.polls == 2
+        assert hub.stats() == {"tiles": 2, "subscribers": 3, "polls": 2}
+
+        task = feed.task
+        hub.unsubscribe(feed, first)
+        assert not task.cancelled() and tile_for(*HOME) in hub.tiles
+        hub.unsubscribe(feed, second)
+        await _settle()
+        assert task.cancelled() and tile_for(*HOME) not in hub.tiles
+        await hub.close()
+        assert hub.tiles == {}
+
+    asyncio.run(scenario())
+
+
+def test_only_new_sightings_are_pushed():
+    async def scenario():
+        hub = _Hub()
+        hub.birds = [_bird("amerob")]
+        feed, near = hub.subscribe(*HOME, 10)
+        far = Subscriber(HOME[0] + 0.3, HOME[1], 10)
+        feed.subscribers.add(far)
+        await _settle()
+        # The first poll is only a baseline
+        assert near.queue.empty()
+
+        hub.birds = [_bird("amerob"), _bird("snoowl1", lat=HOME[0] + 0.05), _bird("amerob", how_many=2)]
+        new = await feed.poll_once()
+        assert [(bird.species_code, bird.how_many) for bird in new.to_models()] == [("snoowl1", 1), ("amerob", 2)]
+        pushed = near.queue.get_nowait()
+        assert [bird.distance_km for bird in pushed] == [pytest.approx(5.56, abs=0.01), 0]
+        # Outside the other subscriber's circle
+        assert far.queue.empty()
+
+        assert len(await feed.poll_once()) == 0
+        # A sighting that dropped out and comes back counts as new again
+        hub.birds = []
+        await feed.poll_once()
+        hub.birds = [_bird("amerob")]
+        assert len(await feed.poll_once()) == 1
+        assert hub.fetches[0][2] == 50
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscribers_are_dropped(monkeypatch):
+    monkeypatch.setattr(live_feed_module, "LIVE_FEED_QUEUE_SIZE", 1)
+
+    async def scenario():
+        subscriber = Subscriber(*HOME, 10)
+        subscriber.offer(ObservationBatch.from_ebird([_bird("amerob")]))
+        assert not subscriber.dropped
+        subscriber.offer(ObservationBatch.from_ebird([_bird("snoowl1")]))
+        return subscriber.dropped
+
+    assert asyncio.run(scenario())
+
+
+def test_busier_tiles_poll_more_often():
+    async def scenario():
+        hub = _Hub()
+        feed, _ = hub.subscribe(*HOME, 10)
+        one = feed.interval()
+        for _ in range(8):
+            hub.subscribe(*HOME, 10)
+        many = feed.interval()
+        for _ in range(100):
+            hub.subscribe(*HOME, 10)
+        await hub.close()
+        return one, many, feed.interval()
+
+    one, many, crowded = asyncio.run(scenario())
+    assert one == live_feed_module.LIVE_FEED_MAX_INTERVAL_SECONDS
+    assert many == one / 3
+    assert crowded == live_feed_module.LIVE_FEED_MIN_INTERVAL_SECONDS
@@ -0,0 +1,93 @@
+"""
+Geocoding: bulk imports and the Nominatim request throttle.
+
+Run with: python -m pytest -q test_locations.py
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.services import locations
+from app.services.locations import LocationService, RequestThrottle
+
+
+@pytest.fixture
+def geocoder(upstream, responses, monkeypatch):
+    monkeypatch.setattr(locations, "_nominatim_throttle", RequestThrottle(0))
+
+    def zippopotam(request):
+        zip_code = request.url.path.rsplit("/", 1)[-1]
+        if zip_code == "80202":
+            return httpx.Response(200, json={"places": [{"latitude": "39.75", "longitude": "-104.99"}]})
+        if zip_code == "80521":
+            return httpx.Response(200, json={"places": [{"latitude": "Fort Collins"}]})  # Malformed
+        return httpx.Response(404, json={})
+
+    upstream.routes["/us/80202"] = upstream.routes["/us/80521"] = upstream.routes["/us/00000"] = zippopotam
+    upstream.routes["/search"] = [{"lat": "38.83", "lon": "-104.82"}]
+    return upstream
+
+
+def test_one_bad_row_does_not_fail_a_bulk_import(geocoder):
+    rows = [("zip", "80202"), ("zip", "80521"), ("zip", "00000"), ("city", "Colorado Springs, CO"), ("zip", "80202")]
+    results = asyncio.run(LocationService.geocode_many(rows))
+
+    assert results[("zip", "80202")] == (39.75, -104.99)
+    assert results[("city", "Colorado Springs, CO")] == (38.83, -104.82)
+    unexpected, invalid = results[("zip", "80521")], results[("zip", "00000")]
+    assert isinstance(unexpected, HTTPException) and unexpected.status_code == 503
+    assert isinstance(invalid, HTTPException) and invalid.status_code == 400
+    # Duplicates are looked up once
+    assert len(geocoder.requests) == 4
+
+
+def test_throttle_spaces_out_starts():
+    throttle = RequestThrottle(0.05)
+    starts = []
+
+    async def call():
+        async with throttle.slot():
+            starts.append(time.monotonic())
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(3)))
+
+    asyncio.run(scenario())
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert len(gaps) == 2 and all(gap >= 0.045 for gap in gaps)
+
+
+def test_throttles_sharing_a_file_space_out_starts_together(tmp_path):
+    # Two throttles on one file stand in for two worker processes
+    path = tmp_path / "nominatim.throttle"
+    workers = [RequestThrottle(0.05, path), RequestThrottle(0.05, path)]
+    starts = []
+
+    async def call(throttle):
+        async with throttle.slot():
+            starts.append(time.monotonic())
+
+    async def scenario():
+        await asyncio.gather(*(call(workers[i % 2]) for i in range(4)))
+
+    asyncio.run(scenario())
+    starts.sort()
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert len(gaps) == 3 and all(gap >= 0.045 for gap in gaps)
+
+
+def test_unreadable_throttle_file_is_overwritten(tmp_path):
+    path = tmp_path / "nominatim.throttle"
+    path.write_text("garbage")
+    throttle = RequestThrottle(0.05, path)
+
+    async def scenario():
+        async with throttle.slot():
+            pass
+
+    asyncio.run(scenario())
+    assert float(path.read_text()) > time.time()
@@ -0,0 +1,122 @@
+"""
+Structured logging: JSON lines, sampling and request ids.
+
+Run with: python -m pytest -q test_logging.py
+"""
+
+import json
+import logging
+import queue
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import logging_config
+from app.logging_config import JsonFormatter, RequestIdMiddleware, SamplingFilter, request_id_var
+
+
+def _record(name="app.services.birds", level=logging.INFO, msg="Fetched %d sightings", args=(3,), **extra):
+    return logging.makeLogRecord({
+        "name": name, "levelno": level, "levelname": logging.getLevelName(level), "msg": msg, "args": args, **extra,
+    })
+
+
+@pytest.fixture
+def request_id():
+    """Log as if inside a request with the given id."""
+    tokens = []
+
+    def set_id(value):
+        tokens.append(request_id_var.set(value))
+
+    yield set_id
+    for token in reversed(tokens):
+        request_id_var.reset(token)
+
+
+def test_lines_are_json_with_request_id_and_extras(request_id):
+    request_id("req-1")
+    handler = logging_config._DroppingQueueHandler(queue.Queue())
+    record = handler.prepare(_record(upstream="ebird", status=503))
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "INFO" and entry["logger"] == "app.services.birds"
+    assert entry["msg"] == "Fetched 3 sightings"
+    assert entry["request_id"] == "req-1"
+    assert (entry["upstream"], entry["status"]) == ("ebird", 503)
+    assert entry["ts"].endswith("+00:00")
+    assert "args" not in entry and "exc_info" not in entry
+
+
+def test_exceptions_are_formatted_before_the_record_is_queued():
+    handler = logging_config._DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        record = handler.prepare(_record(level=logging.ERROR, msg="Failed", args=(), exc_info=sys.exc_info()))
+    # The traceback is not kept alive on the queue
+    assert record.exc_info is None
+    entry = json.loads(JsonFormatter().format(record))
+    assert "ValueError: bad payload" in entry["exc_info"]
+
+
+def test_a_full_queue_drops_instead_of_blocking():
+    handler = logging_config._DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.dropped == 1
+
+
+def test_sampling_keeps_warnings_and_uses_the_longest_prefix():
+    sampler = SamplingFilter(default_rate=1, rates={"uvicorn.access": 0, "app.services": 0, "app.services.birds": 1})
+    assert sampler.filter(_record(name="app.services.birds"))
+    assert not sampler.filter(_record(name="app.services.species"))
+    assert not sampler.filter(_record(name="uvicorn.access"))
+    assert sampler.filter(_record(name="uvicorn.access", level=logging.WARNING))
+    assert sampler.filter(_record(name="app.main"))
+    assert sampler.sampled_out == 2
+
+
+def test_a_request_is_sampled_as_a_whole(request_id):
+    sampler = SamplingFilter(default_rate=0.5, rates={})
+    decisions = set()
+    for i in range(40):
+        request_id(f"req-{i}")
+        kept = {sampler.filter(_record(name=name)) for name in ("app.main", "app.services.birds", "uvicorn.access")}
+        # Every line of one request gets the same decision
+        assert len(kept) == 1
+        decisions |= kept
+    assert decisions == {True, False}
+
+
+def test_rates_are_parsed_from_the_environment_format():
+    assert logging_config._parse_sample_rates("uvicorn.access=0.1, app.services.birds=0.5,,bad") == {
+        "uvicorn.access": 0.1, "app.services.birds": 0.5,
+    }
+
+
+@pytest.fixture
+def echo_client():
+    app = FastAPI()
+
+    @app.get("/id")
+    def current_id():
+        return {"request_id": request_id_var.get()}
+
+    app.add_middleware(RequestIdMiddleware)
+    return TestClient(app)
+
+
+def test_requests_get_an_id_that_is_echoed_back(echo_client):
+    response = echo_client.get("/id")
+    generated = response.headers["x-request-id"]
+    assert len(generated) == 32 and response.json() == {"request_id": generated}
+    assert echo_client.get("/id").headers["x-request-id"] != generated
+
+    # A well-formed id from a proxy is kept; anything else is replaced
+    assert echo_client.get("/id", headers={"X-Request-ID": "edge-42.a"}).headers["x-request-id"] == "edge-42.a"
+    replaced = echo_client.get("/id", headers={"X-Request-ID": "has spaces"}).headers["x-request-id"]
+    assert replaced != "has spaces" and len(replaced) == 32
+    assert request_id_var.get() is None
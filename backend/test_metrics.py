@@ -0,0 +1,29 @@
+"""
+Access to the /metrics counters.
+
+Run with: python -m pytest -q test_metrics.py
+"""
+
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.routers import metrics
+
+
+def test_local_clients_only_by_default(client):
+    assert client.get("/metrics").status_code == 403
+    local = TestClient(create_app(), client=("127.0.0.1", 50000))
+    response = local.get("/metrics")
+    assert response.status_code == 200
+    assert {"admission", "rate_limit", "response_cache"} <= set(response.json())
+    assert TestClient(create_app(), client=("::1", 50000)).get("/metrics").status_code == 200
+
+
+def test_token_is_required_when_configured(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics").status_code == 401
+    # Being local is not enough once a token is set
+    local = TestClient(create_app(), client=("127.0.0.1", 50000))
+    assert local.get("/metrics").status_code == 401
@@ -0,0 +1,88 @@
+"""
+Columnar observation batches: building from eBird records, slicing and models.
+
+Run with: python -m pytest -q test_observation_batch.py
+"""
+
+import pytest
+
+from app.services.observations import ObservationBatch, ObservationSet, distance_km
+
+CENTER = (39.74, -104.99)
+
+RECORDS = [
+    {"speciesCode": "snoowl1", "comName": "Snowy Owl", "locName": "Cherry Creek", "locId": "L1",
+     "obsDt": "2024-05-10 08:00", "lat": 39.64, "lng": -104.85, "howMany": 2, "userDisplayName": "A"},
+    {"speciesCode": "gyrfal", "comName": "Gyrfalcon", "locName": "Barr Lake", "locId": "L2",
+     "obsDt": "2024-05-11 09:00", "lat": 39.95, "lng": -104.75, "howMany": None, "userDisplayName": "B"},
+    {"speciesCode": "snoowl1", "comName": "Snowy Owl", "locName": "Cherry Creek", "locId": "L1",
+     "obsDt": "2024-05-10 08:00", "lat": 39.64, "lng": -104.85, "howMany": 1, "userDisplayName": "B"},
+]
+
+
+def _fields(bird):
+    return bird.model_dump(exclude={"distance_km"})
+
+
+def test_records_round_trip_to_models():
+    batch = ObservationBatch.from_ebird(RECORDS)
+    assert len(batch) == 3
+    first, second, _ = batch.to_models()
+    assert _fields(first) == {
+        "species": "Snowy Owl", "species_code": "snoowl1", "loc": "Cherry Creek", "loc_id": "L1",
+        "date": "2024-05-10 08:00", "lat": 39.64, "lng": -104.85, "how_many": 2, "user_display_name": "A",
+    }
+    # Present but not counted ("X" on eBird)
+    assert second.how_many is None and batch.count(1) is None
+    assert batch.to_model(0, distance=1.5).distance_km == 1.5
+
+
+def test_repeated_strings_are_stored_once():
+    # Fresh, equal strings as a JSON parser would produce them
+    records = [{key: "".join(value) if isinstance(value, str) else value for key, value in record.items()}
+               for record in RECORDS]
+    batch = ObservationBatch.from_ebird(records)
+    assert batch.species[0] is batch.species[2]
+    assert batch.loc_ids[0] is batch.loc_ids[2]
+    assert batch.observers[1] is batch.observers[2]
+
+
+def test_missing_fields_get_defaults():
+    batch = ObservationBatch.from_ebird([{"lat": None, "howMany": "many"}], default_species_code="amerob")
+    (bird,) = batch.to_models()
+    assert (bird.species, bird.species_code, bird.loc, bird.loc_id, bird.date) == ("unknown", "amerob", "", "", "")
+    assert (bird.lat, bird.lng, bird.how_many, bird.user_display_name) == (0.0, 0.0, None, None)
+
+
+def test_rows_build_the_same_batch_as_records():
+    fields = list(RECORDS[0])
+    rows = [[record[field] for field in fields] for record in RECORDS]
+    from_rows = ObservationBatch.from_rows(rows, fields)
+    assert from_rows.to_models() == ObservationBatch.from_ebird(RECORDS).to_models()
+    assert len(ObservationBatch.from_rows([], fields)) == 0
+
+
+def test_take_and_concat_select_rows_in_order():
+    batch = ObservationBatch.from_ebird(RECORDS)
+    picked = batch.take([2, 0])
+    assert [bird.how_many for bird in picked.to_models()] == [1, 2]
+    assert len(batch.take([])) == 0
+    # The source batch is shared between requests and must not change
+    assert [bird.how_many for bird in batch.to_models()] == [2, None, 1]
+
+    joined = ObservationBatch.concat([picked, batch.take([1])])
+    assert [bird.species_code for bird in joined.to_models()] == ["snoowl1", "snoowl1", "gyrfal"]
+    assert ObservationBatch.concat([batch]) is batch
+    assert len(ObservationBatch.concat([])) == 0
+
+
+def test_a_set_filters_by_distance_from_any_center():
+    observation_set = ObservationSet(*CENTER, 50, ObservationBatch.from_ebird(RECORDS))
+    assert observation_set.within(*CENTER, 50) is observation_set.batch
+    near = observation_set.within(*CENTER, 20)
+    assert [bird.loc_id for bird in near.to_models()] == ["L1", "L1"]
+    expected = [distance_km(*CENTER, record["lat"], record["lng"]) for record in RECORDS]
+    assert list(observation_set.distances(*CENTER)) == pytest.approx(expected)
+
+    assert observation_set.covers(CENTER[0] + 0.1, CENTER[1], 25)
+    assert not observation_set.covers(CENTER[0] + 0.3, CENTER[1], 25)
@@ -0,0 +1,106 @@
+"""
+Superset observation cache: one upstream fetch at the maximum radius serves
+every smaller radius and nearby center inside it.
+
+Run with: python -m pytest -q test_observation_cache.py
+"""
+
+import asyncio
+
+from app.services.observations import ObservationBatch, SupersetCache, haversine_km
+
+CENTER = (39.74, -104.99)
+
+
+def _batch(lat: float, lng: float) -> ObservationBatch:
+    # One sighting just under every 5 km due north of the center, out to ~50 km
+    return ObservationBatch.from_ebird(
+        {"speciesCode": f"sp{i}", "comName": f"Species {i}", "lat": lat + i * 0.0449, "lng": lng, "obsDt": "2024-05-01"}
+        for i in range(11)
+    )
+
+
+class _Upstream:
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+
+    async def __call__(self, lat: float, lng: float, radius_km: int) -> ObservationBatch:
+        self.calls.append(radius_km)
+        await asyncio.sleep(self.delay)
+        return _batch(lat, lng)
+
+
+def test_smaller_radius_is_served_from_the_superset():
+    cache = SupersetCache(ttl_seconds=60, superset_radius_km=50)
+    upstream = _Upstream()
+
+    async def run():
+        wide = await cache.get("rare", *CENTER, 50, upstream)
+        narrow = await cache.get("rare", *CENTER, 10, upstream)
+        return wide, narrow
+
+    wide, narrow = asyncio.run(run())
+    assert upstream.calls == [50]
+    assert cache.hits == 1
+    assert len(wide) == 11
+    distances = haversine_km(*CENTER, narrow.lats, narrow.lngs)
+    assert len(narrow) == 3 and all(d <= 10 for d in distances)
+
+
+def test_center_outside_the_superset_is_fetched_again():
+    cache = SupersetCache(ttl_seconds=60, superset_radius_km=50)
+    upstream = _Upstream()
+
+    async def run():
+        await cache.get("rare", *CENTER, 25, upstream)
+        # Same ~1 km cell, but 25 km + the offset no longer fits inside 50 km
+        await cache.get("rare", CENTER[0] + 0.004, CENTER[1], 25, upstream)
+        await cache.get("rare", CENTER[0] + 0.3, CENTER[1], 25, upstream)
+
+    asyncio.run(run())
+    assert upstream.calls == [50, 50]
+
+
+def test_scopes_do_not_share_entries():
+    cache = SupersetCache(ttl_seconds=60, superset_radius_km=50)
+    upstream = _Upstream()
+
+    async def run():
+        await cache.get(("species", "amerob"), *CENTER, 25, upstream)
+        await cache.get(("species", "houfin"), *CENTER, 25, upstream)
+
+    asyncio.run(run())
+    assert len(upstream.calls) == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = SupersetCache(ttl_seconds=60, superset_radius_km=50)
+    upstream = _Upstream(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("rare", *CENTER, radius, upstream) for radius in (5, 10, 25, 50)))
+
+    results = asyncio.run(run())
+    assert upstream.calls == [50]
+    assert [len(batch) for batch in results] == [2, 3, 6, 11]
+
+
+def test_expired_entries_are_refetched():
+    cache = SupersetCache(ttl_seconds=0, superset_radius_km=50)
+    upstream = _Upstream()
+
+    async def run():
+        await cache.get("rare", *CENTER, 25, upstream)
+        await cache.get("rare", *CENTER, 25, upstream)
+
+    asyncio.run(run())
+    assert upstream.calls == [50, 50]
+
+
+def test_radius_above_the_superset_goes_straight_upstream():
+    cache = SupersetCache(ttl_seconds=60, superset_radius_km=50)
+    upstream = _Upstream()
+    asyncio.run(cache.get("rare", *CENTER, 80, upstream))
+    assert upstream.calls == [80]
+    assert cache.misses == 0
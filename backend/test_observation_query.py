@@ -0,0 +1,104 @@
+"""
+Server-side sorting, filtering and cursor paging of observation lists.
+
+Run with: python -m pytest -q test_observation_query.py
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.observations import ObservationBatch, query_observations
+
+CENTER = (39.74, -104.99)
+
+
+def _records(count: int = 10):
+    return [
+        {
+            "speciesCode": f"sp{i}",
+            "comName": f"Species {i}",
+            "locName": f"Spot {i}",
+            "locId": f"L{i}",
+            "obsDt": f"2024-05-{10 + i % 5:02d} 08:00",
+            # Farther north for higher i
+            "lat": CENTER[0] + i * 0.01,
+            "lng": CENTER[1],
+            "howMany": None if i == 3 else (i * 7) % 11,
+        }
+        for i in range(count)
+    ]
+
+
+def _query(records, **kwargs):
+    return query_observations(ObservationBatch.from_ebird(records), *CENTER, **kwargs)
+
+
+def _codes(page):
+    return [bird.species_code for bird in page]
+
+
+def test_sorts_and_reports_distance():
+    page, total, cursor = _query(list(reversed(_records())), sort="distance")
+    assert total == 10 and cursor is None
+    assert _codes(page) == [f"sp{i}" for i in range(10)]
+    assert page[0].distance_km == 0 and page[1].distance_km == pytest.approx(1.112, abs=0.01)
+
+    by_count, _, _ = _query(_records(), sort="count")
+    counts = [bird.how_many or 0 for bird in by_count]
+    assert counts == sorted(counts, reverse=True)
+
+    by_date, _, _ = _query(_records(), sort="date")
+    dates = [bird.date for bird in by_date]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_filters_by_date_and_count():
+    page, total, _ = _query(_records(), since="2024-05-13", min_count=1)
+    assert total == len(page)
+    assert all(bird.date >= "2024-05-13" and bird.how_many >= 1 for bird in page)
+    # "X" (uncounted) never passes a minimum count
+    assert "sp3" not in _codes(page)
+
+
+def test_cursor_walks_every_row_once():
+    records = _records(25)
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, total, cursor = _query(records, sort="distance", limit=10, cursor=cursor, scope="rare")
+        seen.extend(_codes(page))
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3 and total == 25
+    assert seen == [f"sp{i}" for i in range(25)]
+
+
+def test_cursor_is_tied_to_the_query():
+    _, _, cursor = _query(_records(), limit=4, sort="distance")
+    with pytest.raises(HTTPException) as error:
+        _query(_records(), limit=4, sort="date", cursor=cursor)
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        _query(_records(), limit=4, cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+
+def test_cursor_over_changed_data_is_a_conflict():
+    records = _records()
+    _, _, cursor = _query(records, limit=4)
+
+    # Same data fetched again (another worker, a refill): the cursor still works
+    page, _, _ = _query([dict(record) for record in records], limit=4, cursor=cursor)
+    assert _codes(page) == ["sp4", "sp5", "sp6", "sp7"]
+
+    records[0]["howMany"] = 99
+    with pytest.raises(HTTPException) as error:
+        _query(records, limit=4, cursor=cursor)
+    assert error.value.status_code == 409
+
+
+def test_rejects_unknown_sort():
+    with pytest.raises(HTTPException) as error:
+        _query(_records(), sort="species")
+    assert error.value.status_code == 400
@@ -0,0 +1,123 @@
+"""
+Keyset pagination of per-user lists (newest first, ties broken by id).
+
+Run with: python -m pytest -q test_pagination.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import inspect
+
+from app import models, pagination
+from app.database import create_missing_indexes
+from app.pagination import keyset_page
+
+START = datetime(2024, 5, 1, 8, 0)
+
+
+def _add_searches(db, user, count, same_time_every=1):
+    # Runs of ``same_time_every`` rows share a timestamp, so ids have to break ties
+    db.add_all(
+        models.UserSearch(user_id=user.id, lat=40.0, lng=-105.0, search_date=START + timedelta(minutes=i // same_time_every))
+        for i in range(count)
+    )
+    db.commit()
+
+
+def _walk(db, user, limit):
+    query = db.query(models.UserSearch).filter(models.UserSearch.user_id == user.id)
+    pages, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, limit, cursor)
+        pages.append([row.id for row in rows])
+        if cursor is None:
+            return pages
+
+
+def _newest_first(db):
+    rows = db.query(models.UserSearch).order_by(models.UserSearch.search_date.desc(), models.UserSearch.id.desc())
+    return [row.id for row in rows]
+
+
+def test_pages_cover_every_row_once_in_order(db, user):
+    _add_searches(db, user, 23, same_time_every=3)
+    pages = _walk(db, user, limit=5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [row_id for page in pages for row_id in page] == _newest_first(db)
+
+
+def test_exact_multiple_has_no_empty_trailing_page(db, user):
+    _add_searches(db, user, 10)
+    assert [len(page) for page in _walk(db, user, limit=5)] == [5, 5]
+
+
+def test_rows_added_while_paging_do_not_shift_pages(db, user):
+    _add_searches(db, user, 10)
+    query = db.query(models.UserSearch).filter(models.UserSearch.user_id == user.id)
+    first, cursor = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 4)
+    # A new search lands on top; an OFFSET-based second page would repeat a row
+    db.add(models.UserSearch(user_id=user.id, lat=0, lng=0, search_date=START + timedelta(days=1)))
+    db.commit()
+    second, _ = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 4, cursor)
+    assert not {row.id for row in first} & {row.id for row in second}
+    assert [row.id for row in first + second] == _newest_first(db)[1:9]
+
+
+def test_cursor_survives_deleting_its_anchor_row(db, user):
+    _add_searches(db, user, 10)
+    query = db.query(models.UserSearch).filter(models.UserSearch.user_id == user.id)
+    first, cursor = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 4)
+    expected = _newest_first(db)[4:8]
+    db.delete(first[-1])
+    db.commit()
+    second, _ = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 4, cursor)
+    assert [row.id for row in second] == expected
+
+
+def test_cursor_cannot_anchor_on_another_users_row(db, user, make_user):
+    _add_searches(db, user, 10)
+    other = make_user("other")
+    db.add(models.UserSearch(user_id=other.id, lat=0, lng=0, search_date=START + timedelta(days=1)))
+    db.commit()
+    other_row = db.query(models.UserSearch).filter(models.UserSearch.user_id == other.id).one()
+
+    # A crafted cursor naming the other user's row falls back to its own timestamp
+    cursor = pagination.encode_cursor(START + timedelta(minutes=3), other_row.id)
+    query = db.query(models.UserSearch).filter(models.UserSearch.user_id == user.id)
+    rows, _ = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 20, cursor)
+    assert [row.search_date for row in rows] == [START + timedelta(minutes=i) for i in (3, 2, 1, 0)]
+
+
+def test_page_size_is_capped(db, user, monkeypatch):
+    monkeypatch.setattr(pagination, "MAX_PAGE_SIZE", 3)
+    _add_searches(db, user, 5)
+    query = db.query(models.UserSearch).filter(models.UserSearch.user_id == user.id)
+    rows, cursor = keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 1000)
+    assert len(rows) == 3 and cursor is not None
+
+
+def test_invalid_cursor_is_rejected(db, user):
+    query = db.query(models.UserSearch)
+    with pytest.raises(HTTPException) as error:
+        keyset_page(query, models.UserSearch.search_date, models.UserSearch.id, 5, "garbage")
+    assert error.value.status_code == 400
+
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_startup_adds_indexes_missing_from_existing_tables(engine):
+    # A database created before the keyset indexes existed
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_user_searches_user_date_id")
+        connection.exec_driver_sql("DROP INDEX ix_user_favorite_birds_user_date_id")
+    models.Base.metadata.create_all(bind=engine)
+    assert "ix_user_searches_user_date_id" not in _index_names(engine, "user_searches")
+
+    create_missing_indexes(engine, models.Base.metadata)
+    create_missing_indexes(engine, models.Base.metadata)  # Nothing left to do the second time
+    assert "ix_user_searches_user_date_id" in _index_names(engine, "user_searches")
+    assert "ix_user_favorite_birds_user_date_id" in _index_names(engine, "user_favorite_birds")
@@ -0,0 +1,109 @@
+"""
+Per-client token buckets for routes that spend the eBird API quota.
+
+Run with: python -m pytest -q test_rate_limit.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app import http_client, rate_limit
+from app.rate_limit import MemoryRateLimitBackend, RateLimit
+
+LIMIT = RateLimit(per_minute=60, burst=3)
+
+
+def _consume(backend, key, cost=1, force=False):
+    return asyncio.run(backend.consume(key, cost, LIMIT, force=force))
+
+
+def test_bucket_empties_then_refills(clock):
+    backend = MemoryRateLimitBackend(clock=clock)
+    assert [_consume(backend, "k") for _ in range(3)] == [0, 0, 0]
+    assert _consume(backend, "k") == pytest.approx(1.0)
+    # A rejected request takes nothing
+    assert _consume(backend, "k", cost=2) == pytest.approx(2.0)
+
+    clock.now += 2
+    assert _consume(backend, "k", cost=2) == 0
+    # Refill stops at the burst size
+    clock.now += 600
+    assert [_consume(backend, "k") for _ in range(4)][-1] > 0
+
+
+def test_forced_costs_go_into_debt(clock):
+    backend = MemoryRateLimitBackend(clock=clock)
+    assert _consume(backend, "k", cost=10, force=True) == 0
+    # Debt is capped at -burst, so recovering takes burst + cost seconds at most
+    assert _consume(backend, "k") == pytest.approx(4.0)
+    clock.now += 4
+    assert _consume(backend, "k") == 0
+
+
+def test_clients_have_separate_buckets_and_idle_ones_are_dropped(clock):
+    backend = MemoryRateLimitBackend(max_clients=2, clock=clock)
+    for _ in range(3):
+        _consume(backend, "a")
+    assert _consume(backend, "a") > 0
+    assert _consume(backend, "b") == 0
+
+    _consume(backend, "c")
+    # "a" was least recently used; its next request starts from a full bucket
+    assert len(backend._buckets) == 2
+    assert _consume(backend, "a") == 0
+
+
+@pytest.fixture
+def limited(engine, clock, monkeypatch):
+    """A route limited like ``rare``, plus the fake clock driving its buckets."""
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(rate_limit.ROUTE_LIMITS, "rare", LIMIT)
+    monkeypatch.setattr(rate_limit, "_backend", MemoryRateLimitBackend(clock=clock))
+
+    app = FastAPI()
+
+    @app.get("/birds/rare", dependencies=[Depends(rate_limit.rate_limited("rare"))])
+    async def rare(upstream_calls: int = 0):
+        for _ in range(upstream_calls):
+            await http_client._count_upstream_call(None)
+        return {"ok": True}
+
+    return TestClient(app), clock
+
+
+def test_over_the_limit_is_429_with_retry_after(limited):
+    client, clock = limited
+    assert [client.get("/birds/rare").status_code for _ in range(3)] == [200] * 3
+    response = client.get("/birds/rare")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+    clock.now += 1
+    assert client.get("/birds/rare").status_code == 200
+
+
+def test_upstream_calls_are_charged_after_the_request(limited):
+    client, clock = limited
+    # The request itself fits; its upstream call is charged once it is done
+    assert client.get("/birds/rare", params={"upstream_calls": 1}).status_code == 200
+    response = client.get("/birds/rare")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) == 4
+
+
+def test_signed_in_users_are_limited_apart_from_their_ip(limited, user, auth_headers):
+    client, _ = limited
+    for _ in range(3):
+        client.get("/birds/rare")
+    assert client.get("/birds/rare").status_code == 429
+
+    assert client.get("/birds/rare", headers=auth_headers(user)).status_code == 200
+
+
+def test_disabled_limits_let_everything_through(limited, monkeypatch):
+    client, _ = limited
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", False)
+    assert all(client.get("/birds/rare").status_code == 200 for _ in range(10))
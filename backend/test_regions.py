@@ -0,0 +1,87 @@
+"""
+Regional ranking of species suggestions from cached per-region species lists.
+
+Run with: python -m pytest -q test_regions.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import regions, species
+from app.services.regions import RegionalBitset, RegionalSpeciesIndex
+
+
+class _Spplist:
+    """Stand-in for the eBird species list endpoint."""
+
+    def __init__(self, codes=None, error=None):
+        self.codes = codes or {}
+        self.error = error
+        self.calls = []
+
+    async def __call__(self, region_code):
+        self.calls.append(region_code)
+        if self.error is not None:
+            raise self.error
+        return self.codes[region_code]
+
+
+@pytest.fixture
+def spplist(monkeypatch):
+    upstream = _Spplist({"US-CO": ["grhowl", "burowl", "amerob", "notaspecies"]})
+    monkeypatch.setattr(regions, "_fetch_spplist", upstream)
+    return upstream
+
+
+@pytest.fixture
+def regional(tmp_path, monkeypatch):
+    index = RegionalSpeciesIndex(tmp_path / "regional")
+    monkeypatch.setattr(species, "_regional_index", index)
+    return index
+
+
+def _suggest(query, limit=10, region_code=None):
+    return [s["species_code"] for s in asyncio.run(species.search_species_suggestions(query, limit, region_code))]
+
+
+def test_bitset_membership():
+    bitset = RegionalBitset("US-CO", bytearray([0b00000101, 0b10000000]), 0, 0)
+    assert list(bitset.members) == [0, 2, 15]
+    assert 2 in bitset and 15 in bitset and 1 not in bitset
+
+
+def test_regional_species_rank_first(taxonomy, spplist, regional):
+    assert _suggest("owl") == ["snoowl1", "burowl", "grhowl"]
+    # Both Colorado owls move ahead of the Snowy Owl, keeping their own order
+    assert _suggest("owl", region_code="US-CO") == ["burowl", "grhowl", "snoowl1"]
+    assert _suggest("owl", limit=1, region_code="US-CO") == ["burowl"]
+    assert spplist.calls == ["US-CO"]
+
+
+def test_lists_are_shared_through_the_disk_cache(taxonomy, spplist, tmp_path):
+    first = asyncio.run(RegionalSpeciesIndex(tmp_path / "regional").get("US-CO", taxonomy))
+    # Another worker finds the list on disk; unknown codes are dropped
+    second = asyncio.run(RegionalSpeciesIndex(tmp_path / "regional").get("US-CO", taxonomy))
+    assert spplist.calls == ["US-CO"]
+    assert list(first.members) == list(second.members) == [0, 3, 4]
+
+
+def test_concurrent_loads_share_one_fetch(taxonomy, spplist, regional):
+    async def run():
+        return await asyncio.gather(*(regional.get("US-CO", taxonomy) for _ in range(5)))
+
+    bitsets = asyncio.run(run())
+    assert spplist.calls == ["US-CO"]
+    assert all(bitset is bitsets[0] for bitset in bitsets)
+
+
+@pytest.mark.parametrize("error", [HTTPException(status_code=503), ValueError("not JSON"), OSError("disk full")])
+def test_unavailable_list_falls_back_to_global_ranking(taxonomy, monkeypatch, regional, error):
+    upstream = _Spplist(error=error)
+    monkeypatch.setattr(regions, "_fetch_spplist", upstream)
+    assert _suggest("owl", region_code="US-CO") == ["snoowl1", "burowl", "grhowl"]
+    # Not retried until SPPLIST_RETRY_SECONDS have passed
+    _suggest("owl", region_code="US-CO")
+    assert upstream.calls == ["US-CO"]
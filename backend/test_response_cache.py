@@ -0,0 +1,185 @@
+"""
+Persistent response cache: keys, TTLs, size cap and the cached GET wrapper.
+
+Run with: python -m pytest -q test_response_cache.py
+"""
+
+import asyncio
+import contextlib
+import random
+import sqlite3
+import types
+
+import httpx
+import pytest
+
+from app.services import response_cache
+from app.services.response_cache import ENDPOINT_POLICIES, ResponseCache, cached_get, request_key
+
+URL = "https://api.ebird.org/v2/data/obs/geo/recent/notable"
+
+
+def _noise(size, seed=0):
+    """Bytes zlib cannot shrink, so stored sizes are predictable."""
+    return random.Random(seed).randbytes(size)
+
+
+@pytest.fixture
+def frozen(clock, monkeypatch):
+    """Drive the cache's notion of now from ``clock``."""
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=clock))
+    return clock
+
+
+def test_keys_ignore_parameter_order_blanks_and_missing_values():
+    key = request_key("ebird_notable", URL, {"lat": 39.74, "lng": -104.99, "dist": 25})
+    assert request_key("ebird_notable", URL, {"dist": 25, "lng": -104.99, "lat": 39.74, "back": None}) == key
+    assert request_key("ebird_notable", URL, {"lat": 39.74, "lng": -104.99, "dist": 50}) != key
+    assert request_key("ebird_species", URL, {"lat": 39.74, "lng": -104.99, "dist": 25}) != key
+
+    # Only endpoints that are case-insensitive upstream fold case
+    search = "https://nominatim.openstreetmap.org/search"
+    assert request_key("nominatim_search", search, {"q": "  Denver,   CO"}) == request_key(
+        "nominatim_search", search, {"q": "denver, co"}
+    )
+    assert request_key("zippopotam", search, {"q": "Denver"}) != request_key("zippopotam", search, {"q": "denver"})
+
+
+def test_bodies_round_trip_compressed(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    body = b'[{"speciesCode": "snoowl1", "comName": "Snowy Owl"}]' * 200
+    cache.put("k", "ebird_notable", body, 60)
+    assert cache.get("k") == body
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert 0 < stats["bytes"] < len(body) // 10
+
+    # Another worker opening the same file sees the entry
+    assert ResponseCache(cache.path).get("k") == body
+
+
+@pytest.mark.parametrize("endpoint", ["ebird_notable", "nominatim_reverse"])
+def test_entries_expire_after_their_endpoint_ttl(tmp_path, frozen, endpoint):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    ttl = ENDPOINT_POLICIES[endpoint]["ttl"]
+    cache.put("k", endpoint, b"{}", ttl)
+
+    frozen.now += ttl - 1
+    assert cache.get("k") == b"{}"
+    frozen.now += 1
+    assert cache.get("k") is None
+
+
+def test_going_over_the_cap_evicts_least_recently_used_down_to_ninety_percent(tmp_path, frozen):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_bytes=10_000)
+    bodies = {f"k{i}": _noise(1000, i) for i in range(9)}
+    for key, body in bodies.items():
+        frozen.now += 120
+        cache.put(key, "ebird_notable", body, 3600)
+    size = cache.stats()["bytes"]
+    entry = size // len(bodies)
+
+    # Reading k0 makes it recent again; k1 is now the oldest
+    frozen.now += 120
+    assert cache.get("k0") is not None
+
+    frozen.now += 120
+    cache.put("big", "ebird_notable", _noise(3000), 3600)
+    assert cache.stats()["bytes"] <= int(10_000 * 0.9)
+    # Only as many entries as needed go
+    assert cache.stats()["bytes"] > int(10_000 * 0.9) - entry
+    assert cache.get("k0") is not None and cache.get("big") is not None
+    assert cache.get("k1") is None
+
+
+def test_expired_entries_are_evicted_before_fresh_ones(tmp_path, frozen):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_bytes=3000)
+    cache.put("stale", "ebird_notable", _noise(1000, 1), 10)
+    frozen.now += 60
+    cache.put("fresh", "ebird_notable", _noise(1000, 2), 3600)
+    cache.put("newest", "ebird_notable", _noise(1000, 3), 3600)
+
+    assert cache.get("fresh") is not None and cache.get("newest") is not None
+    rows = sqlite3.connect(cache.path).execute("SELECT key FROM responses").fetchall()
+    assert sorted(key for (key,) in rows) == ["fresh", "newest"]
+
+
+def test_bodies_over_the_cap_are_not_stored(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_bytes=100)
+    cache.put("k", "ebird_notable", _noise(200), 60)
+    assert cache.get("k") is None
+
+
+def _get(endpoint="ebird_notable", params=None):
+    return asyncio.run(cached_get(endpoint, URL, params=params or {"lat": 39.74, "lng": -104.99}))
+
+
+def test_cached_get_answers_repeats_from_the_cache(upstream, responses):
+    upstream.routes["/notable"] = [{"speciesCode": "snoowl1"}]
+    first = _get()
+    second = _get()
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json() == [{"speciesCode": "snoowl1"}]
+    assert len(upstream.requests) == 1
+
+    # A different query, or an endpoint without a policy, goes upstream
+    _get(params={"lat": 40.0, "lng": -105.0})
+    _get(endpoint="unknown")
+    _get(endpoint="unknown")
+    assert len(upstream.requests) == 4
+
+
+def test_cached_get_stores_only_successes(upstream, responses):
+    upstream.routes["/notable"] = lambda request: httpx.Response(503)
+    assert _get().status_code == 503
+    assert _get().status_code == 503
+    assert len(upstream.requests) == 2
+
+
+def test_a_broken_cache_file_does_not_fail_the_request(upstream, responses, monkeypatch):
+    upstream.routes["/notable"] = []
+
+    def broken(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(responses, "get", broken)
+    monkeypatch.setattr(responses, "put", broken)
+    assert _get().status_code == 200
+
+
+
+def test_concurrent_misses_go_through_the_throttle_and_hits_skip_it(upstream, responses):
+    lock = asyncio.Lock()
+    entered, in_flight, overlap = [], [], []
+
+    def notable(request):
+        overlap.append(len(in_flight))
+        return httpx.Response(200, json=[{"speciesCode": "snoowl1"}])
+
+    upstream.routes["/notable"] = notable
+
+    @contextlib.asynccontextmanager
+    async def throttle():
+        async with lock:
+            entered.append(None)
+            in_flight.append(None)
+            await asyncio.sleep(0.01)
+            yield
+            in_flight.pop()
+
+    async def fetch_all(params):
+        return await asyncio.gather(
+            *(cached_get("ebird_notable", URL, params=p, throttle=throttle) for p in params)
+        )
+
+    params = [{"lat": 39.74 + i, "lng": -104.99} for i in range(3)]
+    first = asyncio.run(fetch_all(params))
+    assert len(entered) == len(upstream.requests) == 3
+    # Each upstream call ran inside the throttle, one at a time
+    assert overlap == [1, 1, 1]
+
+    # Repeats are answered from the cache without queueing behind upstream calls
+    second = asyncio.run(fetch_all(params))
+    assert len(entered) == len(upstream.requests) == 3
+    assert [r.json() for r in second] == [r.json() for r in first]
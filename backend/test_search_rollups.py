@@ -0,0 +1,87 @@
+"""
+Compaction of old search history into daily per-area rollups.
+
+Run with: python -m pytest -q test_search_rollups.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models
+from app.services.history import SearchHistoryService
+
+NOW = datetime.now(timezone.utc)
+
+
+def _search(user, days_ago, lat=39.74, lng=-104.99, radius=25, bird_count=3, minute=0):
+    return models.UserSearch(
+        user_id=user.id, lat=lat, lng=lng, radius=radius, bird_count=bird_count,
+        search_date=NOW - timedelta(days=days_ago, minutes=minute),
+    )
+
+
+def _rollups(db):
+    return db.query(models.UserSearchRollup).order_by(models.UserSearchRollup.lat_cell).all()
+
+
+def test_old_searches_roll_up_per_day_and_cell(db, user):
+    db.add_all([
+        _search(user, 100, radius=10, bird_count=2),
+        _search(user, 100, lat=39.71, radius=50, bird_count=5, minute=1),  # same 0.1 degree cell
+        _search(user, 100, lat=40.5, bird_count=7),  # another cell
+        _search(user, 5),  # inside the retention window
+    ])
+    db.commit()
+
+    stats = SearchHistoryService.compact(db, retention_days=90)
+
+    assert stats["rows"] == 3
+    assert db.query(models.UserSearch).count() == 1
+    denver, north = _rollups(db)
+    assert (denver.search_count, denver.bird_count_total, denver.max_radius) == (2, 7, 50)
+    assert (denver.lat_cell, denver.lng_cell) == (39.7, -105.0)
+    assert (north.search_count, north.bird_count_total) == (1, 7)
+
+
+def test_later_runs_merge_into_existing_rollups(db, user):
+    db.add(_search(user, 100))
+    db.commit()
+    SearchHistoryService.compact(db, retention_days=90)
+    db.add(_search(user, 100, bird_count=4, minute=5))
+    db.commit()
+    SearchHistoryService.compact(db, retention_days=90)
+
+    (rollup,) = _rollups(db)
+    assert (rollup.search_count, rollup.bird_count_total) == (2, 7)
+
+
+def test_batches_are_bounded(db, user):
+    db.add_all(_search(user, 100, minute=i) for i in range(7))
+    db.commit()
+
+    first = SearchHistoryService.compact(db, retention_days=90, batch_size=3, max_batches=2)
+    assert first == {"rows": 6, "batches": 2}
+    assert db.query(models.UserSearch).count() == 1
+
+    rest = SearchHistoryService.compact(db, retention_days=90, batch_size=3)
+    assert rest == {"rows": 1, "batches": 1}
+    assert sum(r.search_count for r in _rollups(db)) == 7
+
+
+def test_nothing_to_compact(db, user):
+    db.add(_search(user, 1))
+    db.commit()
+    assert SearchHistoryService.compact(db, retention_days=90) == {"rows": 0, "batches": 0}
+
+
+@pytest.mark.parametrize("compact_first", [True, False])
+def test_deleting_a_user_deletes_their_rollups(db, user, compact_first):
+    db.add(_search(user, 100))
+    db.commit()
+    if compact_first:
+        SearchHistoryService.compact(db, retention_days=90)
+    db.delete(user)
+    db.commit()
+    assert db.query(models.UserSearchRollup).count() == 0
+    assert db.query(models.UserSearch).count() == 0
@@ -0,0 +1,97 @@
+"""
+Startup budget checks: importing the app must stay cheap and side-effect free
+so uvicorn workers boot (and autoscale) quickly.
+
+Run with: python -m pytest -q test_startup.py
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+BACKEND_DIR = Path(__file__).parent
+
+# Wall-clock budget for `import app.main` in a fresh interpreter. Most of it is
+# FastAPI/SQLAlchemy themselves; override on slow CI machines.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# Modules that must not be pulled in at import time
+LAZY_MODULES = ["jose", "passlib", "cryptography", "numpy"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _import_probe(tmp_path: Path) -> dict:
+    import json
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/startup.db")
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_is_within_budget(tmp_path):
+    # Best of three to ignore a cold filesystem cache
+    elapsed = min(_import_probe(tmp_path)["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import app.main took {elapsed:.3f}s"
+
+
+def test_import_has_no_side_effects(tmp_path):
+    probe = _import_probe(tmp_path)
+    assert not (tmp_path / "startup.db").exists(), "importing the app touched the database"
+    loaded = set(probe["modules"])
+    for module in LAZY_MODULES:
+        assert module not in loaded, f"{module} should be imported lazily"
+
+
+_DOTENV_PROBE = """
+import os, dotenv
+# Stand-in for a .env file setting a module-level option
+dotenv.load_dotenv = lambda *args, **kwargs: os.environ.update(ADMISSION_ENABLED="false")
+import app.main, app.admission
+print(app.admission.ADMISSION_ENABLED)
+"""
+
+
+def test_dotenv_is_loaded_before_settings_are_read(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/startup.db")
+    env.pop("ADMISSION_ENABLED", None)
+    result = subprocess.run(
+        [sys.executable, "-c", _DOTENV_PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_lifespan_creates_schema(tmp_path, monkeypatch):
+    from app import database
+    from app.main import create_app
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/lifespan.db")
+    monkeypatch.setenv("WARM_CACHES_ON_STARTUP", "false")
+    monkeypatch.setattr(database, "_engine", None)
+
+    with TestClient(create_app()):
+        assert (tmp_path / "lifespan.db").exists()
+
+    database.get_engine().dispose()
+    monkeypatch.setattr(database, "_engine", None)
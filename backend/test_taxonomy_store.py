@@ -0,0 +1,241 @@
+"""
+The packed taxonomy file shared by all workers: format round trip, lookups
+and swapping in a new copy.
+
+Run with: python -m pytest -q test_taxonomy_store.py
+"""
+
+import asyncio
+import json
+import struct
+import time
+import types
+
+import pytest
+
+from app.services import species, taxonomy_store
+from app.services.taxonomy_store import PackedTaxonomy, SharedTaxonomy, write_packed_taxonomy
+
+ENTRIES = [
+    ("American Robin", "Turdus migratorius", "amerob"),
+    ("Snowy Owl", "Bubo scandiacus", "snoowl1"),
+    ("Robin Accentor", "Prunella rubeculoides", "robacc1"),
+    ("Great Horned Owl", "Bubo virginianus", "grhowl"),
+    ("Ñandú", "", "grerhe1"),
+]
+
+
+def _write(path, entries=ENTRIES, **metadata):
+    write_packed_taxonomy(path, entries, {"built_at": time.time(), **metadata})
+    return PackedTaxonomy.open(path)
+
+
+def test_round_trip(tmp_path):
+    taxonomy = _write(tmp_path / "taxonomy.bin", version="2024")
+    assert len(taxonomy) == len(ENTRIES)
+    assert taxonomy[0] == {"comName": "American Robin", "sciName": "Turdus migratorius", "speciesCode": "amerob"}
+    assert taxonomy[-1] == {"comName": "Ñandú", "sciName": "", "speciesCode": "grerhe1"}
+    assert [entry["speciesCode"] for entry in taxonomy[1:3]] == ["snoowl1", "robacc1"]
+    assert taxonomy.version == "2024" and taxonomy.built_at > 0
+    with pytest.raises(IndexError):
+        taxonomy[len(ENTRIES)]
+
+
+def test_empty_taxonomy(tmp_path):
+    taxonomy = _write(tmp_path / "taxonomy.bin", entries=[])
+    assert len(taxonomy) == 0
+    assert list(taxonomy.find("owl")) == []
+
+
+def test_find_matches_either_name_in_taxonomy_order(tmp_path):
+    taxonomy = _write(tmp_path / "taxonomy.bin")
+    assert list(taxonomy.find("ROBIN")) == [0, 2]
+    assert list(taxonomy.find("bubo")) == [1, 3]
+    assert list(taxonomy.find("ñan")) == [4]
+    assert list(taxonomy.find("")) == []
+    # "...migratorius" + "snowy owl": a match may not span two entries
+    assert list(taxonomy.find("iussnowy")) == []
+
+
+def test_suggestions_rank_prefix_matches_first(taxonomy):
+    suggestions = asyncio.run(species.search_species_suggestions("robin"))
+    assert [s["species_code"] for s in suggestions] == ["robacc1", "amerob"]
+    # No prefix match: shorter names first
+    owls = asyncio.run(species.search_species_suggestions("owl"))
+    assert [s["species_name"] for s in owls] == ["Snowy Owl", "Burrowing Owl", "Great Horned Owl"]
+    assert asyncio.run(species.search_species_suggestions("bubo", limit=1))[0]["species_code"] == "snoowl1"
+
+
+def test_readers_keep_their_copy_while_a_new_one_is_swapped_in(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    _write(store.path)
+    old = store.attach_latest()
+
+    _write(store.path, entries=ENTRIES[:2])
+    # The old mapping still reads the replaced file
+    assert len(old) == len(ENTRIES) and old.species_code(4) == "grerhe1"
+    new = store.attach_latest()
+    assert new is not old and len(new) == 2
+    assert store.attach_latest() is new
+
+
+def test_one_worker_downloads_a_stale_copy(tmp_path):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ENTRIES
+
+    async def run():
+        # Two handles on the same directory stand in for two worker processes
+        workers = [SharedTaxonomy(tmp_path), SharedTaxonomy(tmp_path)]
+        return await asyncio.gather(*(worker.get(3600, loader) for worker in workers))
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 1
+    assert len(first) == len(second) == len(ENTRIES)
+
+
+def test_fresh_copy_is_not_downloaded_again(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    _write(store.path)
+
+    async def loader():
+        raise AssertionError("should not download")
+
+    assert len(asyncio.run(store.get(3600, loader))) == len(ENTRIES)
+
+
+def test_unreadable_file_is_rebuilt(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    store.path.write_bytes(b"not a taxonomy file")
+
+    async def loader():
+        return ENTRIES
+
+    assert store.attach_latest() is None
+    assert len(asyncio.run(store.get(3600, loader))) == len(ENTRIES)
+
+
+@pytest.mark.parametrize("keep", [0, 10, 30, 62, 125, -1])
+def test_truncated_file_is_rejected(tmp_path, keep):
+    path = tmp_path / "taxonomy.bin"
+    _write(path).close()
+    path.write_bytes(path.read_bytes()[:keep])
+    with pytest.raises((ValueError, struct.error)):
+        PackedTaxonomy.open(path)
+    # The shared handle treats it as missing rather than failing the request
+    assert SharedTaxonomy(tmp_path).attach_latest() is None
+
+
+def test_corrupt_entry_count_is_rejected(tmp_path):
+    path = tmp_path / "taxonomy.bin"
+    _write(path).close()
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<I", data, 8, len(ENTRIES) + 1)
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        PackedTaxonomy.open(path)
+
+
+class _Upstream:
+    """eBird's taxonomy endpoints: the current version and the full download, with call counts."""
+
+    def __init__(self, version):
+        self.version = version
+        self.version_checks = 0
+        self.downloads = 0
+
+    async def load_version(self):
+        self.version_checks += 1
+        return self.version
+
+    async def load(self):
+        self.downloads += 1
+        return ENTRIES
+
+
+def _stale(store, version="2024"):
+    return _write(store.path, version=version, built_at=time.time() - 7200)
+
+
+def test_unchanged_version_is_checked_not_downloaded(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    stale = _stale(store)
+    upstream = _Upstream("2024")
+
+    taxonomy = asyncio.run(store.get(3600, upstream.load, version_loader=upstream.load_version))
+    assert (upstream.version_checks, upstream.downloads) == (1, 0)
+    # The file is untouched, so indexes keyed on built_at stay valid
+    assert taxonomy.built_at == stale.built_at
+    assert store.checked_path.exists()
+
+    # Another worker trusts the recorded check until it goes stale
+    other = SharedTaxonomy(tmp_path)
+    asyncio.run(other.get(3600, upstream.load, version_loader=upstream.load_version))
+    assert (upstream.version_checks, upstream.downloads) == (1, 0)
+
+
+def test_new_version_is_downloaded(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    _stale(store)
+    upstream = _Upstream("2025")
+
+    taxonomy = asyncio.run(store.get(3600, upstream.load, version_loader=upstream.load_version))
+    assert (upstream.version_checks, upstream.downloads) == (1, 1)
+    assert taxonomy.version == "2025"
+
+
+def test_a_check_recorded_for_another_version_does_not_count(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    _stale(store, version="2023")
+    store.checked_path.write_text(json.dumps({"version": "2024", "checked_at": time.time()}))
+    upstream = _Upstream("2024")
+
+    taxonomy = asyncio.run(store.get(3600, upstream.load, version_loader=upstream.load_version))
+    assert (upstream.version_checks, upstream.downloads) == (1, 1)
+    assert taxonomy.version == "2024"
+
+
+def test_forced_refresh_always_downloads(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    _stale(store)
+    upstream = _Upstream("2024")
+    asyncio.run(store.get(3600, upstream.load, force_refresh=True, version_loader=upstream.load_version))
+    assert upstream.downloads == 1
+
+
+def test_unknown_version_backs_off_instead_of_downloading(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(taxonomy_store, "time", types.SimpleNamespace(time=clock))
+    clock.now = time.time()
+    store = SharedTaxonomy(tmp_path)
+    stale = _write(store.path, version="2024", built_at=clock.now - 7200)
+    upstream = _Upstream(None)
+
+    def get(handle):
+        return asyncio.run(handle.get(3600, upstream.load, version_loader=upstream.load_version,
+                                      version_retry_seconds=300))
+
+    assert get(store).built_at == stale.built_at
+    assert (upstream.version_checks, upstream.downloads) == (1, 0)
+
+    # The backoff is shared through the sidecar, and the check is retried once it runs out
+    clock.now += 299
+    get(SharedTaxonomy(tmp_path))
+    assert upstream.version_checks == 1
+    clock.now += 1
+    upstream.version = "2024"
+    get(store)
+    assert (upstream.version_checks, upstream.downloads) == (2, 0)
+    # Confirmed: the next check is a full TTL away
+    clock.now += 3599
+    get(store)
+    assert upstream.version_checks == 2
+
+
+def test_unknown_version_without_a_copy_downloads(tmp_path):
+    store = SharedTaxonomy(tmp_path)
+    upstream = _Upstream(None)
+    taxonomy = asyncio.run(store.get(3600, upstream.load, version_loader=upstream.load_version))
+    assert upstream.downloads == 1 and taxonomy.version is None
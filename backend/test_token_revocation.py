@@ -0,0 +1,126 @@
+"""
+Refresh token rotation, reuse detection and the revocation filter.
+
+Run with: python -m pytest -q test_token_revocation.py
+"""
+
+import time
+
+import pytest
+
+from app import auth, models, revocation
+from app.revocation import BloomFilter, RevocationStore
+
+PASSWORD = "correct horse battery"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = RevocationStore(capacity=1000)
+    monkeypatch.setattr(revocation, "revocation_store", store)
+    monkeypatch.setattr(auth, "revocation_store", store)
+    return store
+
+
+@pytest.fixture
+def client(client, store):
+    response = client.post("/auth/register", json={"email": "a@example.com", "username": "birder", "password": PASSWORD})
+    assert response.status_code == 201
+    return client
+
+
+def _login(client):
+    response = client.post("/auth/login", data={"username": "a@example.com", "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _refresh(client, refresh_token):
+    return client.post("/auth/refresh", params={"refresh_token": refresh_token})
+
+
+def _me(client, access_token):
+    return client.get("/auth/me", headers={"Authorization": f"Bearer {access_token}"})
+
+
+def test_refresh_rotates_the_pair(client):
+    tokens = _login(client)
+    rotated = _refresh(client, tokens["refresh_token"])
+    assert rotated.status_code == 200
+    assert rotated.json()["refresh_token"] != tokens["refresh_token"]
+    assert _me(client, rotated.json()["access_token"]).status_code == 200
+    # The next refresh uses the new token
+    assert _refresh(client, rotated.json()["refresh_token"]).status_code == 200
+
+
+def test_reusing_a_refresh_token_revokes_the_family(client):
+    tokens = _login(client)
+    rotated = _refresh(client, tokens["refresh_token"]).json()
+
+    # The old token shows up again: someone copied it
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
+    assert _refresh(client, rotated["refresh_token"]).status_code == 401
+    assert _me(client, rotated["access_token"]).status_code == 401
+
+    # Other logins are unaffected
+    other = _login(client)
+    assert _me(client, other["access_token"]).status_code == 200
+
+
+def test_logout_revokes_the_family(client):
+    tokens = _login(client)
+    assert client.post("/auth/logout", params={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert _me(client, tokens["access_token"]).status_code == 401
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_inactive_user_cannot_refresh(client, db):
+    tokens = _login(client)
+    db.query(models.User).update({"is_active": False})
+    db.commit()
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_access_token_is_not_a_refresh_token(client):
+    tokens = _login(client)
+    assert _refresh(client, tokens["access_token"]).status_code == 401
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    keys = [f"jti-{i}" for i in range(2000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def _revoked(db, row_id, key):
+    db.add(models.RevokedToken(id=row_id, key=key, reason="rotated", expires_at=int(time.time()) + 3600))
+    db.commit()
+
+
+def test_sync_picks_up_rows_committed_out_of_order(db):
+    store = RevocationStore(capacity=100)
+    for row_id in (1, 2, 4):
+        _revoked(db, row_id, f"k{row_id}")
+    assert store.sync(db) == 3
+
+    # Id 3 was allocated before 4 but committed after the sync
+    _revoked(db, 3, "k3")
+    assert store.sync(db) == 1
+    assert store.reason(db, "k3") == "rotated"
+    # Rows in the overlap window are not counted twice
+    assert store.sync(db) == 0
+    assert store._filter.count == 4
+
+
+def test_filter_grows_when_full(db):
+    store = RevocationStore(capacity=4)
+    for row_id in range(1, 11):
+        _revoked(db, row_id, f"k{row_id}")
+    store.sync(db)
+    assert store.capacity >= 10
+    assert all(store.reason(db, f"k{row_id}") for row_id in range(1, 11))
+    assert store.reason(db, "never-revoked") is None
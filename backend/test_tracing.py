@@ -0,0 +1,85 @@
+"""
+Per-request spans: the Server-Timing header and the JSONL trace export.
+
+Run with: python -m pytest -q test_tracing.py
+"""
+
+import json
+import re
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.logging_config import RequestIdMiddleware
+from app.tracing import TracingMiddleware, span
+
+ENTRY = re.compile(r"^[a-z_]+;dur=\d+\.\d$")
+
+
+def _timings(header):
+    entries = header.split(", ")
+    assert all(ENTRY.match(entry) for entry in entries), header
+    return {name: float(dur[4:]) for name, dur in (entry.split(";") for entry in entries)}
+
+
+@pytest.fixture
+def traced():
+    app = FastAPI()
+
+    @app.get("/birds/rare")
+    def rare():
+        with span("upstream"):
+            with span("geocode"):
+                time.sleep(0.002)
+            with span("geocode"):
+                time.sleep(0.002)
+        return {"ok": True}
+
+    app.add_middleware(TracingMiddleware, timing_allow_origins=["http://localhost:3000"])
+    app.add_middleware(RequestIdMiddleware)
+    return TestClient(app)
+
+
+def test_spans_are_summed_by_name(traced):
+    response = traced.get("/birds/rare")
+    timings = _timings(response.headers["server-timing"])
+    assert list(timings) == ["upstream", "geocode", "total"]
+    assert timings["geocode"] >= 3.9
+    assert timings["geocode"] <= timings["upstream"] <= timings["total"]
+    assert response.headers["timing-allow-origin"] == "http://localhost:3000"
+
+
+def test_unsampled_requests_are_not_timed(traced, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0)
+    response = traced.get("/birds/rare")
+    assert response.status_code == 200 and "server-timing" not in response.headers
+
+
+def test_spans_outside_a_request_do_nothing():
+    with span("geocode"):
+        pass
+    assert tracing._trace.get() is None
+
+
+def test_traced_requests_are_exported_as_json_lines(traced, tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_PATH", str(path))
+    tracing.start_export()
+    try:
+        traced.get("/birds/rare", headers={"X-Request-ID": "req-7"})
+        traced.get("/birds/rare")
+    finally:
+        tracing.stop_export()
+
+    first, second = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (first["request_id"], first["method"], first["path"], first["status"]) == ("req-7", "GET", "/birds/rare", 200)
+    assert second["request_id"] != "req-7"
+    upstream, geocode, again = first["spans"]
+    assert [s["name"] for s in first["spans"]] == ["upstream", "geocode", "geocode"]
+    # Children point at the span they ran in
+    assert (upstream["parent"], geocode["parent"], again["parent"]) == (None, 0, 0)
+    assert geocode["start_ms"] + geocode["duration_ms"] <= again["start_ms"]
+    assert upstream["duration_ms"] <= first["duration_ms"]
@@ -5,7 +5,7 @@ import { Header } from '../../components/Header'
 import { Card } from '../../components/ui/card'
 import { Button } from '../../components/ui/button'
 import { authAPI } from '../../lib/api'
-import { getBirdPhotoFromWikimedia } from '../../lib/wikimedia'
+import { getSpeciesPhoto } from '../../lib/speciesImages'
 import { useAuth } from '../../contexts/AuthContext'
 import { useAuthModal } from '../../contexts/useAuthModal'
 import { Heart, Trash2, Loader2, Bird, Search, Feather, Calendar, User, Camera, ExternalLink } from 'lucide-react'
@@ -44,11 +44,11 @@ export default function FavoritesPage() {
     try {
       const data = await authAPI.getFavorites()
       
-      // Load photos for each favorite bird from Wikimedia
+      // Photos for every favorite come from one batched backend request
       const favoritesWithPhotos = await Promise.all(
         data.map(async (bird: FavoriteBird) => {
           try {
-            const photo = await getBirdPhotoFromWikimedia(bird.species_name)
+            const photo = await getSpeciesPhoto(bird.species_code)
             return { 
               ...bird, 
               imageUrl: photo.url,
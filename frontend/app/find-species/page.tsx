@@ -7,7 +7,7 @@ import { Header } from '../../components/Header'
 import { Card } from '../../components/ui/card'
 import { Button } from '../../components/ui/button'
 import { speciesAPI } from '../../lib/api'
-import { getBirdPhotoFromWikimedia } from '../../lib/wikimedia'
+import { getSpeciesPhoto } from '../../lib/speciesImages'
 import { useAuth } from '../../contexts/AuthContext'
 import { useAuthModal } from '../../contexts/useAuthModal'
 import { Loader2, Search, Bird as BirdIcon, Camera, ExternalLink } from 'lucide-react'
@@ -63,7 +63,7 @@ export default function FindSpeciesPage() {
     }
     (async () => {
       try {
-        const img = await getBirdPhotoFromWikimedia(selected.species_name)
+        const img = await getSpeciesPhoto(selected.species_code)
         setImageUrl(img.url)
         setImageAttribution(img.attribution)
       } catch (e) {
@@ -11,7 +11,7 @@ import { SpeciesCard } from '../components/SpeciesCard'
 import { BirdCharts } from '../components/BirdCharts'
 import { BirdMap } from '../components/BirdMap'
 import { Loader2, Search, Bird, X, Filter, Binoculars, Feather, User, ChevronDown, Settings, Save, Star, MapPin } from 'lucide-react'
-import { preloadBirdPhotos } from '../lib/flickr'
+import { preloadSpeciesPhotos } from '../lib/speciesImages'
 import { birdAPI, authAPI } from '../lib/api'
 import { useAuth } from '../contexts/AuthContext'
 import { useAuthModal } from '../contexts/useAuthModal'
@@ -144,8 +144,8 @@ export default function Page() {
       birdAPI.getRareBirds(lat, lng)
         .then(data => {
           setBirds(data)
-          const species = data.map((b: ObservedBird) => b.species)
-          preloadBirdPhotos(species)
+          // One request for the photos of every species on the page
+          preloadSpeciesPhotos(data.map((b: ObservedBird) => b.species_code))
         })
         .catch(() => setBirds([]))
         .finally(() => setLoading(false))
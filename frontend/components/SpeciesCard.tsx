@@ -2,7 +2,7 @@
 
 import { useState, useEffect } from 'react'
 import { Calendar, MapPin, Eye, X, Camera, Feather, TreePine, Heart, ExternalLink, Map, Navigation } from 'lucide-react'
-import { getBirdPhoto } from '../lib/flickr'
+import { getSpeciesPhoto } from '../lib/speciesImages'
 import { Button } from './ui/button'
 import { authAPI } from '../lib/api'
 import { useAuth } from '../contexts/AuthContext'
@@ -32,7 +32,7 @@ export function SpeciesCard({ species, speciesCode, sightings }: SpeciesCardProp
   const { user } = useAuth()
 
   useEffect(() => {
-    getBirdPhoto(species)
+    getSpeciesPhoto(speciesCode)
       .then(result => {
         setImageUrl(result.url)
         setImageAttribution(result.attribution)
@@ -41,7 +41,7 @@ export function SpeciesCard({ species, speciesCode, sightings }: SpeciesCardProp
       .catch(() => {
         setImageLoading(false)
       })
-  }, [species])
+  }, [speciesCode])
 
   useEffect(() => {
     if (user && speciesCode) {
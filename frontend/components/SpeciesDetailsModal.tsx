@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from 'react'
 import { Calendar, MapPin, Eye, X, Camera, Feather, ExternalLink, Map, Navigation, Heart } from 'lucide-react'
-import { getBirdPhoto } from '../lib/flickr'
+import { getSpeciesPhoto } from '../lib/speciesImages'
 import { authAPI } from '../lib/api'
 import { useAuth } from '../contexts/AuthContext'
 
@@ -32,13 +32,13 @@ export function SpeciesDetailsModal({ isOpen, onClose, species, speciesCode, sig
 
   useEffect(() => {
     if (!isOpen) return
-    getBirdPhoto(species)
+    getSpeciesPhoto(speciesCode)
       .then(result => {
         setImageUrl(result.url)
         setImageAttribution(result.attribution)
       })
       .catch(() => {})
-  }, [isOpen, species])
+  }, [isOpen, speciesCode])
 
   useEffect(() => {
     if (!isOpen || !user || !speciesCode) return
@@ -3,6 +3,7 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react'
 import axios from 'axios'
 import Cookies from 'js-cookie'
+import { refreshSession } from '../lib/api'
 
 interface User {
   id: number
@@ -57,16 +58,8 @@ api.interceptors.response.use(
       originalRequest._retry = true
       
       try {
-        const refreshToken = Cookies.get('refresh_token')
-        if (refreshToken) {
-          const response = await axios.post(`${API_URL}/auth/refresh`, {
-            refresh_token: refreshToken,
-          })
-          
-          const { access_token, refresh_token: newRefreshToken } = response.data
-          Cookies.set('access_token', access_token, { expires: 1/96 }) // 15 minutes
-          Cookies.set('refresh_token', newRefreshToken, { expires: 7 }) // 7 days
-          
+        const access_token = await refreshSession()
+        if (access_token) {
           originalRequest.headers.Authorization = `Bearer ${access_token}`
           return api(originalRequest)
         }
@@ -140,22 +133,19 @@ export const AuthProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
   }
 
   const logout = () => {
+    const refreshToken = Cookies.get('refresh_token')
+    if (refreshToken) {
+      // Revoke the session server-side; local sign-out doesn't wait for it
+      axios.post(`${API_URL}/auth/logout`, null, { params: { refresh_token: refreshToken } }).catch(() => {})
+    }
     Cookies.remove('access_token')
     Cookies.remove('refresh_token')
     setUser(null)
   }
 
   const refreshToken = async () => {
-    const refreshToken = Cookies.get('refresh_token')
-    if (!refreshToken) throw new Error('No refresh token')
-    
-    const response = await axios.post(`${API_URL}/auth/refresh`, {
-      refresh_token: refreshToken,
-    })
-    
-    const { access_token, refresh_token: newRefreshToken } = response.data
-    Cookies.set('access_token', access_token, { expires: 1/96 })
-    Cookies.set('refresh_token', newRefreshToken, { expires: 7 })
+    if (!Cookies.get('refresh_token')) throw new Error('No refresh token')
+    await refreshSession()
   }
 
   return (
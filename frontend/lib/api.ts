@@ -25,6 +25,29 @@ api.interceptors.request.use(
   }
 )
 
+// Refresh tokens are single use and replaying one logs the session out, so
+// concurrent 401s share one refresh request instead of each sending the token.
+let refreshInFlight: Promise<string | null> | null = null
+
+export const refreshSession = (): Promise<string | null> => {
+  if (!refreshInFlight) {
+    refreshInFlight = (async () => {
+      const refreshToken = Cookies.get('refresh_token')
+      if (!refreshToken) return null
+      const response = await axios.post(`${API_URL}/auth/refresh`, null, {
+        params: { refresh_token: refreshToken },
+      })
+      const { access_token, refresh_token: newRefreshToken } = response.data
+      Cookies.set('access_token', access_token, { expires: 1/96 }) // 15 minutes
+      Cookies.set('refresh_token', newRefreshToken, { expires: 7 }) // 7 days
+      return access_token as string
+    })().finally(() => {
+      refreshInFlight = null
+    })
+  }
+  return refreshInFlight
+}
+
 // Response interceptor to handle token refresh
 api.interceptors.response.use(
   (response) => response,
@@ -35,16 +58,8 @@ api.interceptors.response.use(
       originalRequest._retry = true
       
       try {
-        const refreshToken = Cookies.get('refresh_token')
-        if (refreshToken) {
-          const response = await axios.post(`${API_URL}/auth/refresh`, {
-            refresh_token: refreshToken,
-          })
-          
-          const { access_token, refresh_token: newRefreshToken } = response.data
-          Cookies.set('access_token', access_token, { expires: 1/96 }) // 15 minutes
-          Cookies.set('refresh_token', newRefreshToken, { expires: 7 }) // 7 days
-          
+        const access_token = await refreshSession()
+        if (access_token) {
           originalRequest.headers.Authorization = `Bearer ${access_token}`
           return api(originalRequest)
         }
@@ -60,6 +75,23 @@ api.interceptors.response.use(
   }
 )
 
+// Every saved location in one request; observations are shared and referenced by index
+export interface DashboardLocation {
+  location_id: number
+  name: string
+  lat: number
+  lng: number
+  observation_indices: number[]
+  distances_km: number[]
+}
+
+export interface Dashboard {
+  radius_km: number
+  locations: DashboardLocation[]
+  observations: any[]
+  upstream_fetches: number
+}
+
 // Bird API functions
 export const birdAPI = {
   getRareBirds: async (lat: number, lng: number, radius: number = 25) => {
@@ -68,23 +100,64 @@ export const birdAPI = {
     })
     return response.data
   },
+  getDashboard: async (radius: number = 25): Promise<Dashboard> => {
+    const response = await api.get('/birds/dashboard', { params: { radius } })
+    return response.data
+  },
+  // Live feed of new sightings; returns a function that closes the stream.
+  // onReset fires when the server dropped us for falling behind: reload the list.
+  streamRareBirds: (
+    lat: number,
+    lng: number,
+    radius: number,
+    onSightings: (birds: any[]) => void,
+    onReset?: () => void
+  ) => {
+    const params = new URLSearchParams({ lat: String(lat), lng: String(lng), radius: String(radius) })
+    const source = new EventSource(`${API_URL}/birds/rare/stream?${params}`)
+    source.addEventListener('sightings', (event) => onSightings(JSON.parse((event as MessageEvent).data)))
+    source.addEventListener('reset', () => onReset?.())
+    return () => source.close()
+  },
+}
+
+export type SpeciesObservationArgs = {
+  species_code: string
+  radius_km?: number
+  cutoff_date?: string | null
+  lat?: number
+  lng?: number
+  location_type?: 'zip' | 'city'
+  location_value?: string
 }
 
 // Species API functions
+export interface Hotspot {
+  loc_id: string
+  name: string
+  lat: number
+  lng: number
+  subnational1_code?: string
+  latest_obs_dt?: string
+  num_species_all_time?: number
+  distance_km: number
+}
+
+export interface SpeciesImage {
+  species_code: string
+  url: string | null
+  thumbnail_url: string | null
+  attribution: string | null
+  source_url: string | null
+}
+
 export const speciesAPI = {
-  suggest: async (q: string, limit: number = 10) => {
-    const response = await api.get('/species/suggest', { params: { q, limit } })
+  // Pass a region code ("US-CO") or coordinates to rank local species first
+  suggest: async (q: string, limit: number = 10, near?: { region?: string; lat?: number; lng?: number }) => {
+    const response = await api.get('/species/suggest', { params: { q, limit, ...near } })
     return response.data as Array<{ species_name: string; species_code: string; scientific_name?: string }>
   },
-  observations: async (args: {
-    species_code: string
-    radius_km?: number
-    cutoff_date?: string | null
-    lat?: number
-    lng?: number
-    location_type?: 'zip' | 'city'
-    location_value?: string
-  }) => {
+  observations: async (args: SpeciesObservationArgs) => {
     const { cutoff_date, ...rest } = args
     const response = await api.get('/species/observations', {
       params: {
@@ -94,6 +167,22 @@ export const speciesAPI = {
     })
     return response.data
   },
+  // Photos for up to 100 species codes, resolved and cached server-side
+  images: async (codes: string[]) => {
+    const response = await api.get('/species/images', { params: { codes: codes.join(',') } })
+    return response.data as SpeciesImage[]
+  },
+  hotspots: async (args: {
+    lat?: number
+    lng?: number
+    location_type?: 'zip' | 'city'
+    location_value?: string
+    radius_km?: number
+    k?: number
+  }) => {
+    const response = await api.get('/species/hotspots', { params: args })
+    return response.data as Hotspot[]
+  },
 }
 
 // Auth API functions
@@ -109,8 +198,37 @@ export const authAPI = {
   },
 
   getFavorites: async () => {
-    const response = await api.get('/auth/favorites')
-    return response.data
+    // Favorites are paged server-side; follow the cursor to load the full list
+    const favorites: any[] = []
+    let cursor: string | undefined
+    do {
+      const response = await api.get('/auth/favorites', { params: { limit: 100, cursor } })
+      favorites.push(...response.data)
+      cursor = response.headers['x-next-cursor'] || undefined
+    } while (cursor)
+    return favorites
+  },
+
+  getFavoritesPage: async (limit: number = 50, cursor?: string) => {
+    const response = await api.get('/auth/favorites', { params: { limit, cursor } })
+    return { items: response.data, nextCursor: (response.headers['x-next-cursor'] as string) ?? null }
+  },
+
+  // Favorite species seen near the default location; X-Unread-Count carries the badge number
+  getNotifications: async (limit: number = 50, cursor?: string, unreadOnly: boolean = false) => {
+    const response = await api.get('/auth/notifications', {
+      params: { limit, cursor, unread_only: unreadOnly || undefined }
+    })
+    return {
+      items: response.data,
+      nextCursor: (response.headers['x-next-cursor'] as string) ?? null,
+      unreadCount: Number(response.headers['x-unread-count'] ?? 0),
+    }
+  },
+
+  // Omit ids to mark everything read
+  markNotificationsRead: async (ids?: number[]) => {
+    await api.post('/auth/notifications/read', { ids })
   },
 
   checkFavorite: async (species_code: string) => {
@@ -158,4 +276,20 @@ export const authAPI = {
     const response = await api.post(`/auth/locations/${locationId}/set-default`)
     return response.data
   },
+
+  // Bulk import/export; each import returns one { index, status, id?, detail? } per item
+  importLocations: async (locations: Array<{ name: string, location_type: 'zip' | 'city', location_value: string, is_default?: boolean }>) => {
+    const response = await api.post('/auth/locations/bulk', { locations })
+    return response.data
+  },
+
+  importFavorites: async (favorites: Array<{ species_name: string, species_code: string, scientific_name?: string, notes?: string }>) => {
+    const response = await api.post('/auth/favorites/bulk', { favorites })
+    return response.data
+  },
+
+  exportData: async () => {
+    const response = await api.get('/auth/export')
+    return response.data
+  },
 }
\ No newline at end of file
@@ -0,0 +1,100 @@
+import { speciesAPI, SpeciesImage } from './api'
+
+export interface BirdPhoto {
+  url: string
+  attribution: string
+}
+
+// Photos resolved by the backend; one entry per species code
+const photoCache = new Map<string, Promise<BirdPhoto>>()
+// Codes requested since the last flush, batched into one backend call
+let pending = new Map<string, { resolve: (photo: BirdPhoto) => void }[]>()
+let flushScheduled = false
+
+// Backend limit per request
+const MAX_CODES_PER_REQUEST = 100
+
+const fallbackBirdImages: BirdPhoto[] = [
+  { url: 'https://images.unsplash.com/photo-1444464666168-49d633b86797?w=600&h=400&fit=crop', attribution: 'Unsplash' },
+  { url: 'https://images.unsplash.com/photo-1552728089-57bdde30beb3?w=600&h=400&fit=crop', attribution: 'Unsplash' },
+  { url: 'https://images.unsplash.com/photo-1606567595334-d39972c85dbe?w=600&h=400&fit=crop', attribution: 'Unsplash' },
+]
+
+function hashString(str: string): number {
+  let hash = 0
+  for (let i = 0; i < str.length; i++) {
+    const char = str.charCodeAt(i)
+    hash = ((hash << 5) - hash) + char
+    hash = hash & hash
+  }
+  return Math.abs(hash)
+}
+
+function fallbackPhoto(speciesCode: string): BirdPhoto {
+  return fallbackBirdImages[hashString(speciesCode) % fallbackBirdImages.length]
+}
+
+function toPhoto(speciesCode: string, image?: SpeciesImage): BirdPhoto {
+  const url = image?.thumbnail_url || image?.url
+  if (!url) {
+    return fallbackPhoto(speciesCode)
+  }
+  return { url, attribution: image?.attribution || 'Wikimedia' }
+}
+
+async function flush() {
+  flushScheduled = false
+  const batch = pending
+  pending = new Map()
+  const codes = Array.from(batch.keys())
+  for (let start = 0; start < codes.length; start += MAX_CODES_PER_REQUEST) {
+    const chunk = codes.slice(start, start + MAX_CODES_PER_REQUEST)
+    let images: SpeciesImage[] = []
+    try {
+      images = await speciesAPI.images(chunk)
+    } catch (error) {
+      console.error('Error loading species photos:', error)
+      // Let a later render try again instead of keeping the fallback forever
+      chunk.forEach(code => photoCache.delete(code))
+    }
+    const byCode = new Map<string, SpeciesImage>(images.map(image => [image.species_code, image]))
+    for (const code of chunk) {
+      const photo = toPhoto(code, byCode.get(code))
+      batch.get(code)!.forEach(waiter => waiter.resolve(photo))
+    }
+  }
+}
+
+/**
+ * Photo for a species. Calls made in the same tick (e.g. every card on a
+ * results page) share one backend request.
+ */
+export function getSpeciesPhoto(speciesCode: string): Promise<BirdPhoto> {
+  if (!speciesCode) {
+    return Promise.resolve(fallbackBirdImages[0])
+  }
+  const cached = photoCache.get(speciesCode)
+  if (cached) {
+    return cached
+  }
+  const promise = new Promise<BirdPhoto>(resolve => {
+    const waiters = pending.get(speciesCode) || []
+    waiters.push({ resolve })
+    pending.set(speciesCode, waiters)
+  })
+  photoCache.set(speciesCode, promise)
+  if (!flushScheduled) {
+    flushScheduled = true
+    setTimeout(flush, 0)
+  }
+  return promise
+}
+
+/**
+ * Resolve photos for a whole results page up front, in one request.
+ */
+export function preloadSpeciesPhotos(speciesCodes: string[]) {
+  speciesCodes.forEach(code => {
+    getSpeciesPhoto(code).catch(() => {})
+  })
+}